@@ -0,0 +1,150 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+import runtime
+from attendance_store import is_sqlite_path
+
+def load_events(attendance_file=None):
+    """Load the attendance log (CSV or SQLite, the configured one by default) with a parsed Timestamp column"""
+    attendance_file = attendance_file or runtime.path('attendance')
+    if is_sqlite_path(attendance_file):
+        conn = sqlite3.connect(attendance_file)
+        try:
+            df = pd.read_sql_query(
+                "SELECT date AS Date, time AS Time, student_id AS Student_ID, "
+                "student_name AS Student_Name, action AS Action FROM attendance ORDER BY timestamp, id", conn)
+        finally:
+            conn.close()
+    else:
+        df = pd.read_csv(attendance_file, dtype=str, keep_default_na=False, on_bad_lines='skip')
+
+    df['Timestamp'] = pd.to_datetime(df['Date'] + ' ' + df['Time'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    return df.dropna(subset=['Timestamp'])
+
+def build_sessions(events):
+    """Pair every ENTRY with the EXIT / EXIT (FORCED) that follows it for the same person.
+
+    Works on whole columns: sort by person and time, then compare every row
+    with the next one. An ENTRY that is not followed by an exit (still on
+    site, or a lost EXIT) becomes an open session with no Exit time.
+    """
+    df = events.sort_values(['Student_ID', 'Timestamp'], kind='stable').reset_index(drop=True)
+    student = df['Student_ID'].to_numpy()
+    action = df['Action'].to_numpy()
+    ts = df['Timestamp'].to_numpy()
+
+    is_entry = action == 'ENTRY'
+    is_exit = np.char.startswith(action.astype(str), 'EXIT')
+
+    # Next event of the same person
+    same_next = np.zeros(len(df), dtype=bool)
+    same_next[:-1] = student[1:] == student[:-1]
+    next_is_exit = np.zeros(len(df), dtype=bool)
+    next_is_exit[:-1] = is_exit[1:]
+    closed = is_entry & same_next & next_is_exit
+
+    entry_idx = np.flatnonzero(is_entry)
+    exit_idx = entry_idx + 1
+    closed_sel = closed[entry_idx]
+
+    exit_ts = np.full(len(entry_idx), np.datetime64('NaT'), dtype=ts.dtype)
+    exit_ts[closed_sel] = ts[exit_idx[closed_sel]]
+    exit_action = np.full(len(entry_idx), '', dtype=object)
+    exit_action[closed_sel] = action[exit_idx[closed_sel]]
+
+    sessions = pd.DataFrame({
+        'Student_ID': student[entry_idx],
+        'Student_Name': df['Student_Name'].to_numpy()[entry_idx],
+        'Entry': ts[entry_idx],
+        'Exit': exit_ts,
+        'Exit_Action': exit_action,
+    })
+    sessions['Date'] = sessions['Entry'].dt.strftime('%Y-%m-%d')
+    sessions['Duration_s'] = (sessions['Exit'] - sessions['Entry']).dt.total_seconds()
+    sessions['Open'] = ~closed_sel
+    return sessions
+
+def daily_summary(sessions):
+    """Per person and day: sessions, total dwell time, first in and last out"""
+    daily = sessions.groupby(['Date', 'Student_ID', 'Student_Name'], sort=True).agg(
+        Sessions=('Entry', 'size'),
+        Open_Sessions=('Open', 'sum'),
+        Dwell_s=('Duration_s', 'sum'),
+        First_In=('Entry', 'min'),
+        Last_Out=('Exit', 'max'),
+    ).reset_index()
+    daily['Dwell_h'] = (daily['Dwell_s'] / 3600).round(2)
+    return daily
+
+def occupancy(sessions, freq=None):
+    """Number of people on site over time.
+
+    Without `freq` the result has one row per change; with a pandas
+    frequency ('5min', '1h'...) it holds the peak occupancy per interval.
+    Open sessions count as still on site.
+    """
+    closed = sessions['Exit'].notna().to_numpy()
+    times = np.concatenate([sessions['Entry'].to_numpy(), sessions['Exit'].to_numpy()[closed]])
+    deltas = np.concatenate([np.ones(len(sessions), dtype=np.int64), -np.ones(closed.sum(), dtype=np.int64)])
+
+    # Exits before entries at the same instant, so nobody is counted twice
+    order = np.lexsort((deltas, times))
+    series = pd.Series(np.cumsum(deltas[order]), index=pd.DatetimeIndex(times[order]), name='Occupancy')
+    series = series.groupby(level=0).last()
+    if freq is None:
+        return series
+
+    resampled = series.resample(freq)
+    last = resampled.last().ffill().fillna(0)
+    peak = resampled.max()
+    # The level carried into an interval also counts towards its peak
+    peak = np.fmax(peak, last.shift(1).fillna(0))
+    return peak.astype(np.int64).rename('Occupancy')
+
+def write_table(df, path):
+    """Write CSV or Parquet depending on the file extension"""
+    index = isinstance(df, pd.Series) # The occupancy series is indexed by time
+    if index:
+        df = df.to_frame()
+    if path.endswith('.parquet'):
+        try:
+            df.to_parquet(path, index=index)
+        except ImportError:
+            print("[ERROR] Writing Parquet needs pyarrow or fastparquet (pip install pyarrow).")
+            raise
+    else:
+        df.to_csv(path, index=index)
+    print(f"[INFO] Saved {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sessions, dwell time and occupancy from the attendance log")
+    parser.add_argument('attendance_file', nargs='?', default=runtime.path('attendance'))
+    parser.add_argument('--out-dir', default='analytics')
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv')
+    parser.add_argument('--freq', default='15min', help="Occupancy interval (pandas frequency)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.attendance_file):
+        print("No attendance records found!")
+        return
+
+    start = time.perf_counter()
+    events = load_events(args.attendance_file)
+    sessions = build_sessions(events)
+    daily = daily_summary(sessions)
+    occ = occupancy(sessions, args.freq)
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] {len(events)} events -> {len(sessions)} sessions in {elapsed:.2f}s")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    write_table(sessions, os.path.join(args.out_dir, f'sessions.{args.format}'))
+    write_table(daily, os.path.join(args.out_dir, f'daily_dwell.{args.format}'))
+    write_table(occ, os.path.join(args.out_dir, f'occupancy.{args.format}'))
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,100 @@
 import cv2
-import pickle
-import numpy as np
 from datetime import datetime
-import time
-import os
+
+import runtime
+from attendance_writer import get_writer
+from embedding_index import load_index
+from face_encoder import encoder_from_spec
+from face_matcher import FaceMatcher
+from presence_tracker import PresenceTracker
+
+# Fraction of the match threshold a distance must be under to log an ENTRY
+ENTER_RATIO = 0.8
 
 class AttendanceSystem:
-    def __init__(self):
-        # Load face database
-        if os.path.exists('face_database.pkl'):
-            with open('face_database.pkl', 'rb') as f:
-                self.face_data = pickle.load(f)
-        else:
+    def __init__(self, exit_delay=5.0, min_dwell=0.5, attendance_file='attendance_log.csv', match_aggregate='min'):
+        # Load face database (memory-mapped arrays, a legacy pickle is converted once)
+        self.face_data = runtime.face_database()
+        if self.face_data is None:
             print("No face database found! Run encode_faces.py first.")
             exit()
         
-        # Initialize attendance log
-        self.attendance_file = 'attendance_log.csv'
+        # Encode faces the way the database was built, and compare every
+        # detected face with every stored encoding at once
+        # (through the nearest-neighbour index when one was built for this database)
+        self.encoder = encoder_from_spec(self.face_data.encoder)
+        index = load_index(self.face_data) if match_aggregate == 'min' else None
+        self.matcher = FaceMatcher.for_encoder(self.face_data, self.encoder, aggregate=match_aggregate, index=index)
+        if index is not None:
+            print(f"Using {index.kind} index over {len(index)} encodings")
+        
+        # Initialize attendance log (attendance.db selects the SQLite store)
+        self.attendance_file = attendance_file
         self.initialize_attendance_log()
         
-        # Track currently present students (to avoid duplicate entries)
-        self.currently_present = set()
+        # Track currently present students (debounced, so a blink or a head
+        # turn does not log an EXIT followed by a new ENTRY). The hysteresis is
+        # on the matcher's distance scale: any match keeps a student present,
+        # entering needs a clearly closer one.
+        threshold = self.matcher.threshold
+        self.presence = PresenceTracker(exit_delay=exit_delay, min_dwell=min_dwell,
+                                        enter_confidence=threshold * ENTER_RATIO, stay_confidence=threshold)
         
         # Face detector
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.face_detector = runtime.detector('enroll')
         
         print("Attendance System Initialized!")
-        print(f"Registered students: {set(self.face_data['names'])}")
+        print(f"Registered students: {set(self.face_data.names)}")
     
     def initialize_attendance_log(self):
-        """Create CSV file with headers if it doesn't exist"""
-        if not os.path.exists(self.attendance_file):
-            with open(self.attendance_file, 'w') as f:
-                f.write("Date,Time,Student_ID,Student_Name,Action\n")
+        """Start the background writer (it creates the CSV with headers if needed)"""
+        self.writer = get_writer(self.attendance_file)
     
-    def log_attendance(self, student_id, student_name, action):
-        """Log entry or exit with timestamp"""
-        now = datetime.now()
-        date_str = now.strftime("%Y-%m-%d")
-        time_str = now.strftime("%H:%M:%S")
-        
-        log_entry = f"{date_str},{time_str},{student_id},{student_name},{action}\n"
-        
-        with open(self.attendance_file, 'a') as f:
-            f.write(log_entry)
-        
-        print(f"📝 LOGGED: {student_name} ({student_id}) - {action} at {time_str}")
+    @property
+    def currently_present(self):
+        return self.presence.present_ids()
+
+    def log_attendance(self, student_id, student_name, action, timestamp=None, model_version=None):
+        """Log entry or exit with timestamp (and the recognizer model version, if known)"""
+        now = timestamp or datetime.now()
+        self.writer.log(student_id, student_name, action, now, model_version)
+        version = f" [model v{model_version}]" if model_version is not None else ""
+        print(f"📝 LOGGED: {student_name} ({student_id}) - {action} at {now:%H:%M:%S}{version}")
+    
+    def close(self):
+        """Write out every queued attendance event"""
+        self.writer.close()
     
     def recognize_and_log(self, frame):
         """Detect faces and log attendance"""
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
-        
-        current_frame_detections = set()
+        faces = self.face_detector.detect(gray)
         
-        for (x, y, w, h) in faces:
-            # Simple recognition logic (temporary)
-            # In Phase 3, we'll replace this with proper face recognition
-            for i, encoding in enumerate(self.face_data['encodings']):
-                # Simple distance calculation (temporary)
-                ex, ey, ew, eh = encoding
-                distance = abs(x - ex) + abs(y - ey) + abs(w - ew) + abs(h - eh)
-                
-                if distance < 100:  # Threshold for "match"
-                    student_id = self.face_data['ids'][i]
-                    student_name = self.face_data['names'][i]
-                    
-                    current_frame_detections.add(student_id)
-                    
-                    # Draw rectangle and label
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                    cv2.putText(frame, f'{student_name} ({student_id})', 
-                               (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                    
-                    # Log entry if not already present
-                    if student_id not in self.currently_present:
-                        self.log_attendance(student_id, student_name, "ENTRY")
-                        self.currently_present.add(student_id)
-                    
-                    break
+        detections = []
         
-        # Check for exits (students who were present but not detected now)
-        exited_students = self.currently_present - current_frame_detections
-        for student_id in exited_students:
-            # Find student name
-            for i, sid in enumerate(self.face_data['ids']):
-                if sid == student_id:
-                    student_name = self.face_data['names'][i]
-                    self.log_attendance(student_id, student_name, "EXIT")
-                    break
+        # Best matching student per face, over all samples of all students at once
+        matches = self.matcher.match(self.encoder.encode(gray, faces)) if len(faces) else []
+        for (x, y, w, h), best in zip(faces, matches):
+            if not best:  # Nobody under the match threshold
+                continue
+            student_id, student_name, distance = best[0]
+            
+            detections.append((student_id, student_name, distance))
+            
+            # Draw rectangle and label
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+            cv2.putText(frame, f'{student_name} ({student_id})', 
+                       (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
-        self.currently_present = current_frame_detections
+        # Log debounced entries and exits
+        for student_id, student_name, action, timestamp in self.presence.update(detections):
+            self.log_attendance(student_id, student_name, action, datetime.fromtimestamp(timestamp))
         
         return frame
     
     def run(self):
         """Main loop for attendance system"""
-        cap = cv2.VideoCapture(0)
+        cap = runtime.open_camera()
         if not cap.isOpened():
             print("Error: Cannot open camera")
             return
@@ -123,18 +121,17 @@ class AttendanceSystem:
                 break
         
         # Log exits for all remaining present students
-        for student_id in self.currently_present:
-            for i, sid in enumerate(self.face_data['ids']):
-                if sid == student_id:
-                    student_name = self.face_data['names'][i]
-                    self.log_attendance(student_id, student_name, "EXIT (FORCED)")
-                    break
+        for student_id, student_name, action, timestamp in self.presence.close():
+            self.log_attendance(student_id, student_name, action, datetime.fromtimestamp(timestamp))
         
+        self.close()
         cap.release()
         cv2.destroyAllWindows()
         print("Attendance system stopped.")
 
+def main():
+    runtime.attendance_system().run()
+
 # Run the system
 if __name__ == "__main__":
-    system = AttendanceSystem()
-    system.run()
+    main()
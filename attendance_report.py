@@ -0,0 +1,235 @@
+import hashlib
+import io
+import json
+import os
+from collections import Counter
+
+import pandas as pd
+
+CSV_COLUMNS = ['Date', 'Time', 'Student_ID', 'Student_Name', 'Action']
+STATE_VERSION = 1
+CHUNK_ROWS = 100000
+FINGERPRINT_BYTES = 4096
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of an open binary file"""
+    def __init__(self, f, start, end):
+        self.f = f
+        self.remaining = end - start
+        f.seek(start)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.remaining)
+        if n <= 0:
+            return 0
+        data = self.f.read(n)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+class IncrementalReport:
+    """Running attendance aggregates that only ever read the new part of the log.
+
+    The byte offset reached and the per-(student, action), per-(day, action)
+    and per-(day, student) counts are kept in a sidecar JSON state file. Each
+    update() reads from that offset to the last complete line, in chunks, so
+    memory stays bounded no matter how large the log is. A log that was
+    truncated or replaced is detected and rebuilt from the start.
+    """
+    def __init__(self, attendance_file='attendance_log.csv', state_file=None, chunk_rows=CHUNK_ROWS):
+        self.attendance_file = attendance_file
+        self.state_file = state_file or attendance_file + '.report.json'
+        self.chunk_rows = chunk_rows
+        self._reset()
+        self._load_state()
+
+    def _reset(self):
+        self.offset = 0
+        self.fingerprint = None
+        self.rows = 0
+        self.last_date = None
+        self.last_date_offset = 0
+        self.by_student_action = Counter()
+        self.by_day_action = Counter()
+        self.by_day_student = Counter()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            if state.get('version') != STATE_VERSION:
+                return
+            self.offset = state['offset']
+            self.fingerprint = state['fingerprint']
+            self.rows = state['rows']
+            self.last_date = state['last_date']
+            self.last_date_offset = state['last_date_offset']
+            self.by_student_action = Counter({tuple(k.split('\t')): v for k, v in state['by_student_action'].items()})
+            self.by_day_action = Counter({tuple(k.split('\t')): v for k, v in state['by_day_action'].items()})
+            self.by_day_student = Counter({tuple(k.split('\t')): v for k, v in state['by_day_student'].items()})
+        except (ValueError, KeyError) as e:
+            print(f"[WARN] Ignoring unreadable report state {self.state_file}: {e}")
+            self._reset()
+
+    def save_state(self):
+        state = {
+            'version': STATE_VERSION,
+            'offset': self.offset,
+            'fingerprint': self.fingerprint,
+            'rows': self.rows,
+            'last_date': self.last_date,
+            'last_date_offset': self.last_date_offset,
+            'by_student_action': {'\t'.join(k): v for k, v in self.by_student_action.items()},
+            'by_day_action': {'\t'.join(k): v for k, v in self.by_day_action.items()},
+            'by_day_student': {'\t'.join(k): v for k, v in self.by_day_student.items()},
+        }
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.state_file)
+
+    def update(self, rebuild=False):
+        """Fold the rows appended since the last run into the aggregates.
+
+        Returns the number of new rows. rebuild=True starts over from the
+        first row (still streamed in chunks).
+        """
+        with open(self.attendance_file, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            if rebuild or self._log_replaced(f, size):
+                self._reset()
+
+            if self.offset == 0:
+                f.seek(0)
+                header = f.readline()
+                if not header.startswith(b'Date,'):
+                    header = b''
+                self.offset = len(header)
+
+            end = self._last_complete_line(f, size)
+            if end <= self.offset:
+                return 0
+
+            new_rows = 0
+            reader = pd.read_csv(io.BufferedReader(_ByteRange(f, self.offset, end)), header=None,
+                                 names=CSV_COLUMNS, dtype=str, chunksize=self.chunk_rows,
+                                 on_bad_lines='skip', keep_default_na=False)
+            for chunk in reader:
+                self._add_chunk(chunk)
+                new_rows += len(chunk)
+
+            self._track_last_day(f, end)
+            self.offset = end
+            self.rows += new_rows
+            f.seek(0)
+            self.fingerprint = hashlib.sha1(f.read(min(end, FINGERPRINT_BYTES))).hexdigest()
+        self.save_state()
+        return new_rows
+
+    def _log_replaced(self, f, size):
+        if self.offset == 0:
+            return False
+        if size < self.offset:
+            return True
+        f.seek(0)
+        return hashlib.sha1(f.read(min(self.offset, FINGERPRINT_BYTES))).hexdigest() != self.fingerprint
+
+    def _last_complete_line(self, f, size):
+        # A line still being written by the recognizer is left for the next run
+        pos = size
+        while pos > self.offset:
+            step = min(65536, pos - self.offset)
+            f.seek(pos - step)
+            block = f.read(step)
+            nl = block.rfind(b'\n')
+            if nl >= 0:
+                return pos - step + nl + 1
+            pos -= step
+        return self.offset
+
+    def _add_chunk(self, chunk):
+        for key, n in chunk.groupby(['Student_ID', 'Student_Name', 'Action']).size().items():
+            self.by_student_action[key] += int(n)
+        for key, n in chunk.groupby(['Date', 'Action']).size().items():
+            self.by_day_action[key] += int(n)
+        for key, n in chunk.groupby(['Date', 'Student_ID']).size().items():
+            self.by_day_student[key] += int(n)
+
+    def _track_last_day(self, f, end):
+        """Remember where the newest day starts, so its rows can be shown without a scan"""
+        # The log is append-only and chronological: walk back block by block
+        # over the new bytes until the date changes
+        start = self.offset
+        pos = end - 1 # Skip the final newline
+        carry = b''
+        newest = None
+        day_start = end
+        while True:
+            step = min(65536, pos - start)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + carry).split(b'\n')
+            carry = lines.pop(0) if pos > start else b'' # May be cut in half
+            for line in reversed(lines):
+                date = line.split(b',', 1)[0].decode(errors='replace')
+                if newest is None:
+                    newest = date
+                elif date != newest:
+                    self.last_date, self.last_date_offset = newest, day_start
+                    return
+                day_start -= len(line) + 1
+            if pos <= start:
+                break
+
+        # Every new row has the same date: either a new day started at
+        # `start` or the previous newest day simply continues
+        if newest is not None and newest != self.last_date:
+            self.last_date, self.last_date_offset = newest, start
+
+    # ---------------------------
+    # Report views
+    # ---------------------------
+    def student_summary(self):
+        """Counts per (Student_ID, Student_Name) and Action, like the old groupby/unstack"""
+        if not self.by_student_action:
+            return pd.DataFrame()
+        index = pd.MultiIndex.from_tuples(list(self.by_student_action), names=['Student_ID', 'Student_Name', 'Action'])
+        series = pd.Series(list(self.by_student_action.values()), index=index)
+        return series.unstack(fill_value=0).sort_index()
+
+    def daily_summary(self):
+        """Counts per Date and Action"""
+        if not self.by_day_action:
+            return pd.DataFrame()
+        index = pd.MultiIndex.from_tuples(list(self.by_day_action), names=['Date', 'Action'])
+        return pd.Series(list(self.by_day_action.values()), index=index).unstack(fill_value=0).sort_index()
+
+    def rows_for_day(self, date):
+        """Rows of the newest day in the log (empty for any other day)"""
+        if date != self.last_date:
+            return pd.DataFrame(columns=CSV_COLUMNS)
+        with open(self.attendance_file, 'rb') as f:
+            data = _ByteRange(f, self.last_date_offset, self.offset).readall()
+        return pd.read_csv(io.BytesIO(data), header=None, names=CSV_COLUMNS, dtype=str, keep_default_na=False)
+
+    def tail(self, n=10):
+        """Last n rows, read from the end of the file"""
+        with open(self.attendance_file, 'rb') as f:
+            pos = self.offset
+            data = b''
+            while pos > 0 and data.count(b'\n') <= n:
+                step = min(65536, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.split(b'\n')
+        if pos > 0:
+            lines = lines[1:] # Cut in half by the block boundary
+        lines = [l for l in lines if l and not l.startswith(b'Date,')][-n:]
+        rows = [l.rstrip(b'\r').decode(errors='replace').split(',') for l in lines]
+        return pd.DataFrame([r for r in rows if len(r) == 5], columns=CSV_COLUMNS)
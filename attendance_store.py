@@ -0,0 +1,188 @@
+import csv
+import os
+import sqlite3
+import sys
+
+CSV_COLUMNS = ['Date', 'Time', 'Student_ID', 'Student_Name', 'Action']
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+class AttendanceStore:
+    """Storage backend for attendance events.
+
+    Events are (timestamp, student_id, student_name, action, model_version)
+    tuples, where timestamp is a datetime and model_version may be None.
+    Rows read back are
+    (date, time, student_id, student_name, action) strings, oldest first.
+    """
+    def write_events(self, events):
+        raise NotImplementedError
+
+    def read_events(self, start_date=None, end_date=None, student_id=None):
+        raise NotImplementedError
+
+    def sync(self):
+        """Force written events to disk"""
+
+    def close(self):
+        pass
+
+class CsvAttendanceStore(AttendanceStore):
+    """The classic attendance_log.csv, kept open in append mode.
+
+    The five CSV columns have no room for the model version of an event;
+    only the SQLite store records it. Use an attendance.db to audit which
+    model logged what (ModelWatcher's model_versions.csv dates each one).
+    """
+    def __init__(self, path):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a')
+        if new_file:
+            self.file.write(','.join(CSV_COLUMNS) + '\n')
+            self.file.flush()
+
+    def write_events(self, events):
+        self.file.write(''.join(
+            f"{ts:%Y-%m-%d},{ts:%H:%M:%S},{student_id},{student_name},{action}\n"
+            for ts, student_id, student_name, action, _ in events # Model version: SQLite only
+        ))
+        self.file.flush()
+
+    def read_events(self, start_date=None, end_date=None, student_id=None):
+        # A CSV has no index, this is always a full scan
+        with open(self.path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) != 5:
+                    continue
+                if start_date and row[0] < start_date:
+                    continue
+                if end_date and row[0] > end_date:
+                    continue
+                if student_id is not None and row[2] != str(student_id):
+                    continue
+                yield tuple(row)
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+class SqliteAttendanceStore(AttendanceStore):
+    """SQLite backend (WAL mode), indexed for per-day and per-student reports"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            student_id TEXT NOT NULL,
+            student_name TEXT,
+            action TEXT NOT NULL,
+            model_version INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_attendance_date_student ON attendance (date, student_id);
+        CREATE INDEX IF NOT EXISTS idx_attendance_student_timestamp ON attendance (student_id, timestamp);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # WAL lets report readers run while the recognizer keeps writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(attendance)")]
+        if 'model_version' not in columns:
+            # Databases created before hot model reload
+            self.conn.execute("ALTER TABLE attendance ADD COLUMN model_version INTEGER")
+        self.conn.commit()
+
+    def write_events(self, events):
+        rows = [(f"{ts:%Y-%m-%d}", f"{ts:%H:%M:%S}", f"{ts:%Y-%m-%d %H:%M:%S}",
+                 str(student_id), student_name, action, model_version)
+                for ts, student_id, student_name, action, model_version in events]
+        self._insert(rows)
+
+    def _insert(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO attendance (date, time, timestamp, student_id, student_name, action, model_version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def read_events(self, start_date=None, end_date=None, student_id=None):
+        query = "SELECT date, time, student_id, student_name, action FROM attendance"
+        where, params = [], []
+        if start_date:
+            where.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            where.append("date <= ?")
+            params.append(end_date)
+        if student_id is not None:
+            where.append("student_id = ?")
+            params.append(str(student_id))
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY timestamp, id"
+        yield from self.conn.execute(query, params)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+
+    def sync(self):
+        # Commits in WAL mode with synchronous=NORMAL are not fsynced, a checkpoint is
+        self.conn.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def close(self):
+        self.conn.close()
+
+def is_sqlite_path(path):
+    return path.lower().endswith(SQLITE_EXTENSIONS)
+
+def open_store(path):
+    """Pick the backend from the file name: *.db/*.sqlite -> SQLite, anything else -> CSV"""
+    if is_sqlite_path(path):
+        return SqliteAttendanceStore(path)
+    return CsvAttendanceStore(path)
+
+def migrate_csv_to_sqlite(csv_path, db_path, batch_size=10000, force=False):
+    """One-shot import of an existing attendance CSV into a SQLite store"""
+    store = SqliteAttendanceStore(db_path)
+    try:
+        if store.count() and not force:
+            print(f"[WARN] {db_path} already has {store.count()} records, not importing twice (use --force).")
+            return 0
+
+        imported = 0
+        batch = []
+        with open(csv_path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) != 5:
+                    print(f"Skipping malformed row: {row}")
+                    continue
+                date_str, time_str, student_id, student_name, action = row
+                batch.append((date_str, time_str, f"{date_str} {time_str}", student_id, student_name, action, None))
+                if len(batch) >= batch_size:
+                    store._insert(batch)
+                    imported += len(batch)
+                    batch = []
+        if batch:
+            store._insert(batch)
+            imported += len(batch)
+
+        print(f"[INFO] Imported {imported} records from {csv_path} into {db_path}")
+        return imported
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    # Usage: python attendance_store.py attendance_log.csv attendance.db [--force]
+    if len(sys.argv) < 3:
+        print("Usage: python attendance_store.py <attendance_log.csv> <attendance.db> [--force]")
+        sys.exit(1)
+    migrate_csv_to_sqlite(sys.argv[1], sys.argv[2], force='--force' in sys.argv[3:])
@@ -0,0 +1,166 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from attendance_store import open_store
+
+_STOP = object()
+# Tries of the last batch at close() before its events count as lost
+CLOSE_RETRIES = 3
+
+class AttendanceWriter:
+    """Writes attendance events to a store from a background thread.
+
+    log() only puts the event on an in-memory queue, so the video loop never
+    waits for the disk. The writer keeps the store open (CSV or SQLite,
+    chosen by file name) and writes events in batches, whenever `batch_size`
+    events are waiting or the oldest one is `flush_interval` seconds old.
+    close() drains everything still queued.
+
+    A batch the store fails to write (disk full, database locked...) is
+    reported and kept, and tried again with the next flush, so the writer
+    never stops while recognition goes on. Events still unwritten at
+    close() make it raise.
+
+    With `metrics` (a metrics.Metrics) the duration of every batch write is
+    recorded as the 'write' stage.
+    """
+    def __init__(self, attendance_file='attendance_log.csv', batch_size=50, flush_interval=1.0, fsync=False,
+                 metrics=None):
+        self.attendance_file = attendance_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.metrics = metrics
+        self.queue = queue.Queue()
+        self.events_written = 0
+        self.events_lost = 0
+        self.failing = False
+        self.closed = False
+        self.store = None # Only touched by the writer thread
+        self.thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        self.thread.start()
+
+    def log(self, student_id, student_name, action, timestamp=None, model_version=None):
+        """Queue one event, the timestamp defaults to now"""
+        if self.closed:
+            raise RuntimeError("AttendanceWriter is closed")
+        self.queue.put((timestamp or datetime.now(), student_id, student_name, action, model_version))
+
+    def close(self, timeout=None):
+        """Flush all queued events and stop the writer thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+        if self.events_lost:
+            raise RuntimeError(f"{self.events_lost} attendance events could not be written to {self.attendance_file}")
+
+    def _run(self):
+        # Created in this thread, SQLite connections must stay on the thread that opened them
+        try:
+            self.store = open_store(self.attendance_file)
+        except Exception as e:
+            # Opened again by the next write
+            print(f"[ERROR] Cannot open {self.attendance_file}, will retry: {e}")
+        try:
+            batch = []
+            deadline = None
+            while True:
+                timeout = max(0.0, deadline - time.monotonic()) if batch else None
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    # Drain whatever was queued before close()
+                    while True:
+                        try:
+                            item = self.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not _STOP:
+                            batch.append(item)
+                    for _ in range(CLOSE_RETRIES):
+                        if self._write(batch):
+                            return
+                        time.sleep(self.flush_interval)
+                    self.events_lost = len(batch)
+                    return
+
+                if item is not None:
+                    batch.append(item)
+                    if len(batch) == 1:
+                        deadline = time.monotonic() + self.flush_interval
+
+                if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                    if self._write(batch):
+                        batch = []
+                    else:
+                        # Kept, retried with the next flush
+                        deadline = time.monotonic() + self.flush_interval
+        finally:
+            if self.store is not None:
+                self.store.close()
+
+    def _write(self, batch):
+        """Write a batch, False (after reporting it) if the store failed"""
+        if not batch:
+            return True
+        start = time.perf_counter()
+        try:
+            if self.store is None:
+                self.store = open_store(self.attendance_file)
+            self.store.write_events(batch)
+        except Exception as e:
+            if not self.failing:
+                print(f"[ERROR] Writing {len(batch)} attendance events to {self.attendance_file} failed, "
+                      f"will retry: {e}")
+            self.failing = True
+            return False
+        if self.failing:
+            print(f"[INFO] Attendance events written to {self.attendance_file} again")
+            self.failing = False
+        self.events_written += len(batch)
+        if self.fsync:
+            try:
+                self.store.sync()
+            except Exception as e:
+                # The events are written, only not forced to disk yet
+                print(f"[WARN] Syncing {self.attendance_file} failed: {e}")
+        if self.metrics:
+            self.metrics.stage('write', time.perf_counter() - start)
+        return True
+
+# ---------------------------
+# One writer per file, shared by everything in the process
+# ---------------------------
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_writer(attendance_file='attendance_log.csv', **options):
+    """Return the process-wide writer for a file, creating it on first use"""
+    path = os.path.abspath(attendance_file)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None or writer.closed:
+            writer = _writers[path] = AttendanceWriter(attendance_file, **options)
+        return writer
+
+def close_all():
+    """Drain and close every writer (also runs at interpreter exit)"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        try:
+            writer.close()
+        except RuntimeError as e:
+            print(f"[ERROR] {e}")
+
+atexit.register(close_all)
@@ -0,0 +1,213 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+
+import runtime
+from attendance_writer import get_writer, close_all
+from face_detector import load_rois
+from model_watcher import ModelWatcher
+from presence_tracker import PresenceTracker
+from recognition_engine import DETECTOR_OPTIONS, PresenceAggregator, init_worker, recognize_frame
+from video_sources import IMAGE_EXTENSIONS
+
+class MediaInput:
+    """One recorded input (video file or image folder) and how its frames map to wall-clock time.
+
+    Video frames are stamped start + media position. Images get their
+    file modification time, unless a frame rate is given, in which case
+    they are spaced 1/fps apart from `start`.
+    """
+    def __init__(self, source_id, spec, start=None, fps=None):
+        self.source_id = source_id
+        self.spec = spec
+        self.is_folder = os.path.isdir(spec)
+        self.fps = fps
+        if self.is_folder:
+            self.paths = sorted(os.path.join(spec, f) for f in os.listdir(spec)
+                                if f.lower().endswith(IMAGE_EXTENSIONS))
+            self.frames = len(self.paths)
+            self.start = start
+            if fps and start is None:
+                self.start = os.path.getmtime(self.paths[0]) if self.paths else time.time()
+        else:
+            cap = cv2.VideoCapture(spec)
+            if not cap.isOpened():
+                raise IOError(f"Cannot open video {spec}")
+            self.frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or fps or 25.0
+            cap.release()
+            # Recorders close the file at the end: mtime - duration is when recording began
+            self.start = start if start is not None else os.path.getmtime(spec) - self.frames / self.fps
+
+    def chunks(self, chunk_frames):
+        """(source_id, spec, first, end, ...) jobs covering the whole input"""
+        for first in range(0, self.frames, chunk_frames):
+            end = min(first + chunk_frames, self.frames)
+            paths = self.paths[first:end] if self.is_folder else None
+            yield (self.source_id, self.spec, first, end, self.start, self.fps, paths)
+
+def _process_chunk(job, every_n=1):
+    """Worker: detect and recognize every `every_n`th frame of a chunk, no rendering.
+
+    Returns (source_id, first, [(timestamp, results), ...], frames_read, seconds).
+    """
+    source_id, spec, first, end, start, fps, paths = job
+    began = time.perf_counter()
+    timeline = []
+    frames_read = 0
+
+    if paths is not None:
+        for i, path in enumerate(paths):
+            frame_no = first + i
+            if frame_no % every_n:
+                continue
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            frames_read += 1
+            ts = start + frame_no / fps if fps else os.path.getmtime(path)
+            timeline.append((ts, recognize_frame(source_id, frame_no, frame)[2]))
+        return source_id, first, timeline, frames_read, time.perf_counter() - began
+
+    cap = cv2.VideoCapture(spec)
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    frame_no = first
+    while frame_no < end:
+        if frame_no % every_n:
+            # grab() skips the decode-to-BGR of frames we do not look at
+            if not cap.grab():
+                break
+            frame_no += 1
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames_read += 1
+        position = cap.get(cv2.CAP_PROP_POS_MSEC)
+        offset = position / 1000.0 if position > 0 else frame_no / fps
+        timeline.append((start + offset, recognize_frame(source_id, frame_no, frame)[2]))
+        frame_no += 1
+    cap.release()
+    return source_id, first, timeline, frames_read, time.perf_counter() - began
+
+def process(inputs, aggregator, model, workers=None, chunk_seconds=60, every_n=1,
+            detector_options=None, rois=None, preprocess=None):
+    """Run every input through the worker pool and feed the merged timeline to the aggregator.
+
+    Long inputs are cut into chunks of `chunk_seconds` that are processed
+    in parallel. Presence is decided in this process only, over the
+    detections of all inputs in media-time order, so chunk borders and
+    overlapping cameras behave like one live run.
+    """
+    options = dict(DETECTOR_OPTIONS, **(detector_options or {}))
+    jobs = []
+    for media in inputs:
+        rate = media.fps or 1.0
+        jobs.extend(media.chunks(max(every_n, int(chunk_seconds * rate))))
+
+    workers = workers or max(1, os.cpu_count() or 1)
+    timeline = []
+    frames = 0
+    began = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=((model.version, model.trainer_path), options, rois or {},
+                                       False, preprocess)) as pool:
+        futures = [pool.submit(_process_chunk, job, every_n) for job in jobs]
+        for done, future in enumerate(futures, 1):
+            source_id, first, chunk, frames_read, seconds = future.result()
+            frames += frames_read
+            timeline.extend((ts, source_id, results) for ts, results in chunk)
+            print(f"[INFO] chunk {done}/{len(jobs)}: source {source_id} from frame {first}, "
+                  f"{frames_read} frames in {seconds:.1f}s")
+
+    elapsed = time.perf_counter() - began
+    timeline.sort(key=lambda item: (item[0], item[1]))
+    for ts, source_id, results in timeline:
+        aggregator.update(source_id, results, now=ts)
+    if timeline:
+        aggregator.tick(timeline[-1][0] + aggregator.presence.exit_delay + 1e-3)
+    aggregator.close()
+    return frames, elapsed
+
+def parse_time(text):
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timestamp()
+
+def main():
+    config = runtime.config()
+    recognition = config['recognition']
+    parser = argparse.ArgumentParser(description="Headless attendance from recorded video files and image folders")
+    parser.add_argument('inputs', nargs='+', help="Video files or image folders")
+    parser.add_argument('--start', default=None,
+                        help="Wall-clock time of the first frame, 'YYYY-MM-DD HH:MM:SS' "
+                             "(default: video mtime minus duration, image mtimes)")
+    parser.add_argument('--fps', type=float, default=None,
+                        help="Frame rate of image folders (with --start), instead of file times")
+    parser.add_argument('--workers', type=int, default=config['workers']['recognition'],
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-seconds', type=float, default=60,
+                        help="Media seconds per parallel chunk")
+    parser.add_argument('--every-n', type=int, default=1, help="Only process every n-th frame")
+    parser.add_argument('--downscale', type=float, default=1.0,
+                        help="Run face detection on a frame this many times smaller")
+    parser.add_argument('--rois', default=runtime.path('rois'), help="JSON file with detection ROI polygons per source")
+    parser.add_argument('--exit-delay', type=float, default=recognition['exit_delay'])
+    parser.add_argument('--min-dwell', type=float, default=recognition['min_dwell'])
+    parser.add_argument('--enter-confidence', type=float, default=recognition['enter_confidence'])
+    parser.add_argument('--stay-confidence', type=float, default=recognition['stay_confidence'])
+    parser.add_argument('--attendance', default=runtime.path('attendance'),
+                        help="Attendance log, a .db/.sqlite name selects the SQLite store")
+    args = parser.parse_args()
+
+    trainer_path, map_file = runtime.path('trainer'), runtime.path('name_map')
+    if not os.path.exists(trainer_path):
+        print(f"[ERROR] Trainer file '{trainer_path}' not found. Please run train_model.py first.")
+        return
+    if not os.path.exists(map_file):
+        print(f"[ERROR] Name map file '{map_file}' not found. Please run combined_enrollment.py first.")
+        return
+    # A frozen snapshot: retraining during a long reprocessing run does not mix models
+    model = ModelWatcher(trainer_path, map_file).load_now()
+
+    face_db = runtime.face_database()
+    name_to_id = dict(face_db.id_by_name) if face_db else {}
+
+    start = parse_time(args.start) if args.start else None
+    inputs = []
+    rois = {}
+    for i, spec in enumerate(args.inputs):
+        media = MediaInput(i, spec, start, args.fps)
+        inputs.append(media)
+        if media.start is None:
+            print(f"[INFO] Input {i}: {spec}, {media.frames} images (stamped with their file times)")
+        else:
+            print(f"[INFO] Input {i}: {spec}, {media.frames} frames from "
+                  f"{datetime.fromtimestamp(media.start):%Y-%m-%d %H:%M:%S}")
+        polygons = load_rois(spec, args.rois)
+        if polygons:
+            rois[i] = polygons
+
+    writer = get_writer(args.attendance)
+    def log_attendance(student_id, student_name, action, timestamp=None, model_version=None):
+        writer.log(student_id, student_name, action, timestamp, model_version)
+        print(f"📝 {action}: {student_name} ({student_id}) at {timestamp:%Y-%m-%d %H:%M:%S}")
+
+    presence = PresenceTracker(exit_delay=args.exit_delay, min_dwell=args.min_dwell,
+                               enter_confidence=args.enter_confidence,
+                               stay_confidence=args.stay_confidence)
+    aggregator = PresenceAggregator(model.names, name_to_id, log_attendance, presence)
+    aggregator.set_model(model.version, model.names)
+
+    frames, elapsed = process(inputs, aggregator, model, args.workers, args.chunk_seconds, args.every_n,
+                              dict(runtime.detector_options('live'), downscale=args.downscale), rois,
+                              runtime.config()['preprocess'])
+    close_all()
+    rate = frames / elapsed if elapsed > 0 else 0.0
+    print(f"[INFO] Processed {frames} frames in {elapsed:.1f}s ({rate:.1f} fps), model v{model.version}")
+
+if __name__ == "__main__":
+    main()
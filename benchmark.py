@@ -0,0 +1,395 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+import runtime
+import train_model
+from attendance_report import IncrementalReport
+from attendance_writer import AttendanceWriter
+from face_detector import FaceDetector
+from lbph_batch import LBPHBatch
+from recognition_engine import DETECTOR_OPTIONS
+from view_attendance import view_attendance
+
+RESULTS_VERSION = 1
+
+# detectMultiScale settings in use across the scripts
+DETECTOR_SETTINGS = {
+    'enroll_encode_log': {'scale_factor': 1.1, 'min_neighbors': 4},  # combined_enrollment, encode_face, attendance_logger
+    'engine': dict(DETECTOR_OPTIONS),                                # recognition_engine, recog_face, batch_process
+    'train': {'scale_factor': 1.1, 'min_neighbors': 3},              # train_model (--redetect / full frames)
+}
+
+def percentiles(samples):
+    """Latency summary (milliseconds) of a list of durations in seconds"""
+    if not samples:
+        return {'count': 0}
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {'count': len(ms), 'mean_ms': round(float(ms.mean()), 3), 'p50_ms': round(float(p50), 3),
+            'p90_ms': round(float(p90), 3), 'p99_ms': round(float(p99), 3), 'max_ms': round(float(ms.max()), 3)}
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+# ---------------------------
+# Synthetic fixtures
+# ---------------------------
+def synthetic_face(identity, size, rng):
+    """Grayscale cartoon face the Haar cascade detects; features depend on `identity`"""
+    shape = np.random.default_rng(identity)
+    tone, eye_gap, mouth_w = shape.integers(150, 210), shape.uniform(0.13, 0.19), shape.uniform(0.10, 0.18)
+    img = np.zeros((size, size), np.uint8)
+    c = size // 2
+    thickness = max(1, size // 40)
+    cv2.ellipse(img, (c, c), (int(size * 0.36), int(size * 0.46)), 0, 0, 360, int(tone), -1)
+    for side in (-1, 1):
+        dark = int(rng.integers(40, 70))
+        cv2.ellipse(img, (c + side * int(size * eye_gap), int(size * 0.40)),
+                    (int(size * 0.08), int(size * 0.04)), 0, 0, 360, dark, -1)
+        cv2.line(img, (c + side * int(size * 0.08), int(size * 0.31)),
+                 (c + side * int(size * 0.26), int(size * 0.30)), dark, thickness)
+    cv2.line(img, (c, int(size * 0.42)), (c - size // 20, int(size * 0.6)), int(rng.integers(100, 140)), thickness)
+    cv2.ellipse(img, (c, int(size * 0.72)), (int(size * mouth_w), int(size * 0.05)),
+                0, 0, 360, int(rng.integers(60, 100)), -1)
+    noise = rng.normal(0, 4, img.shape)
+    return cv2.GaussianBlur(np.clip(img + noise, 0, 255).astype(np.uint8), (0, 0), size / 60)
+
+def synthetic_frames(count, width=640, height=480, faces=2, identities=5, seed=0):
+    """BGR frames with `faces` synthetic faces each on a textured background"""
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(60, 120, (height, width), dtype=np.uint8), (0, 0), 8)
+    for _ in range(count):
+        gray = background.copy()
+        slots = np.array_split(np.arange(width), max(1, faces))
+        for slot in slots[:faces]:
+            size = int(rng.integers(max(48, height // 5), max(49, min(height // 2, len(slot)))))
+            x = int(rng.integers(slot[0], max(slot[0] + 1, slot[-1] - size)))
+            y = int(rng.integers(0, height - size))
+            gray[y:y+size, x:x+size] = synthetic_face(int(rng.integers(identities)), size, rng)
+        yield cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+def video_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    try:
+        while count is None or count > 0:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+            if count is not None:
+                count -= 1
+    finally:
+        cap.release()
+
+def write_dataset(path, identities, samples, size=100, seed=0):
+    """User.<id>.<n>.jpg crops as combined_enrollment.py writes them"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(path, exist_ok=True)
+    for face_id in range(1, identities + 1):
+        for n in range(1, samples + 1):
+            cv2.imwrite(os.path.join(path, f"User.{face_id}.{n}.jpg"), synthetic_face(face_id, size, rng))
+
+def write_attendance_log(path, rows, students=50, seed=0):
+    """Attendance CSV with ENTRY/EXIT pairs spread over consecutive days"""
+    rng = np.random.default_rng(seed)
+    ts = datetime(2024, 1, 1, 8, 0, 0)
+    with open(path, 'w', newline='') as f:
+        f.write("Date,Time,Student_ID,Student_Name,Action\n")
+        for i in range(rows):
+            sid = int(rng.integers(1, students + 1))
+            ts += timedelta(seconds=int(rng.integers(1, 30)))
+            action = 'ENTRY' if i % 2 == 0 else 'EXIT'
+            f.write(f"{ts:%Y-%m-%d},{ts:%H:%M:%S},{sid},Student{sid},{action}\n")
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+def bench_frames(frames, recognizer, engine_options, preprocessor, warmup=3):
+    """Per-stage latencies over the frames, plus the full detect+recognize path"""
+    detectors = {name: FaceDetector(**options) for name, options in DETECTOR_SETTINGS.items()}
+    engine = FaceDetector(**engine_options)
+    stages = {'cvtColor': []}
+    stages.update({f"detect[{name}]": [] for name in detectors})
+    stages['preprocess'] = []
+    stages['predict'] = []
+    frame_latency = []
+    faces_found = 0
+
+    for i, frame in enumerate(frames):
+        record = i >= warmup
+        gray, seconds = timed(cv2.cvtColor, frame, cv2.COLOR_BGR2GRAY)
+        if record:
+            stages['cvtColor'].append(seconds)
+        for name, detector in detectors.items():
+            _, seconds = timed(detector.detect, gray)
+            if record:
+                stages[f"detect[{name}]"].append(seconds)
+
+        # The whole per-frame path of the recognition workers
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        boxes = engine.detect(gray)
+        faces, seconds = timed(preprocessor.faces, gray, boxes)
+        if record and len(boxes):
+            stages['preprocess'].append(seconds / len(boxes))
+        for face in faces:
+            _, seconds = timed(recognizer.predict, face)
+            if record:
+                stages['predict'].append(seconds)
+        if record:
+            frame_latency.append(time.perf_counter() - start)
+            faces_found += len(boxes)
+
+    total = sum(frame_latency)
+    results = {name: percentiles(samples) for name, samples in stages.items()}
+    results['frame'] = percentiles(frame_latency)
+    results['frame']['fps'] = round(len(frame_latency) / total, 2) if total > 0 else 0.0
+    results['frame']['faces_per_frame'] = round(faces_found / len(frame_latency), 2) if frame_latency else 0.0
+    return results
+
+def bench_predict_only(recognizer, crops):
+    """LBPH predict on fixed crops, independent of what the detector finds"""
+    samples = [timed(recognizer.predict, crop)[1] for crop in crops]
+    return percentiles(samples)
+
+def bench_lbph_batch(recognizer, crops, batch_sizes=(1, 4, 16, 64), repeats=3):
+    """Per-face cost of one predict() per crop vs LBPHBatch.predict() on batches, and their agreement"""
+    engine = LBPHBatch.from_recognizer(recognizer)
+    results = {'samples': len(engine)}
+    for size in batch_sizes:
+        batch = [crops[i % len(crops)] for i in range(size)]
+        expected, cv2_s = min((timed(lambda: [recognizer.predict(c) for c in batch]) for _ in range(repeats)),
+                              key=lambda r: r[1])
+        predicted, batch_s = min((timed(engine.predict, batch) for _ in range(repeats)), key=lambda r: r[1])
+        results[f"batch_{size}"] = {
+            'predict_ms_per_face': round(cv2_s * 1000 / size, 3),
+            'batch_ms_per_face': round(batch_s * 1000 / size, 3),
+            'speedup': round(cv2_s / batch_s, 2) if batch_s > 0 else 0.0,
+            'labels_match': all(e[0] == p[0] for e, p in zip(expected, predicted)),
+            'max_confidence_diff': float(max(abs(e[1] - p[1]) for e, p in zip(expected, predicted))),
+        }
+    return results
+
+def bench_logging(workdir, events):
+    """log() call latency (what the video loop pays) and write-out time per store"""
+    results = {}
+    for store in ('csv', 'sqlite'):
+        path = os.path.join(workdir, 'bench_attendance.csv' if store == 'csv' else 'bench_attendance.db')
+        writer = AttendanceWriter(path)
+        calls = []
+        start = time.perf_counter()
+        for i in range(events):
+            _, seconds = timed(writer.log, i % 50, f"Student{i % 50}", 'ENTRY' if i % 2 == 0 else 'EXIT')
+            calls.append(seconds)
+        writer.close()
+        total = time.perf_counter() - start
+        results[store] = {'log_call': percentiles(calls), 'events': events,
+                          'drain_s': round(total, 4), 'events_per_s': round(events / total, 1) if total > 0 else 0.0}
+    return results
+
+def bench_training(workdir, identities, samples, workers):
+    dataset = os.path.join(workdir, 'dataset')
+    _, write_s = timed(write_dataset, dataset, identities, samples)
+    with contextlib.redirect_stdout(io.StringIO()):
+        (faces, ids), load_s = timed(train_model.getImagesAndLabels, dataset, workers)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    _, train_s = timed(recognizer.train, faces, np.array(ids))
+    result = {'identities': identities, 'samples_per_identity': samples, 'images': identities * samples,
+              'faces': len(faces), 'workers': workers, 'dataset_write_s': round(write_s, 4),
+              'load_s': round(load_s, 4), 'train_s': round(train_s, 4), 'total_s': round(load_s + train_s, 4)}
+    return result, recognizer, faces
+
+def bench_report(workdir, rows, append_rows):
+    """Cold and incremental IncrementalReport updates, and the full view_attendance() run"""
+    log_file = os.path.join(workdir, 'attendance_log.csv')
+    _, write_s = timed(write_attendance_log, log_file, rows)
+    report = IncrementalReport(log_file)
+    _, cold_s = timed(report.update)
+    report.save_state()
+
+    with open(log_file, 'a', newline='') as f:
+        for i in range(append_rows):
+            f.write(f"2030-01-01,12:00:{i % 60:02d},{i % 50},Student{i % 50},{'ENTRY' if i % 2 == 0 else 'EXIT'}\n")
+    report = IncrementalReport(log_file)
+    _, incremental_s = timed(report.update)
+    report.save_state()
+
+    # view_attendance() writes attendance_summary.csv into the working directory
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, view_s = timed(view_attendance, log_file, True)
+    finally:
+        os.chdir(cwd)
+    return {'rows': rows, 'appended_rows': append_rows, 'log_write_s': round(write_s, 4),
+            'cold_update_s': round(cold_s, 4), 'incremental_update_s': round(incremental_s, 4),
+            'view_attendance_rebuild_s': round(view_s, 4)}
+
+def environment():
+    return {'python': platform.python_version(), 'opencv': cv2.__version__, 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'opencv_threads': cv2.getNumThreads()}
+
+# ---------------------------
+# Regression check
+# ---------------------------
+def _metrics(results, prefix=''):
+    """Flatten to {'frames.frame.p50_ms': value, ...} keeping only timings"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_metrics(value, name + '.'))
+        elif isinstance(value, (int, float)) and (key.endswith('_ms') or key.endswith('_s')):
+            flat[name] = value
+    return flat
+
+# Single worst samples and fixture generation are too noisy to gate on
+_NOT_COMPARED = ('max_ms', 'dataset_write_s', 'log_write_s')
+
+def compare(results, baseline, tolerance, min_delta_ms=0.5):
+    """Timings more than `tolerance` (fraction) and `min_delta_ms` slower than the baseline"""
+    current, previous = _metrics(results), _metrics(baseline)
+    regressions = []
+    for name, before in sorted(previous.items()):
+        after = current.get(name)
+        if after is None or before <= 0 or name.endswith(_NOT_COMPARED):
+            continue
+        delta_ms = (after - before) * (1 if name.endswith('_ms') else 1000)
+        if after > before * (1 + tolerance) and delta_ms >= min_delta_ms:
+            regressions.append((name, before, after))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera-free benchmark of detection, recognition, logging, "
+                                                 "training and reporting")
+    parser.add_argument('--video', default=None, help="Fixture video instead of generated frames")
+    parser.add_argument('--frames', type=int, default=100, help="Frames to time (all of --video if 0)")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--faces', type=int, default=2, help="Faces per generated frame")
+    parser.add_argument('--trainer', default=None,
+                        help="Use this trainer.yml for predict (default: the model trained on the synthetic dataset)")
+    parser.add_argument('--identities', type=int, default=10, help="Identities in the synthetic training set")
+    parser.add_argument('--samples', type=int, default=30, help="Images per identity in the synthetic training set")
+    parser.add_argument('--workers', type=int, default=None, help="Loader processes for training (default: CPU count)")
+    parser.add_argument('--report-rows', type=int, default=100000, help="Rows in the synthetic attendance log")
+    parser.add_argument('--append-rows', type=int, default=1000, help="Rows appended before the incremental report")
+    parser.add_argument('--log-events', type=int, default=5000, help="Events written per attendance store")
+    parser.add_argument('--skip', nargs='*', default=[], choices=['frames', 'lbph', 'logging', 'training', 'report'])
+    parser.add_argument('--output', default=None, help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', default=None, help="Earlier --output file to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Slowdown over the baseline reported as a regression (0.2 = 20%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help="Ignore slowdowns smaller than this in absolute terms")
+    args = parser.parse_args()
+
+    results = {'version': RESULTS_VERSION, 'created': datetime.now().isoformat(sep=' ', timespec='seconds'),
+               'environment': environment(), 'settings': vars(args).copy()}
+    workdir = tempfile.mkdtemp(prefix='face_bench_')
+    try:
+        workers = args.workers or os.cpu_count() or 1
+        recognizer = None
+        crops = []
+        needs_model = 'frames' not in args.skip or 'lbph' not in args.skip
+        if 'training' not in args.skip or (args.trainer is None and needs_model):
+            training, recognizer, crops = bench_training(workdir, args.identities, args.samples, workers)
+            print(f"[BENCH] training: {training['images']} images, load {training['load_s']:.2f}s, "
+                  f"train {training['train_s']:.2f}s")
+            if 'training' not in args.skip:
+                results['training'] = training
+
+        if args.trainer and needs_model:
+            recognizer = cv2.face.LBPHFaceRecognizer_create()
+            recognizer.read(args.trainer)
+
+        if 'frames' not in args.skip:
+            if args.video:
+                frames = list(video_frames(args.video, args.frames or None))
+                source = args.video
+            else:
+                frames = list(synthetic_frames(args.frames, args.width, args.height, args.faces, args.identities))
+                source = 'synthetic'
+            if not frames:
+                print(f"[ERROR] No frames read from {source}")
+                return 1
+            stages = bench_frames(frames, recognizer, DETECTOR_SETTINGS['engine'], runtime.preprocessor())
+            stages['predict_fixed'] = bench_predict_only(recognizer, crops[:200] or
+                                                         [synthetic_face(1, 100, np.random.default_rng(0))])
+            stages['source'] = source
+            stages['resolution'] = f"{frames[0].shape[1]}x{frames[0].shape[0]}"
+            results['frames'] = stages
+            for name, s in stages.items():
+                if isinstance(s, dict) and s.get('count'):
+                    print(f"[BENCH] {name}: p50 {s['p50_ms']}ms, p90 {s['p90_ms']}ms, p99 {s['p99_ms']}ms")
+            print(f"[BENCH] full frame: {stages['frame'].get('fps', 0)} fps, "
+                  f"{stages['frame'].get('faces_per_frame', 0)} faces/frame")
+
+        if 'lbph' not in args.skip:
+            results['lbph'] = bench_lbph_batch(recognizer, crops[:200] or
+                                               [synthetic_face(1, 100, np.random.default_rng(0))])
+            for name, s in results['lbph'].items():
+                if isinstance(s, dict):
+                    print(f"[BENCH] lbph {name}: predict {s['predict_ms_per_face']}ms/face, "
+                          f"batch {s['batch_ms_per_face']}ms/face ({s['speedup']}x, "
+                          f"labels match: {s['labels_match']})")
+
+        if 'logging' not in args.skip:
+            results['logging'] = bench_logging(workdir, args.log_events)
+            for store, s in results['logging'].items():
+                print(f"[BENCH] logging ({store}): log() p99 {s['log_call']['p99_ms']}ms, "
+                      f"{s['events_per_s']:.0f} events/s written")
+
+        if 'report' not in args.skip:
+            results['report'] = bench_report(workdir, args.report_rows, args.append_rows)
+            r = results['report']
+            print(f"[BENCH] report: {r['rows']} rows, cold {r['cold_update_s']:.2f}s, "
+                  f"incremental {r['incremental_update_s']:.3f}s, view_attendance {r['view_attendance_rebuild_s']:.2f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Results written to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        ignored = ('output', 'baseline', 'tolerance', 'min_delta_ms', 'skip')
+        changed = sorted(key for key, value in results['settings'].items()
+                         if key not in ignored and baseline.get('settings', {}).get(key) != value)
+        if changed:
+            print(f"[WARN] The baseline was run with different settings ({', '.join(changed)}), "
+                  f"timings are not directly comparable")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for name, before, after in regressions:
+            print(f"[WARN] {name}: {before} -> {after} ({(after / before - 1) * 100:+.0f}%)")
+        if regressions:
+            print(f"[WARN] {len(regressions)} timing(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+        print(f"[INFO] No regressions over {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
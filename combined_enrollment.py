@@ -1,95 +1,109 @@
 import cv2
-import os
 import time
-import json
 
-DATASET_PATH = 'dataset'
-MAP_FILE = 'id_to_name_map.json'
-
-# --- Create dataset folder if it doesn't exist ---
-if not os.path.exists(DATASET_PATH):
-    os.makedirs(DATASET_PATH)
-
-# --- Load existing ID-to-Name map or create new one ---
-if os.path.exists(MAP_FILE):
-    with open(MAP_FILE, 'r') as f:
-        id_to_name_map = json.load(f)
-else:
-    id_to_name_map = {} # Use strings for JSON keys
-
-# Ensure '0' is always 'None' or 'Unknown' for the recognizer
-if '0' not in id_to_name_map:
-    id_to_name_map['0'] = "None" 
-
-print("=== Combined Enrollment System ===")
-print(f"Current mappings: {id_to_name_map}")
-
-# --- Get both inputs from the user ---
-name_and_id = input("Enter the Name_ID (e.g., Jit_101): ").strip()
-numeric_id = input(f"Enter the Numeric ID for {name_and_id.split('_')[0]} (e.g., 1, 2, 3...): ").strip()
-name = name_and_id.split('_')[0]
-
-if numeric_id in id_to_name_map and id_to_name_map[numeric_id] != name:
-    print(f"[WARNING] Numeric ID {numeric_id} is already assigned to {id_to_name_map[numeric_id]}.")
-    print("Please use a different numeric ID or clear the map file.")
-    exit()
-
-# --- Add to map and save ---
-id_to_name_map[numeric_id] = name
-with open(MAP_FILE, 'w') as f:
-    json.dump(id_to_name_map, f, indent=4)
-print(f"Updated map: {id_to_name_map}")
-
-
-# --- Create folder for encode_face.py ---
-person_folder = os.path.join(DATASET_PATH, name_and_id)
-if not os.path.exists(person_folder):
-    os.makedirs(person_folder)
-print(f"Saving images for '{name_and_id}' (Numeric ID: {numeric_id})")
-
-# --- Initialize camera ---
-cap = cv2.VideoCapture(0)
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-
-print("Taking 30 photos. Look at the camera and move slightly...")
-count = 0
-max_images = 30 
-
-while count < max_images:
-    ret, frame = cap.read()
-    if not ret: break
+import lbph_model
+import runtime
+from dataset_manifest import open_manifest
+from enrollment_quality import EnrollmentSelector
+
+def main():
+    dataset_path = runtime.path('dataset')
+    map_file = runtime.path('name_map')
+
+    # --- Every sample and identity is recorded in the manifest ---
+    manifest = open_manifest(runtime.path('manifest'), dataset_path, map_file)
+    id_to_name_map = manifest.names()
+
+    print("=== Combined Enrollment System ===")
+    print(f"Current mappings: {id_to_name_map}")
+
+    # --- Get both inputs from the user ---
+    name_and_id = input("Enter the Name_ID (e.g., Jit_101): ").strip()
+    numeric_id = input(f"Enter the Numeric ID for {name_and_id.split('_')[0]} (e.g., 1, 2, 3...): ").strip()
+    name = name_and_id.split('_')[0]
+
+    # --- Add to the manifest and regenerate the map from it ---
+    try:
+        with manifest.transaction():
+            manifest.add_identity(numeric_id, name, name_and_id)
+    except ValueError as e:
+        print(f"[WARNING] {e}.")
+        print("Please use a different numeric ID or delete that user first.")
+        manifest.close()
+        return
+    manifest.write_name_map(map_file)
+    print(f"Updated map: {manifest.names()}")
+    print(f"Saving images for '{name_and_id}' (Numeric ID: {numeric_id})")
+
+    # --- Initialize camera ---
+    cap = runtime.open_camera()
+    face_detector = runtime.detector('enroll')
+    preprocessor = runtime.preprocessor()
+
+    # Only sharp, well exposed crops that differ from the ones already kept are saved
+    selector = EnrollmentSelector.from_config(runtime.config()['enrollment'])
+    count = 0
+    max_images = selector.target
+    print(f"Taking up to {max_images} photos. Look at the camera and turn your head slowly...")
+    new_faces = []
+    started = time.time()
+    reason = None
+
+    while not selector.done():
+        ret, frame = cap.read()
+        if not ret: break
     
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = face_detector.detect(gray)
     
-    display_frame = frame.copy()
+        display_frame = frame.copy()
     
-    for (x, y, w, h) in faces:
-        cv2.rectangle(display_frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-        cv2.putText(display_frame, f'Photos: {count+1}/{max_images}', (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        # Auto-capture
+        if len(faces) == 1:
+            # The face with its margin is saved, train_model.py normalizes it like recognition does
+            face_roi_gray = preprocessor.crop(gray, faces[0])
+            accepted, reason = selector.consider(face_roi_gray)
+        
+            if accepted:
+                count += 1
+            
+                # Both formats are saved and recorded together (after earlier
+                # enrollments of the same person, numbering continues)
+                with manifest.transaction():
+                    manifest.write_sample(numeric_id, 'frame', frame)      # for encode_face.py
+                    crop_path = manifest.write_sample(numeric_id, 'crop', face_roi_gray)  # for train_model.py
+                # The model gets the sample as training will read it back (after JPEG)
+                new_faces.append(preprocessor.normalize(cv2.imread(crop_path, cv2.IMREAD_GRAYSCALE)).copy())
+
+                print(f"Saved image {count}/{max_images}")
+        elif len(faces) > 1:
+            reason = 'one face only'
     
-    cv2.imshow('Enrollment', display_frame)
+        for (x, y, w, h) in faces:
+            cv2.rectangle(display_frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        cv2.putText(display_frame, f'Photos: {count}/{max_images}', (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        if reason:
+            cv2.putText(display_frame, reason, (10, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
     
-    # Auto-capture
-    if len(faces) == 1:
-        (x, y, w, h) = faces[0]
-        face_roi_gray = gray[y:y+h, x:x+w]
-        
-        count += 1
-        
-        # Save format 1 (for encode_face.py)
-        cv2.imwrite(f"{person_folder}/img_{count}.jpg", frame)
-        
-        # Save format 2 (for train_model.py)
-        cv2.imwrite(f"{DATASET_PATH}/User.{numeric_id}.{count}.jpg", face_roi_gray)
-
-        print(f"Saved image {count}/{max_images}")
-        time.sleep(0.5) 
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-print(f"Enrollment completed! Saved {count} images.")
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+        cv2.imshow('Enrollment', display_frame)
+
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    print(f"Enrollment completed! Saved {count} images in {time.time() - started:.1f}s.")
+    if selector.rejected:
+        print(f"[INFO] Skipped frames: {selector.rejected}")
+    cap.release()
+    cv2.destroyAllWindows()
+    manifest.close()
+
+    # --- Add the new samples to the recognizer (no full retrain needed) ---
+    if new_faces:
+        start = time.time()
+        total = lbph_model.add_samples(new_faces, [int(numeric_id)] * len(new_faces), runtime.path('trainer'))
+        print(f"[INFO] Recognizer updated in {time.time() - start:.2f}s ({total} samples in the model).")
+        print("Run train_model.py --check now and then to verify the model against a full retrain.")
+
+if __name__ == "__main__":
+    main()
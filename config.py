@@ -0,0 +1,110 @@
+import copy
+import json
+import os
+import sys
+
+CONFIG_FILE = 'config.json'
+# Overrides the config file location, e.g. one config per door
+CONFIG_ENV = 'FACE_ACCESS_CONFIG'
+
+DEFAULTS = {
+    'paths': {
+        'dataset': 'dataset',
+        'trainer': 'trainer/trainer.yml',
+        'name_map': 'id_to_name_map.json',
+        'face_db': 'face_database',
+        'legacy_face_db': 'face_database.pkl',
+        'attendance': 'attendance_log.csv',
+        'attendance_summary': 'attendance_summary.csv',
+        'rois': 'detection_rois.json',
+        'metrics': 'metrics.json',
+        'feature_cache': 'feature_cache.db',
+        'manifest': 'dataset_manifest.db',
+    },
+    'camera': {
+        'index': 0,
+        'width': 640,
+        'height': 480,
+    },
+    # FaceDetector options per use: enrollment/encoding, the live loop, training re-detection
+    'detector': {
+        'enroll': {'scale_factor': 1.1, 'min_neighbors': 4},
+        'live': {'scale_factor': 1.2, 'min_neighbors': 5, 'min_size_ratio': 0.1},
+        'train': {'scale_factor': 1.1, 'min_neighbors': 3},
+    },
+    # Face crops given to LBPH: the box plus `margin` (saved at enrollment),
+    # resized to size x size and optionally equalized ('hist' or 'clahe') for
+    # training and recognition. Retrain after changing size or equalize,
+    # re-enroll after changing margin.
+    'preprocess': {
+        'size': 100,
+        'margin': 0.0,
+        'equalize': None,
+    },
+    'recognition': {
+        'enter_confidence': 80,
+        'stay_confidence': 100,
+        'exit_delay': 5.0,
+        'min_dwell': 0.5,
+    },
+    # Capture stops at `samples` good, distinct crops, or after `patience`
+    # seconds without a new one once `min_samples` are in (enrollment_quality.py)
+    'enrollment': {
+        'samples': 20,
+        'min_samples': 10,
+        'patience': 3.0,
+        'min_face_size': 80,
+        'min_sharpness': 40.0,
+        'brightness': [50, 205],
+        'max_clipped': 0.2,
+        'min_distance': 6,
+    },
+    # None = decided from the CPU count
+    'workers': {
+        'recognition': None,
+        'training': None,
+    },
+}
+
+def _merge(base, override):
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+def config_path():
+    return os.environ.get(CONFIG_ENV, CONFIG_FILE)
+
+def load_config(path=None):
+    """DEFAULTS with the values of the config file (if any) on top.
+
+    The file only needs the settings that differ from the defaults:
+        {"camera": {"index": 1}, "paths": {"attendance": "attendance.db"}}
+    """
+    path = path or config_path()
+    config = copy.deepcopy(DEFAULTS)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            overrides = json.load(f)
+        unknown = sorted(set(overrides) - set(DEFAULTS))
+        if unknown:
+            print(f"[WARN] {path}: unknown section(s) {unknown} ignored")
+        _merge(config, {k: v for k, v in overrides.items() if k in DEFAULTS})
+    return config
+
+def write_config(path=None, config=None):
+    """Write a config file, by default a full copy of DEFAULTS to edit"""
+    path = path or config_path()
+    with open(path, 'w') as f:
+        json.dump(config or DEFAULTS, f, indent=4)
+    return path
+
+if __name__ == "__main__":
+    # Usage: python config.py [config.json]   (writes the defaults, or prints the effective config)
+    path = sys.argv[1] if len(sys.argv) > 1 else config_path()
+    if os.path.exists(path):
+        print(json.dumps(load_config(path), indent=4))
+    else:
+        print(f"[INFO] Wrote the default configuration to {write_config(path)}")
@@ -0,0 +1,334 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import cv2
+
+MANIFEST_FILE = 'dataset_manifest.db'
+DATASET_PATH = 'dataset'
+MAP_FILE = 'id_to_name_map.json'
+# 'crop': dataset/User.<numeric>.<n>.jpg face crops for train_model.py
+# 'frame': dataset/<Name_ID>/img_<n>.jpg full frames for encode_face.py
+FORMATS = ('crop', 'frame')
+
+_CROP_NAME = re.compile(r'^User\.(\d+)\.(\d+)\.\w+$')
+_FRAME_NAME = re.compile(r'^img_(\d+)\.\w+$')
+
+def checksum(data):
+    return hashlib.sha1(data).hexdigest()
+
+def file_checksum(path):
+    with open(path, 'rb') as f:
+        return checksum(f.read())
+
+class DatasetManifest:
+    """Every dataset sample, the identity it belongs to, its format and checksum, in SQLite.
+
+    Identities are keyed by the numeric LBPH label and carry the name and
+    the Name_ID folder of the frames. Tools ask the manifest for the
+    samples they need instead of listing dataset/, so per-user work only
+    touches that user's rows (indexed by label). Changes go through
+    transaction(), and the name map is written from the manifest, which
+    keeps the map, the dataset and the models in step.
+    """
+    def __init__(self, path=MANIFEST_FILE, dataset_path=DATASET_PATH):
+        self.path = path
+        self.dataset_path = dataset_path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS identities (
+                numeric_id INTEGER PRIMARY KEY, name TEXT NOT NULL, folder TEXT, student_id TEXT,
+                created TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS samples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                numeric_id INTEGER NOT NULL REFERENCES identities(numeric_id),
+                format TEXT NOT NULL, n INTEGER NOT NULL, path TEXT NOT NULL UNIQUE,
+                checksum TEXT NOT NULL, size INTEGER NOT NULL, added TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS idx_samples_identity ON samples (numeric_id, format);
+        """)
+        self.conn.commit()
+
+    @classmethod
+    def open_existing(cls, path=MANIFEST_FILE, dataset_path=DATASET_PATH):
+        """The manifest if there is one, else None (the caller falls back to scanning)"""
+        return cls(path, dataset_path) if os.path.exists(path) else None
+
+    @contextmanager
+    def transaction(self):
+        """Commit everything done inside at once, or nothing on an exception"""
+        with self.conn:
+            yield self
+
+    def close(self):
+        self.conn.close()
+
+    # ---------------------------
+    # Identities
+    # ---------------------------
+    def identities(self):
+        """[(numeric_id, name, folder, student_id), ...] in label order"""
+        return self.conn.execute(
+            "SELECT numeric_id, name, folder, student_id FROM identities ORDER BY numeric_id").fetchall()
+
+    def identity(self, numeric_id):
+        return self.conn.execute("SELECT numeric_id, name, folder, student_id FROM identities WHERE numeric_id = ?",
+                                 (int(numeric_id),)).fetchone()
+
+    def find_identity(self, key):
+        """Identity by numeric ID, Name_ID folder or name (None if unknown or ambiguous)"""
+        key = str(key).strip()
+        if key.isdigit():
+            row = self.identity(key)
+            if row:
+                return row
+        rows = self.conn.execute("SELECT numeric_id, name, folder, student_id FROM identities "
+                                 "WHERE folder = ? OR student_id = ?", (key, key)).fetchall()
+        if not rows:
+            rows = self.conn.execute("SELECT numeric_id, name, folder, student_id FROM identities WHERE name = ?",
+                                     (key,)).fetchall()
+        return rows[0] if len(rows) == 1 else None
+
+    def add_identity(self, numeric_id, name, folder=None):
+        """Register (or confirm) an identity, ValueError if the label belongs to someone else"""
+        existing = self.identity(numeric_id)
+        if existing is not None:
+            if existing[1] != name:
+                raise ValueError(f"Numeric ID {numeric_id} is already assigned to {existing[1]}")
+            if folder and existing[2] != folder:
+                self.conn.execute("UPDATE identities SET folder = ?, student_id = ? WHERE numeric_id = ?",
+                                  (folder, _student_id(folder), int(numeric_id)))
+            return
+        self.conn.execute("INSERT INTO identities (numeric_id, name, folder, student_id, created) VALUES (?, ?, ?, ?, ?)",
+                          (int(numeric_id), name, folder, _student_id(folder) if folder else None,
+                           datetime.now().isoformat(sep=' ', timespec='seconds')))
+
+    def remove_identity(self, numeric_id, delete_files=True):
+        """Drop an identity and all its samples, returns the sample paths"""
+        paths = [row[0] for row in self.samples(numeric_id)]
+        identity = self.identity(numeric_id)
+        with self.transaction():
+            self.conn.execute("DELETE FROM samples WHERE numeric_id = ?", (int(numeric_id),))
+            self.conn.execute("DELETE FROM identities WHERE numeric_id = ?", (int(numeric_id),))
+        if delete_files:
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            folder = identity[2] if identity else None
+            folder_path = os.path.join(self.dataset_path, folder) if folder else None
+            if folder_path and os.path.isdir(folder_path) and not os.listdir(folder_path):
+                os.rmdir(folder_path)
+        return paths
+
+    def names(self):
+        """{'<numeric_id>': name} as stored in id_to_name_map.json ('0' is always 'None')"""
+        names = {'0': "None"}
+        names.update({str(numeric_id): name for numeric_id, name, _, _ in self.identities()})
+        return names
+
+    def write_name_map(self, map_file=MAP_FILE):
+        """Regenerate the name map from the manifest (atomically)"""
+        tmp_path = map_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.names(), f, indent=4)
+        os.replace(tmp_path, map_file)
+
+    # ---------------------------
+    # Samples
+    # ---------------------------
+    def samples(self, numeric_id=None, fmt=None):
+        """[(path, numeric_id, format, checksum), ...], optionally of one identity and/or format"""
+        query = "SELECT path, numeric_id, format, checksum FROM samples"
+        clauses, params = [], []
+        if numeric_id is not None:
+            clauses.append("numeric_id = ?")
+            params.append(int(numeric_id))
+        if fmt is not None:
+            clauses.append("format = ?")
+            params.append(fmt)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return self.conn.execute(query + " ORDER BY numeric_id, format, n", params).fetchall()
+
+    def sample_paths(self, fmt, numeric_id=None):
+        return [row[0] for row in self.samples(numeric_id, fmt)]
+
+    def count(self, numeric_id=None):
+        if numeric_id is None:
+            return self.conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM samples WHERE numeric_id = ?", (int(numeric_id),)).fetchone()[0]
+
+    def next_index(self, numeric_id, fmt):
+        row = self.conn.execute("SELECT MAX(n) FROM samples WHERE numeric_id = ? AND format = ?",
+                                (int(numeric_id), fmt)).fetchone()
+        return (row[0] or 0) + 1
+
+    def sample_path(self, numeric_id, fmt, n):
+        if fmt == 'crop':
+            return os.path.join(self.dataset_path, f"User.{int(numeric_id)}.{n}.jpg")
+        folder = self.identity(numeric_id)[2]
+        return os.path.join(self.dataset_path, folder, f"img_{n}.jpg")
+
+    def write_sample(self, numeric_id, fmt, image):
+        """Encode and save a new sample of an identity and record it, returns its path"""
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+        n = self.next_index(numeric_id, fmt)
+        path = self.sample_path(numeric_id, fmt, n)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        ok, buffer = cv2.imencode('.jpg', image)
+        if not ok:
+            raise IOError(f"Could not encode sample {path}")
+        data = buffer.tobytes()
+        with open(path, 'wb') as f:
+            f.write(data)
+        self._insert(numeric_id, fmt, n, path, checksum(data), len(data))
+        return path
+
+    def add_sample(self, numeric_id, fmt, n, path):
+        """Record an existing file as a sample"""
+        self._insert(numeric_id, fmt, n, path, file_checksum(path), os.path.getsize(path))
+
+    def _insert(self, numeric_id, fmt, n, path, digest, size):
+        self.conn.execute("INSERT OR REPLACE INTO samples (numeric_id, format, n, path, checksum, size, added) "
+                          "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          (int(numeric_id), fmt, n, os.path.normpath(path), digest, size,
+                           datetime.now().isoformat(sep=' ', timespec='seconds')))
+
+    # ---------------------------
+    # Consistency
+    # ---------------------------
+    def verify(self, map_file=MAP_FILE, checksums=True):
+        """List the ways dataset/, the name map and the manifest disagree"""
+        problems = []
+        known = set()
+        for path, numeric_id, fmt, digest in self.samples():
+            known.add(path)
+            if not os.path.exists(path):
+                problems.append(f"missing file: {path} (ID {numeric_id})")
+            elif checksums and file_checksum(path) != digest:
+                problems.append(f"modified file: {path} (ID {numeric_id})")
+        for path in _scan(self.dataset_path):
+            if os.path.normpath(path) not in known:
+                problems.append(f"not in the manifest: {path}")
+        if os.path.exists(map_file):
+            with open(map_file, 'r') as f:
+                on_disk = json.load(f)
+            if on_disk != self.names():
+                problems.append(f"{map_file} differs from the manifest identities")
+        else:
+            problems.append(f"{map_file} is missing")
+        return problems
+
+    def rebuild(self, map_file=MAP_FILE):
+        """Import an existing dataset/ and name map (one directory scan, for migration)"""
+        names = {}
+        if os.path.exists(map_file):
+            with open(map_file, 'r') as f:
+                names = {int(k): v for k, v in json.load(f).items() if k != '0'}
+        folders = {}
+        if os.path.isdir(self.dataset_path):
+            for entry in os.listdir(self.dataset_path):
+                if os.path.isdir(os.path.join(self.dataset_path, entry)):
+                    folders.setdefault(entry.split('_')[0], []).append(entry)
+
+        with self.transaction():
+            self.conn.execute("DELETE FROM samples")
+            self.conn.execute("DELETE FROM identities")
+            crops = {}
+            for path in _scan(self.dataset_path):
+                match = _CROP_NAME.match(os.path.basename(path))
+                if match:
+                    crops.setdefault(int(match.group(1)), []).append((int(match.group(2)), path))
+            identities = []
+            for numeric_id in sorted(set(names) | set(crops)):
+                name = names.get(numeric_id, f"ID{numeric_id}")
+                candidates = folders.get(name, [])
+                folder = candidates.pop() if len(candidates) == 1 else None
+                identities.append((numeric_id, name, folder))
+            # Frame folders nobody could be matched with still need a label to be listed
+            next_id = max([numeric_id for numeric_id, _, _ in identities] + [0]) + 1
+            for name, candidates in sorted(folders.items()):
+                for folder in sorted(candidates):
+                    print(f"[INFO] {folder} matches no name in the map, registered as ID {next_id}")
+                    identities.append((next_id, name, folder))
+                    next_id += 1
+
+            for numeric_id, name, folder in identities:
+                self.add_identity(numeric_id, name, folder)
+                for n, path in sorted(crops.get(numeric_id, [])):
+                    self.add_sample(numeric_id, 'crop', n, path)
+                if folder:
+                    for image_name in os.listdir(os.path.join(self.dataset_path, folder)):
+                        match = _FRAME_NAME.match(image_name)
+                        if match:
+                            self.add_sample(numeric_id, 'frame', int(match.group(1)),
+                                            os.path.join(self.dataset_path, folder, image_name))
+        return len(self.identities()), self.count()
+
+def open_manifest(path=MANIFEST_FILE, dataset_path=DATASET_PATH, map_file=MAP_FILE):
+    """The manifest, imported from dataset/ and the name map the first time it is opened"""
+    fresh = not os.path.exists(path)
+    manifest = DatasetManifest(path, dataset_path)
+    if fresh and (os.path.isdir(dataset_path) or os.path.exists(map_file)):
+        identities, samples = manifest.rebuild(map_file)
+        print(f"[INFO] Created {path} from the existing dataset: {identities} identities, {samples} samples")
+    return manifest
+
+def _student_id(folder):
+    return folder.split('_', 1)[1] if folder and '_' in folder else "Unknown"
+
+def _scan(dataset_path):
+    """Image files in dataset/ and its identity folders"""
+    if not os.path.isdir(dataset_path):
+        return
+    for entry in sorted(os.listdir(dataset_path)):
+        path = os.path.join(dataset_path, entry)
+        if os.path.isdir(path):
+            for image_name in sorted(os.listdir(path)):
+                if image_name.lower().endswith(('.jpg', '.png')):
+                    yield os.path.join(path, image_name)
+        elif entry.lower().endswith(('.jpg', '.png')):
+            yield path
+
+def main():
+    import runtime
+    parser = argparse.ArgumentParser(description="Dataset manifest: which samples belong to whom")
+    parser.add_argument('command', choices=['list', 'verify', 'rebuild'],
+                        help="list identities, verify files/map against the manifest, "
+                             "or rebuild it from dataset/ and the name map")
+    parser.add_argument('--fast', action='store_true', help="verify: skip the checksums")
+    args = parser.parse_args()
+
+    map_file = runtime.path('name_map')
+    if args.command == 'rebuild':
+        manifest = DatasetManifest(runtime.path('manifest'), runtime.path('dataset'))
+    else:
+        manifest = open_manifest(runtime.path('manifest'), runtime.path('dataset'), map_file)
+    try:
+        if args.command == 'rebuild':
+            identities, samples = manifest.rebuild(map_file)
+            manifest.write_name_map(map_file)
+            print(f"[INFO] Manifest rebuilt: {identities} identities, {samples} samples")
+        elif args.command == 'verify':
+            problems = manifest.verify(map_file, checksums=not args.fast)
+            for problem in problems:
+                print(f"[WARN] {problem}")
+            print(f"[INFO] {len(problems)} problem(s) found" if problems else "[INFO] Manifest, dataset and map agree")
+        else:
+            for numeric_id, name, folder, student_id in manifest.identities():
+                crops = len(manifest.samples(numeric_id, 'crop'))
+                frames = len(manifest.samples(numeric_id, 'frame'))
+                print(f"{numeric_id:>4}  {name:<20} {folder or '-':<20} {crops} crops, {frames} frames")
+    finally:
+        manifest.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,41 @@
 import os
 import shutil
-import json
-import glob
+
+import lbph_model
+import runtime
+from dataset_manifest import open_manifest
+from embedding_index import load_index, remove_identity, save_index
+from face_database import FaceDatabase
 
 # --- Define file and folder paths ---
 DATASET_PATH = 'dataset'
 TRAINER_FILE = 'trainer/trainer.yml'
 FACE_DB_FILE = 'face_database.pkl'
+FACE_DB_DIR = 'face_database'
+FACE_INDEX_DIR = FACE_DB_DIR + '.index'
 MAP_FILE = 'id_to_name_map.json'
 ATTENDANCE_LOG = 'attendance_log.csv'
 ATTENDANCE_SUMMARY = 'attendance_summary.csv'
+ATTENDANCE_DB = 'attendance.db'
+REPORT_STATE = ATTENDANCE_LOG + '.report.json'
+FEATURE_CACHE = 'feature_cache.db'
+MANIFEST_FILE = 'dataset_manifest.db'
+
+def use_config():
+    """Point the paths above at the ones configured in config.json"""
+    global DATASET_PATH, TRAINER_FILE, FACE_DB_FILE, FACE_DB_DIR, FACE_INDEX_DIR, MAP_FILE, ATTENDANCE_LOG, REPORT_STATE
+    global FEATURE_CACHE, MANIFEST_FILE, ATTENDANCE_SUMMARY
+    DATASET_PATH = runtime.path('dataset')
+    TRAINER_FILE = runtime.path('trainer')
+    FACE_DB_FILE = runtime.path('legacy_face_db')
+    FACE_DB_DIR = runtime.path('face_db')
+    FACE_INDEX_DIR = FACE_DB_DIR + '.index'
+    MAP_FILE = runtime.path('name_map')
+    ATTENDANCE_LOG = runtime.path('attendance')
+    REPORT_STATE = ATTENDANCE_LOG + '.report.json'
+    ATTENDANCE_SUMMARY = runtime.path('attendance_summary')
+    FEATURE_CACHE = runtime.path('feature_cache')
+    MANIFEST_FILE = runtime.path('manifest')
 
 def clear_all_data():
     """Deletes all generated data, folders, and models."""
@@ -45,6 +71,24 @@ def clear_all_data():
     else:
         print(f"ℹ️ File not found: {FACE_DB_FILE}")
 
+    for folder in (FACE_DB_DIR, FACE_INDEX_DIR):
+        if os.path.exists(folder):
+            try:
+                shutil.rmtree(folder)
+                print(f"✅ Removed folder: {folder}")
+            except Exception as e:
+                print(f"❌ Error removing {folder}: {e}")
+
+    # Cached detections and encodings of the dataset images, and the dataset manifest
+    for cache_file in (FEATURE_CACHE, FEATURE_CACHE + '-wal', FEATURE_CACHE + '-shm',
+                       MANIFEST_FILE, MANIFEST_FILE + '-wal', MANIFEST_FILE + '-shm'):
+        if os.path.exists(cache_file):
+            try:
+                os.remove(cache_file)
+                print(f"✅ Removed file: {cache_file}")
+            except Exception as e:
+                print(f"❌ Error removing {cache_file}: {e}")
+
     # 4. Delete ID map
     if os.path.exists(MAP_FILE):
         try:
@@ -70,77 +114,102 @@ def clear_all_data():
         except Exception as e:
             print(f"❌ Error removing {ATTENDANCE_SUMMARY}: {e}")
 
+    # SQLite attendance store with its WAL side files, and the report state
+    for db_file in (ATTENDANCE_DB, ATTENDANCE_DB + '-wal', ATTENDANCE_DB + '-shm', REPORT_STATE):
+        if os.path.exists(db_file):
+            try:
+                os.remove(db_file)
+                print(f"✅ Removed file: {db_file}")
+            except Exception as e:
+                print(f"❌ Error removing {db_file}: {e}")
+
     print("\nAll data has been cleared.")
 
 def clear_specific_user():
     """Deletes all data related to one specific user."""
     print("\n--- CLEARING SPECIFIC USER ---")
     
-    name_and_id = input("Enter the Name_ID (e.g., Jit_101): ").strip()
-    numeric_id = input(f"Enter the corresponding Numeric ID (e.g., 1): ").strip()
-
-    if not name_and_id or not numeric_id:
-        print("Both inputs are required. Aborting.")
+    key = input("Enter the Name_ID (e.g., Jit_101) or the Numeric ID (e.g., 1): ").strip()
+    if not key:
+        print("An identifier is required. Aborting.")
         return
 
-    # 1. Delete user's subfolder (from enroll_user.py / combined_enrollment.py)
-    user_folder_path = os.path.join(DATASET_PATH, name_and_id)
-    if os.path.exists(user_folder_path):
+    # 1. Look the user up in the dataset manifest, which knows both IDs and every sample
+    manifest = open_manifest(MANIFEST_FILE, DATASET_PATH, MAP_FILE)
+    try:
+        identity = manifest.find_identity(key)
+        if identity is None:
+            print(f"ℹ️ No single enrolled user matches '{key}'. Enrolled users:")
+            for numeric_id, name, folder, _ in manifest.identities():
+                print(f"   {numeric_id}: {name} ({folder or 'no folder'})")
+            return
+        numeric_id, name, folder, student_id = identity
+        print(f"Deleting {name} (Name_ID: {folder or '-'}, Numeric ID: {numeric_id})")
+
+        # 2. Delete the user's samples: manifest rows in one transaction, then the files
         try:
-            shutil.rmtree(user_folder_path)
-            print(f"✅ Removed folder: {user_folder_path}")
+            removed = manifest.remove_identity(numeric_id)
+            print(f"✅ Removed {len(removed)} images of ID {numeric_id} from {DATASET_PATH}")
         except Exception as e:
-            print(f"❌ Error removing {user_folder_path}: {e}")
-    else:
-        print(f"ℹ️ Folder not found: {user_folder_path}")
+            print(f"❌ Error removing the images of ID {numeric_id}: {e}")
+            return
 
-    # 2. Delete user's numbered images (from face_dataset.py / combined_enrollment.py)
-    # This finds files like "dataset/User.1.1.jpg", "dataset/User.1.2.jpg", etc.
-    image_pattern = os.path.join(DATASET_PATH, f"User.{numeric_id}.*.jpg")
-    user_images = glob.glob(image_pattern)
-    
-    if user_images:
-        count = 0
-        for img_path in user_images:
-            try:
-                os.remove(img_path)
-                count += 1
-            except Exception as e:
-                print(f"❌ Error removing {img_path}: {e}")
-        print(f"✅ Removed {count} images matching '{image_pattern}'")
+        # 3. Regenerate id_to_name_map.json from the manifest
+        try:
+            manifest.write_name_map(MAP_FILE)
+            print(f"✅ Removed '{name}' (ID: {numeric_id}) from {MAP_FILE}")
+        except Exception as e:
+            print(f"❌ Error updating {MAP_FILE}: {e}")
+    finally:
+        manifest.close()
+
+    # 4. Remove the user's samples from the trained model (no dataset re-scan)
+    if os.path.exists(TRAINER_FILE):
+        try:
+            left = lbph_model.remove_labels([int(numeric_id)], TRAINER_FILE)
+            print(f"✅ Removed ID {numeric_id} from {TRAINER_FILE} ({left} samples left)")
+        except Exception as e:
+            print(f"❌ Error updating {TRAINER_FILE}: {e}")
+            print("   Run 'train_model.py' to rebuild the model.")
     else:
-        print(f"ℹ️ No images found matching: {image_pattern}")
+        print(f"ℹ️ File not found: {TRAINER_FILE}")
 
-    # 3. Remove user from id_to_name_map.json
-    if os.path.exists(MAP_FILE):
+    # 5. Remove the user's encodings from the face database and its index (no re-encoding)
+    if os.path.exists(os.path.join(FACE_DB_DIR, 'meta.json')):
         try:
-            with open(MAP_FILE, 'r') as f:
-                id_to_name_map = json.load(f)
-            
-            if numeric_id in id_to_name_map:
-                removed_name = id_to_name_map.pop(numeric_id)
-                print(f"✅ Removed '{removed_name}' (ID: {numeric_id}) from {MAP_FILE}")
-                
-                # Save the updated map back to the file
-                with open(MAP_FILE, 'w') as f:
-                    json.dump(id_to_name_map, f, indent=4)
-            else:
-                print(f"ℹ️ Numeric ID {numeric_id} not found in {MAP_FILE}")
-        
+            remove_from_face_database(student_id or "Unknown", name)
         except Exception as e:
-            print(f"❌ Error updating {MAP_FILE}: {e}")
+            print(f"❌ Error updating {FACE_DB_DIR}: {e}")
+            print("   Run 'encode_face.py' to rebuild the face database.")
     else:
-        print(f"ℹ️ Map file not found: {MAP_FILE}")
+        print(f"ℹ️ Face database not found: {FACE_DB_DIR}")
 
     print("\n" + "="*40)
-    print("⚠️ IMPORTANT ⚠️")
-    print("User data has been deleted from the dataset.")
-    print("You MUST run 'train_model.py' and 'encode_face.py' again")
-    print("to update your models before running the system!")
+    print("User data has been deleted from the dataset, the trained model")
+    print("and the face database.")
     print("="*40)
 
+def remove_from_face_database(student_id, name):
+    """Drop one student from the face database and update its index to match"""
+    # Not memory-mapped, the files are replaced below
+    database = FaceDatabase.load(FACE_DB_DIR, mmap=False)
+    code = database.code_by_id.get(student_id)
+    if code is None or database.identities[code][1] != name:
+        print(f"ℹ️ {name} (ID: {student_id}) is not in {FACE_DB_DIR}")
+        return
+    # Loaded before the database is saved, while its stamp still matches
+    index = load_index(database, FACE_INDEX_DIR, mmap=False)
+    updated = database.without_identity(student_id)
+    updated.save(FACE_DB_DIR)
+    print(f"✅ Removed {len(database) - len(updated)} encodings of {name} from {FACE_DB_DIR}")
+    if index is not None:
+        removed = remove_identity(index, code)
+        save_index(index, updated, FACE_INDEX_DIR)
+        print(f"✅ Removed {removed} vectors from {FACE_INDEX_DIR}")
+
 def main():
     """Main menu for the data management script."""
+    use_config()
     while True:
         print("\n=== Data Management Utility ===")
         print("1. Clear ALL data (Deletes all datasets, models, and logs)")
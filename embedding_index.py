@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from face_database import FACE_DB_DIR, FaceDatabase
+from face_encoder import encoder_from_spec
+from face_matcher import pairwise_distances, prepare_vectors
+
+INDEX_DIR = FACE_DB_DIR + '.index'
+INDEX_VERSION = 1
+
+class FlatIndex:
+    """Exact search: every query is compared with every stored vector.
+
+    Vectors carry an integer label (the face database identity code), so a
+    whole identity can be added or removed at once.
+    """
+    kind = 'flat'
+
+    def __init__(self, metric='l2', chunk_size=8192):
+        self.metric = metric
+        self.chunk_size = chunk_size
+        self.vectors = None
+        self.labels = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, vectors, labels):
+        vectors = prepare_vectors(vectors, self.metric)
+        labels = np.asarray(labels, dtype=np.int32).reshape(-1)
+        self.vectors = vectors if self.vectors is None or not len(self.labels) else np.vstack([self.vectors, vectors])
+        self.labels = np.concatenate([self.labels, labels])
+
+    def remove(self, labels):
+        """Drop every vector of the given labels, returns how many were removed"""
+        keep = ~np.isin(self.labels, np.asarray(list(labels), dtype=np.int32))
+        removed = int(len(keep) - keep.sum())
+        if removed:
+            self.vectors = self.vectors[keep]
+            self.labels = self.labels[keep]
+        return removed
+
+    def search(self, queries, k=1):
+        """k nearest vectors per query: (distances, labels), both (queries, k), -1 padded"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self.labels):
+            return _empty_result(len(queries), k)
+        d = pairwise_distances(queries, self.vectors, self.metric, self.chunk_size)
+        return _top_k(d, self.labels, k)
+
+    def search_identities(self, queries, k=1, oversample=32):
+        """k nearest distinct labels per query, as [(label, distance), ...] lists.
+
+        Looks at the k * oversample nearest vectors, so an identity with more
+        samples than that close to the query can hide the ones behind it.
+        """
+        return _distinct_labels(self, queries, k, oversample)
+
+    def _arrays(self):
+        return {'vectors': self.vectors if self.vectors is not None else np.zeros((0, 0), np.float32),
+                'labels': self.labels}
+
+    def _meta(self):
+        return {}
+
+    def _restore(self, arrays, meta):
+        self.vectors = arrays['vectors']
+        self.labels = arrays['labels']
+
+class IVFIndex(FlatIndex):
+    """Approximate search over k-means partitions (inverted file).
+
+    The vectors are split into `nlist` clusters. A query is only compared
+    with the vectors of its `nprobe` nearest clusters, so the cost per
+    query is about nprobe / nlist of a flat scan. New vectors are assigned
+    to the existing centroids; train() again after large changes.
+    """
+    kind = 'ivf'
+
+    def __init__(self, metric='l2', nlist=None, nprobe=8, iterations=20, seed=0, chunk_size=8192):
+        super().__init__(metric, chunk_size)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.lists = np.zeros(0, dtype=np.int32) # Cluster of every vector
+
+    def train(self, vectors, sample_size=256):
+        """k-means (Lloyd) on up to `sample_size` vectors per cluster"""
+        vectors = prepare_vectors(vectors, self.metric)
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+        self.nlist = nlist
+        if len(vectors) > sample_size * nlist:
+            vectors = vectors[rng.choice(len(vectors), sample_size * nlist, replace=False)]
+
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            assign = self._nearest_centroids(vectors, centroids, 1)[:, 0]
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            # Sum every cluster's members in one reduceat over the vectors sorted by cluster
+            order = np.argsort(assign, kind='stable')
+            starts = np.r_[0, np.cumsum(counts)[:-1]][~empty]
+            centroids[~empty] = np.add.reduceat(vectors[order], starts, axis=0) / counts[~empty, None]
+            if empty.any():
+                # Re-seed empty clusters with random vectors
+                centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        if self.metric == 'cosine':
+            centroids = prepare_vectors(centroids, 'cosine')
+        self.centroids = centroids
+
+        # Re-assign what is already stored
+        if len(self.labels):
+            self.lists = self._nearest_centroids(self.vectors, self.centroids, 1)[:, 0].astype(np.int32)
+
+    def _nearest_centroids(self, vectors, centroids, n):
+        # Partitioning is always by squared L2 (for cosine the vectors are unit length)
+        d = (np.einsum('ij,ij->i', vectors, vectors)[:, None] - 2 * vectors @ centroids.T
+             + np.einsum('ij,ij->i', centroids, centroids)[None, :])
+        if n == 1:
+            return d.argmin(axis=1)[:, None]
+        if n >= d.shape[1]:
+            return np.argsort(d, axis=1)
+        nearest = np.argpartition(d, n - 1, axis=1)[:, :n]
+        return np.take_along_axis(nearest, np.argsort(np.take_along_axis(d, nearest, axis=1), axis=1), axis=1)
+
+    def add(self, vectors, labels):
+        if self.centroids is None:
+            self.train(vectors)
+        start = len(self.labels)
+        super().add(vectors, labels)
+        new_lists = self._nearest_centroids(self.vectors[start:], self.centroids, 1)[:, 0].astype(np.int32)
+        self.lists = np.concatenate([self.lists, new_lists])
+
+    def remove(self, labels):
+        keep = ~np.isin(self.labels, np.asarray(list(labels), dtype=np.int32))
+        self.lists = self.lists[keep]
+        return super().remove(labels)
+
+    def search(self, queries, k=1):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self.labels):
+            return _empty_result(len(queries), k)
+        probe = self._nearest_centroids(prepare_vectors(queries, self.metric), self.centroids,
+                                        min(self.nprobe, len(self.centroids)))
+        # Vectors sorted by cluster once, so every probed cluster is a slice
+        order, starts = self._by_list()
+        out_d, out_l = _empty_result(len(queries), k)
+        for qi, clusters in enumerate(probe):
+            idx = np.concatenate([order[starts[c]:starts[c + 1]] for c in clusters])
+            if not len(idx):
+                continue
+            d = pairwise_distances(queries[qi:qi + 1], self.vectors[idx], self.metric, self.chunk_size)
+            top_d, top_l = _top_k(d, self.labels[idx], k)
+            out_d[qi], out_l[qi] = top_d[0], top_l[0]
+        return out_d, out_l
+
+    def _by_list(self):
+        if getattr(self, '_sorted_for', None) is not self.lists:
+            self._order = np.argsort(self.lists, kind='stable')
+            self._starts = np.searchsorted(self.lists[self._order], np.arange(len(self.centroids) + 1))
+            self._sorted_for = self.lists
+        return self._order, self._starts
+
+    def _arrays(self):
+        arrays = super()._arrays()
+        arrays['centroids'] = self.centroids if self.centroids is not None else np.zeros((0, 0), np.float32)
+        arrays['lists'] = self.lists
+        return arrays
+
+    def _meta(self):
+        return {'nlist': self.nlist, 'nprobe': self.nprobe}
+
+    def _restore(self, arrays, meta):
+        super()._restore(arrays, meta)
+        self.centroids = arrays['centroids'] if len(arrays['centroids']) else None
+        self.lists = arrays['lists']
+        self.nlist = meta['nlist']
+        self.nprobe = meta['nprobe']
+
+INDEX_KINDS = {
+    'flat': FlatIndex,
+    'ivf': IVFIndex,
+}
+
+def _empty_result(n, k):
+    return np.full((n, k), np.inf, dtype=np.float32), np.full((n, k), -1, dtype=np.int32)
+
+def _top_k(d, labels, k):
+    n = min(k, d.shape[1])
+    if n < d.shape[1]:
+        top = np.argpartition(d, n - 1, axis=1)[:, :n]
+    else:
+        top = np.broadcast_to(np.arange(d.shape[1]), d.shape)
+    top_d = np.take_along_axis(d, top, axis=1)
+    order = np.argsort(top_d, axis=1, kind='stable')
+    top, top_d = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_d, order, axis=1)
+    out_d, out_l = _empty_result(len(d), k)
+    out_d[:, :n], out_l[:, :n] = top_d, labels[top]
+    return out_d, out_l
+
+def _distinct_labels(index, queries, k, oversample):
+    distances, labels = index.search(queries, k * oversample)
+    results = []
+    for row_d, row_l in zip(distances, labels):
+        seen = {}
+        for distance, label in zip(row_d, row_l):
+            if label < 0 or label in seen:
+                continue
+            seen[int(label)] = float(distance)
+            if len(seen) == k:
+                break
+        results.append(list(seen.items()))
+    return results
+
+def build_index(database, kind='flat', metric=None, **options):
+    """Index every sample of a face database, labelled with its identity code"""
+    metric = metric or encoder_from_spec(database.encoder).metric
+    index = INDEX_KINDS[kind](metric=metric, **options)
+    if len(database):
+        if kind == 'ivf':
+            index.train(database.encodings)
+        index.add(database.encodings, database.codes)
+    return index
+
+def save_index(index, database, path=INDEX_DIR):
+    """Write the index next to the face database it was built from"""
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    for name, array in index._arrays().items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+    meta = dict(index._meta(), kind=index.kind, version=INDEX_VERSION, metric=index.metric,
+                vectors=len(index), database_created=database.created)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=4)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+def load_index(database, path=INDEX_DIR, mmap=True, any_database=False):
+    """Load the saved index, or None if there is none or it belongs to another database.
+
+    any_database=True skips that check, for refresh_index().
+    """
+    meta_file = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file, 'r') as f:
+        meta = json.load(f)
+    if meta.get('version') != INDEX_VERSION:
+        print(f"[WARN] {path} has an unsupported format, ignoring it (rebuild with embedding_index.py build)")
+        return None
+    if not any_database and meta.get('database_created') != database.created:
+        print(f"[WARN] {path} was built for another face database, ignoring it (rebuild with embedding_index.py build)")
+        return None
+    index = INDEX_KINDS[meta['kind']](metric=meta['metric'])
+    arrays = {name[:-4]: np.load(os.path.join(path, name), mmap_mode='r' if mmap else None)
+              for name in os.listdir(path) if name.endswith('.npy')}
+    index._restore(arrays, meta)
+    return index
+
+def remove_identity(index, code):
+    """Drop one identity's vectors and renumber the codes after it, as FaceDatabase.without_identity() does"""
+    removed = index.remove([code])
+    index.labels = np.where(index.labels > code, index.labels - 1, index.labels).astype(np.int32)
+    return removed
+
+def refresh_index(index, database):
+    """An index of the same kind over a rewritten database.
+
+    An IVF index keeps its partitions and only assigns the vectors to
+    them (add()), instead of running k-means again. They are re-trained
+    when the encoder (metric or dimension) changed.
+    """
+    metric = encoder_from_spec(database.encoder).metric
+    fresh = INDEX_KINDS[index.kind](metric=metric, **index._meta())
+    if (index.kind == 'ivf' and index.centroids is not None and metric == index.metric
+            and database.encodings.ndim == 2 and index.centroids.shape[1] == database.encodings.shape[1]):
+        fresh.centroids = np.array(index.centroids)
+    if len(database):
+        fresh.add(database.encodings, database.codes)
+    return fresh
+
+def recall(index, exact, queries, k=1):
+    """Share of the exact k nearest identities the index also returns, plus both search times"""
+    start = time.perf_counter()
+    approx = index.search_identities(queries, k)
+    index_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = exact.search_identities(queries, k)
+    exact_seconds = time.perf_counter() - start
+
+    found = sum(len({label for label, _ in a} & {label for label, _ in e}) for a, e in zip(approx, expected))
+    total = sum(len(e) for e in expected)
+    return (found / total if total else 1.0), index_seconds, exact_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Nearest-neighbour index over the face database")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="Build and save the index")
+    build.add_argument('--kind', choices=sorted(INDEX_KINDS), default='ivf')
+    build.add_argument('--nlist', type=int, default=None, help="IVF clusters (default 4*sqrt(samples))")
+    build.add_argument('--nprobe', type=int, default=8, help="IVF clusters searched per query")
+    check = sub.add_parser('recall', help="Compare the saved index with exact search")
+    check.add_argument('--queries', type=int, default=200)
+    check.add_argument('--k', type=int, default=1)
+    check.add_argument('--noise', type=float, default=0.05,
+                       help="Queries are stored samples plus this much noise (relative to their norm)")
+    parser.add_argument('--db', default=FACE_DB_DIR)
+    args = parser.parse_args()
+
+    database = FaceDatabase.load(args.db)
+    index_path = args.db + '.index'
+    if args.command == 'build':
+        options = {'nlist': args.nlist, 'nprobe': args.nprobe} if args.kind == 'ivf' else {}
+        start = time.perf_counter()
+        index = build_index(database, args.kind, **options)
+        save_index(index, database, index_path)
+        print(f"[INFO] {args.kind} index of {len(index)} samples saved to {index_path} "
+              f"in {time.perf_counter() - start:.2f}s")
+        return
+
+    index = load_index(database, index_path)
+    if index is None:
+        print(f"[ERROR] No usable index at {index_path}, run 'embedding_index.py build' first.")
+        return
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(database), min(args.queries, len(database)), replace=False)
+    queries = np.asarray(database.encodings[np.sort(picks)], dtype=np.float32)
+    scale = np.linalg.norm(queries, axis=1, keepdims=True) / np.sqrt(queries.shape[1])
+    queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * scale * args.noise
+    exact = build_index(database, 'flat', index.metric)
+    value, index_seconds, exact_seconds = recall(index, exact, queries, args.k)
+    print(f"[INFO] identity recall@{args.k}: {value:.3f} over {len(queries)} queries | "
+          f"{index.kind}: {index_seconds * 1000 / len(queries):.2f}ms/query, "
+          f"exact: {exact_seconds * 1000 / len(queries):.2f}ms/query")
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,210 @@
 import cv2
 import os
-import pickle
+import time
+import argparse
 import numpy as np
 from datetime import datetime
 
-print("=== Enhanced Face Encoding System ===")
+import runtime
+from embedding_index import INDEX_KINDS, build_index, load_index, refresh_index, save_index
+from face_database import FaceDatabase
+from face_encoder import DNN_MODEL_FILE, ENCODERS, get_encoder
+from dataset_manifest import open_manifest
+from feature_cache import FeatureCache, file_signature, params_key
 
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+def make_encoder(name, dnn_model=DNN_MODEL_FILE):
+    if name == 'dnn':
+        return get_encoder('dnn', model_path=dnn_model)
+    return get_encoder(name)
 
-# Enhanced data structure
-known_encodings = []
-known_names = []
-known_ids = []
-registration_dates = []
+def feature_key(encoder):
+    """Cache key of an encoder's output: its spec, plus the model file version for model-based encoders"""
+    spec = dict(encoder.spec())
+    if os.path.exists(spec.get('model_path', '')):
+        spec['model_signature'] = list(file_signature(spec['model_path']))
+    return params_key(spec)
 
-dataset_path = 'dataset'
+def list_identities(dataset_path, manifest_path=None):
+    """[(name, student ID, image paths)] of the enrolled people.
 
-if not os.path.exists(dataset_path):
-    print("No dataset folder found! Run enroll_user.py first.")
-    exit()
+    From the manifest's 'frame' samples when there is one, else from the
+    Name_ID folders of the dataset.
+    """
+    if manifest_path:
+        manifest = open_manifest(manifest_path, dataset_path)
+        try:
+            return [(name, student_id or "Unknown", manifest.sample_paths('frame', numeric_id))
+                    for numeric_id, name, folder, student_id in manifest.identities() if folder]
+        finally:
+            manifest.close()
+    identities = []
+    for folder_name in os.listdir(dataset_path):
+        folder_path = os.path.join(dataset_path, folder_name)
+        if os.path.isdir(folder_path):
+            # Extract name and ID from folder name (format: Name_ID)
+            if '_' in folder_name:
+                name, student_id = folder_name.split('_', 1)
+            else:
+                name = folder_name
+                student_id = "Unknown"
+            identities.append((name, student_id, [os.path.join(folder_path, image_name)
+                                                  for image_name in os.listdir(folder_path)
+                                                  if image_name.endswith(('.jpg', '.png'))]))
+    return identities
 
-print("Processing student faces...")
+def encode_cached(encoder, crops, boxes, image_spans, cache=None):
+    """Encode the crops, reusing the encodings cached for unchanged images.
 
-for folder_name in os.listdir(dataset_path):
-    folder_path = os.path.join(dataset_path, folder_name)
-    
-    if os.path.isdir(folder_path):
-        # Extract name and ID from folder name (format: Name_ID)
-        if '_' in folder_name:
-            name, student_id = folder_name.split('_', 1)
-        else:
-            name = folder_name
-            student_id = "Unknown"
-        
+    image_spans lists (image_path, first crop, crop count) for every image,
+    in the order of `crops`.
+    """
+    if cache is None:
+        return encoder.encode_crops(crops, boxes)
+    key = feature_key(encoder)
+    spans = [(path, first, n) for path, first, n in image_spans if n]
+    encodings = {path: cache.get_features(path, key) for path, _, _ in spans}
+    todo = [(path, first, n) for path, first, n in spans if encodings[path] is None]
+    if todo:
+        indices = [i for _, first, n in todo for i in range(first, first + n)]
+        fresh = encoder.encode_crops([crops[i] for i in indices], [boxes[i] for i in indices])
+        offset = 0
+        for path, _, n in todo:
+            encodings[path] = fresh[offset:offset + n]
+            cache.put_features(path, key, encodings[path])
+            offset += n
+    print(f"[INFO] Encodings: {len(spans) - len(todo)} images cached, {len(todo)} encoded")
+    return np.concatenate([encodings[path] for path, _, _ in spans])
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode the enrolled faces into the face database")
+    parser.add_argument('--encoder', choices=sorted(ENCODERS), default='lbph',
+                        help="lbph = LBP histograms, dnn = ONNX embedding model, "
+                             "box = face box (legacy placeholder, only when asked for)")
+    parser.add_argument('--dnn-model', default=DNN_MODEL_FILE, help="ONNX model for --encoder dnn")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Time every available encoder on the dataset faces instead of saving")
+    parser.add_argument('--index', choices=sorted(INDEX_KINDS), default=None,
+                        help="Also build a nearest-neighbour index (ivf for large sites)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Detect and encode every image again instead of using the feature cache")
+    parser.add_argument('--scan', action='store_true',
+                        help="List the dataset folders instead of reading the dataset manifest")
+    args = parser.parse_args()
+
+    print("=== Enhanced Face Encoding System ===")
+
+    face_detector = runtime.detector('enroll')
+    # Faces are cut and normalized like training and recognition do
+    preprocessor = runtime.preprocessor()
+
+    # Enhanced data structure
+    known_crops = []
+    known_boxes = []
+    known_names = []
+    known_ids = []
+    registration_dates = []
+
+    dataset_path = runtime.path('dataset')
+    db_path = runtime.path('face_db')
+
+    if not os.path.exists(dataset_path):
+        print("No dataset folder found! Run enroll_user.py first.")
+        return
+
+    print("Processing student faces...")
+    encoded_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    detect_start = time.perf_counter()
+
+    # Unchanged images keep their boxes, crops and encodings from the last run
+    cache = None
+    if not args.no_cache:
+        cache = FeatureCache('encode', {'detector': runtime.detector_options('enroll'),
+                                        'preprocess': preprocessor.spec()},
+                             runtime.path('feature_cache'))
+    image_spans = []
+
+    for name, student_id, image_paths in list_identities(dataset_path, None if args.scan else runtime.path('manifest')):
         print(f"Processing {name} (ID: {student_id})...")
+    
+        for image_path in image_paths:
+            entry = cache.get(image_path) if cache else None
         
-        for image_name in os.listdir(folder_path):
-            if image_name.endswith(('.jpg', '.png')):
-                image_path = os.path.join(folder_path, image_name)
-                
+            if entry is None:
                 image = cv2.imread(image_path)
+                if image is None:
+                    print(f"[WARN] Skipping unreadable image {image_path}")
+                    continue
                 gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-                
-                for (x, y, w, h) in faces:
-                    # Temporary encoding (will be replaced with proper face encoding)
-                    face_encoding = [x, y, w, h]
-                    
-                    known_encodings.append(face_encoding)
-                    known_names.append(name)
-                    known_ids.append(student_id)
-                    registration_dates.append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-
-# Save enhanced database
-encoding_data = {
-    'encodings': known_encodings,
-    'names': known_names,
-    'ids': known_ids,
-    'registration_dates': registration_dates
-}
-
-with open('face_database.pkl', 'wb') as f:
-    pickle.dump(encoding_data, f)
-
-print(f"Encoding completed! Saved {len(known_names)} face encodings.")
+                faces = face_detector.detect(gray)
+                crops = list(preprocessor.faces(gray, faces).copy())
+                if cache:
+                    cache.put(image_path, None, faces, crops)
+            else:
+                _, faces, crops = entry
+            image_spans.append((image_path, len(known_crops), len(crops)))
+        
+            for box, crop in zip(faces, crops):
+                # Encoded all together below, so batching encoders see the whole dataset
+                known_crops.append(crop)
+                known_boxes.append(tuple(box))
+                known_names.append(name)
+                known_ids.append(student_id)
+                registration_dates.append(encoded_at)
+
+    detect_seconds = time.perf_counter() - detect_start
+    print(f"[INFO] Found {len(known_crops)} faces in {detect_seconds:.2f}s")
+    if cache:
+        evicted = cache.evict_missing([path for path, _, _ in image_spans], dataset_path)
+        print(f"[INFO] Feature cache: {cache.hits} images cached, {cache.misses} detected"
+              f"{f', {evicted} deleted images evicted' if evicted else ''}")
+
+    if args.benchmark:
+        for encoder_name in sorted(ENCODERS):
+            try:
+                encoder = make_encoder(encoder_name, args.dnn_model)
+            except FileNotFoundError as e:
+                print(f"[BENCH] {encoder_name}: skipped ({e})")
+                continue
+            start = time.perf_counter()
+            encodings = encoder.encode_crops(known_crops, known_boxes)
+            seconds = time.perf_counter() - start
+            rate = len(known_crops) / seconds if seconds > 0 else float('inf')
+            print(f"[BENCH] {encoder_name}: {len(known_crops)} faces in {seconds:.3f}s "
+                  f"({rate:.0f} faces/s, {encodings.shape[1] if encodings.ndim == 2 else 0} dims)")
+        if cache:
+            cache.close()
+        return
+
+    encoder = make_encoder(args.encoder, args.dnn_model)
+    encode_start = time.perf_counter()
+    if known_crops:
+        known_encodings = encode_cached(encoder, known_crops, known_boxes, image_spans, cache)
+    else:
+        known_encodings = np.zeros((0, getattr(encoder, 'dim', 4 if args.encoder == 'box' else 0)), dtype=np.float32)
+    print(f"[INFO] Encoded with '{args.encoder}' in {time.perf_counter() - encode_start:.2f}s")
+    if cache:
+        cache.close()
+
+    # Save enhanced database (NumPy arrays + identity table, see face_database.py)
+    database = FaceDatabase.from_lists(known_encodings, known_names, known_ids, registration_dates,
+                                       encoder=encoder.spec())
+    database.save(db_path)
+
+    print(f"Encoding completed! Saved {len(database)} face encodings "
+          f"for {len(database.identities)} students to {db_path}/.")
+
+    index_path = db_path + '.index'
+    if args.index:
+        index = build_index(database, args.index)
+        save_index(index, database, index_path)
+        print(f"[INFO] Saved {args.index} index to {index_path}/")
+    else:
+        # An index built earlier follows the new database instead of going stale
+        index = load_index(database, index_path, mmap=False, any_database=True)
+        if index is not None:
+            index = refresh_index(index, database)
+            save_index(index, database, index_path)
+            print(f"[INFO] Updated the {index.kind} index at {index_path}/")
+
+if __name__ == "__main__":
+    main()
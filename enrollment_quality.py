@@ -0,0 +1,96 @@
+import time
+
+import cv2
+import numpy as np
+
+# Crops are scored at a fixed size so the thresholds do not depend on the face size
+SCORE_SIZE = 100
+
+def sharpness(crop):
+    """Variance of the Laplacian, low for blurred or out-of-focus faces"""
+    small = cv2.resize(crop, (SCORE_SIZE, SCORE_SIZE), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(small, cv2.CV_64F).var())
+
+def exposure(crop):
+    """(mean brightness, fraction of nearly black or white pixels)"""
+    clipped = np.count_nonzero((crop <= 5) | (crop >= 250))
+    return float(crop.mean()), clipped / crop.size
+
+def dhash(crop, size=8):
+    """Difference hash (64 bits for size 8): one bit per horizontally adjacent pixel pair of a thumbnail"""
+    small = cv2.resize(crop, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class EnrollmentSelector:
+    """Decides which enrollment crops are worth keeping.
+
+    A crop is rejected when it is too small, blurred, badly exposed, or when
+    its difference hash is within `min_distance` bits of an already accepted
+    crop (the person did not move). Capture is done once `target` crops are
+    accepted, or once at least `min_samples` are and nothing new was
+    accepted for `patience` seconds.
+    """
+    def __init__(self, target=20, min_samples=10, patience=3.0, min_face_size=80,
+                 min_sharpness=40.0, brightness=(50, 205), max_clipped=0.2, min_distance=6):
+        self.target = target
+        self.min_samples = min(min_samples, target)
+        self.patience = patience
+        self.min_face_size = min_face_size
+        self.min_sharpness = min_sharpness
+        self.brightness = brightness
+        self.max_clipped = max_clipped
+        self.min_distance = min_distance
+        self.hashes = []
+        self.rejected = {}
+        self.last_accept = time.monotonic()
+
+    @classmethod
+    def from_config(cls, enrollment):
+        """Selector with the 'enrollment' section of config.json"""
+        options = {k: v for k, v in enrollment.items() if k != 'samples'}
+        if 'brightness' in options:
+            options['brightness'] = tuple(options['brightness'])
+        return cls(target=enrollment.get('samples', 20), **options)
+
+    @property
+    def accepted(self):
+        return len(self.hashes)
+
+    def check(self, crop):
+        """Reason the crop would be rejected, or None if it is a new good sample"""
+        return self._evaluate(crop)[0]
+
+    def _evaluate(self, crop):
+        # Cheapest tests first, most crops of a steady face end as duplicates
+        h, w = crop.shape[:2]
+        if min(h, w) < self.min_face_size:
+            return 'too small', None
+        code = dhash(crop)
+        if any(hamming(code, other) < self.min_distance for other in self.hashes):
+            return 'duplicate', None
+        mean, clipped = exposure(crop)
+        if not self.brightness[0] <= mean <= self.brightness[1] or clipped > self.max_clipped:
+            return 'exposure', None
+        if sharpness(crop) < self.min_sharpness:
+            return 'blurry', None
+        return None, code
+
+    def consider(self, crop):
+        """Check a crop and remember it if accepted, returns (accepted, reason)"""
+        reason, code = self._evaluate(crop)
+        if reason is not None:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+            return False, reason
+        self.hashes.append(code)
+        self.last_accept = time.monotonic()
+        return True, None
+
+    def done(self):
+        if self.accepted >= self.target:
+            return True
+        stalled = time.monotonic() - self.last_accept >= self.patience
+        return self.accepted >= self.min_samples and stalled
@@ -0,0 +1,196 @@
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+FACE_DB_DIR = 'face_database'
+LEGACY_DB_FILE = 'face_database.pkl'
+FORMAT_NAME = 'face-db'
+FORMAT_VERSION = 1
+
+class FaceDatabase:
+    """Registered face samples, stored as a directory of NumPy arrays.
+
+    Layout (format version 1):
+        meta.json        format name/version, sample count, encoding shape and dtype,
+                         and the spec of the encoder that produced the encodings
+        encodings.npy    (N, D) encodings, one row per sample
+        identities.npy   (N,) int32 code of each sample's identity
+        registered.npy   (N,) datetime64[s] registration time of each sample
+        identities.json  [{"id": student_id, "name": name}, ...], indexed by code
+
+    The .npy files are memory-mapped on load, so opening even a large
+    database only reads the small JSON files. Lookups by student ID or name
+    go through dictionaries built over the identity table.
+    """
+    def __init__(self, encodings, codes, registered, identities, encoder=None):
+        self.encodings = encodings
+        self.codes = codes
+        self.registered = registered
+        self.identities = identities # [(student_id, name), ...]
+        self.encoder = encoder or {'name': 'box'} # face_encoder spec
+        self.created = None # Set when saved, ties side files (the index) to this version
+        self._build_index()
+
+    def _build_index(self):
+        self.code_by_id = {}
+        self.id_by_name = {}
+        self.name_by_id = {}
+        for code, (student_id, name) in enumerate(self.identities):
+            self.code_by_id[student_id] = code
+            self.id_by_name[name] = student_id
+            self.name_by_id[student_id] = name
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def names(self):
+        """Registered names, one per identity"""
+        return [name for _, name in self.identities]
+
+    @property
+    def ids(self):
+        """Registered student IDs, one per identity"""
+        return [student_id for student_id, _ in self.identities]
+
+    def identity(self, index):
+        """(student_id, name) of sample `index`"""
+        return self.identities[int(self.codes[index])]
+
+    def samples_of(self, student_id):
+        """Indices of the samples registered for a student ID"""
+        code = self.code_by_id.get(student_id)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.codes == code)
+
+    def without_identity(self, student_id):
+        """Copy without one student's samples; the identity codes after theirs move down by one"""
+        code = self.code_by_id.get(student_id)
+        if code is None:
+            return self
+        keep = self.codes != code
+        codes = np.asarray(self.codes[keep], dtype=np.int32)
+        codes[codes > code] -= 1
+        return FaceDatabase(np.ascontiguousarray(self.encodings[keep]), codes, np.asarray(self.registered[keep]),
+                            self.identities[:code] + self.identities[code + 1:], self.encoder)
+
+    @classmethod
+    def from_lists(cls, encodings, names, ids, registration_dates, encoder=None):
+        """Build from the four parallel lists of the legacy pickle"""
+        identities = []
+        code_of = {}
+        codes = np.empty(len(names), dtype=np.int32)
+        for i, (student_id, name) in enumerate(zip(ids, names)):
+            key = (str(student_id), name)
+            code = code_of.get(key)
+            if code is None:
+                code = code_of[key] = len(identities)
+                identities.append(key)
+            codes[i] = code
+
+        encodings = np.asarray(encodings)
+        if not len(codes):
+            # An empty legacy pickle (encode_face.py found no faces) has no encoding width
+            encodings = encodings.reshape(0, encodings.shape[1] if encodings.ndim == 2 else 0).astype(np.float32)
+        elif encodings.ndim != 2:
+            encodings = encodings.reshape(len(codes), -1)
+        registered = np.array(registration_dates, dtype='datetime64[s]')
+        return cls(np.ascontiguousarray(encodings), codes, registered, identities, encoder)
+
+    def save(self, path=FACE_DB_DIR):
+        """Write the database, replacing any previous one at `path` in one step"""
+        tmp_path = path + '.tmp'
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        np.save(os.path.join(tmp_path, 'encodings.npy'), np.ascontiguousarray(self.encodings))
+        np.save(os.path.join(tmp_path, 'identities.npy'), np.asarray(self.codes, dtype=np.int32))
+        np.save(os.path.join(tmp_path, 'registered.npy'), np.asarray(self.registered, dtype='datetime64[s]'))
+        with open(os.path.join(tmp_path, 'identities.json'), 'w') as f:
+            json.dump([{'id': student_id, 'name': name} for student_id, name in self.identities], f, indent=1)
+        meta = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'samples': len(self.codes),
+            'identities': len(self.identities),
+            'encoding_shape': list(self.encodings.shape),
+            'encoding_dtype': str(self.encodings.dtype),
+            'encoder': self.encoder,
+            'created': datetime.now().isoformat(sep=' ', timespec='microseconds'),
+        }
+        # meta.json last: a directory without it is an unfinished write
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=4)
+
+        old_path = path + '.old'
+        if os.path.exists(path):
+            if os.path.exists(old_path):
+                shutil.rmtree(old_path)
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+        self.created = meta['created']
+
+    @classmethod
+    def load(cls, path=FACE_DB_DIR, mmap=True):
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('format') != FORMAT_NAME or meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported face database format "
+                             f"{meta.get('format')} v{meta.get('version')}")
+
+        mmap_mode = 'r' if mmap else None
+        encodings = np.load(os.path.join(path, 'encodings.npy'), mmap_mode=mmap_mode)
+        codes = np.load(os.path.join(path, 'identities.npy'), mmap_mode=mmap_mode)
+        registered = np.load(os.path.join(path, 'registered.npy'), mmap_mode=mmap_mode)
+        with open(os.path.join(path, 'identities.json'), 'r') as f:
+            identities = [(entry['id'], entry['name']) for entry in json.load(f)]
+
+        if len(codes) != meta['samples'] or len(encodings) != meta['samples']:
+            raise ValueError(f"{path}: sample count does not match meta.json")
+        database = cls(encodings, codes, registered, identities, meta.get('encoder'))
+        database.created = meta.get('created')
+        return database
+
+def convert_pickle(pkl_path=LEGACY_DB_FILE, db_path=FACE_DB_DIR):
+    """One-shot conversion of the legacy face_database.pkl"""
+    with open(pkl_path, 'rb') as f:
+        data = pickle.load(f)
+    db = FaceDatabase.from_lists(data['encodings'], data['names'], data['ids'], data['registration_dates'])
+    db.save(db_path)
+    print(f"[INFO] Converted {pkl_path} -> {db_path} ({len(db)} samples, {len(db.identities)} identities)")
+    return db
+
+def load_face_database(db_path=FACE_DB_DIR, legacy_path=LEGACY_DB_FILE):
+    """Load the face database, converting the legacy pickle on first use.
+
+    Returns None if neither exists.
+    """
+    if os.path.exists(os.path.join(db_path, 'meta.json')):
+        return FaceDatabase.load(db_path)
+    if os.path.exists(legacy_path):
+        print(f"[INFO] Found legacy {legacy_path}, converting it to {db_path}/")
+        convert_pickle(legacy_path, db_path)
+        return FaceDatabase.load(db_path)
+    return None
+
+if __name__ == "__main__":
+    # Usage: python face_database.py [face_database.pkl] [face_database]
+    pkl_path = sys.argv[1] if len(sys.argv) > 1 else LEGACY_DB_FILE
+    db_path = sys.argv[2] if len(sys.argv) > 2 else FACE_DB_DIR
+    if not os.path.exists(pkl_path):
+        print(f"[ERROR] {pkl_path} not found.")
+        sys.exit(1)
+    convert_pickle(pkl_path, db_path)
+    start = time.perf_counter()
+    db = FaceDatabase.load(db_path)
+    print(f"[INFO] Loaded {len(db)} samples in {(time.perf_counter() - start) * 1000:.1f}ms")
@@ -1,45 +1,52 @@
 import cv2
-import numpy as np
 
-print("Starting face detection...")
+import runtime
+from face_detector import load_rois
 
-# Load face detector
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-
-# Initialize camera
-cap = cv2.VideoCapture(0)
-
-if not cap.isOpened():
-    print("Error: Cannot open camera")
-    exit()
-
-print("Camera ready. Press 'q' to quit.")
-
-while True:
-    # Read frame
-    ret, frame = cap.read()
-    if not ret:
-        print("Error: Can't receive frame")
-        break
+def main():
+    print("Starting face detection...")
+    
+    # Load face detector
+    camera = runtime.config()['camera']['index']
+    face_detector = runtime.detector('enroll', rois=load_rois(camera, runtime.path('rois')))
     
-    # Convert to grayscale
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    # Initialize camera
+    cap = runtime.open_camera()
     
-    # Detect faces
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+    if not cap.isOpened():
+        print("Error: Cannot open camera")
+        return
     
-    # Draw rectangles
-    for (x, y, w, h) in faces:
-        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+    print("Camera ready. Press 'q' to quit.")
     
-    # Show result
-    cv2.imshow('Face Detection - Press Q to quit', frame)
+    while True:
+        # Read frame
+        ret, frame = cap.read()
+        if not ret:
+            print("Error: Can't receive frame")
+            break
+        
+        # Convert to grayscale
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        # Detect faces
+        faces = face_detector.detect(gray)
+        
+        # Draw rectangles
+        for (x, y, w, h) in faces:
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        
+        # Show result
+        cv2.imshow('Face Detection - Press Q to quit', frame)
+        
+        # Exit on 'q' press
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
     
-    # Exit on 'q' press
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+    # Cleanup
+    cap.release()
+    cv2.destroyAllWindows()
+    print("Program ended.")
 
-# Cleanup
-cap.release()
-cv2.destroyAllWindows()
-print("Program ended.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import cv2
+import json
+import os
+import numpy as np
+
+from face_tracker import iou
+
+CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+ROI_FILE = 'detection_rois.json'
+
+def load_rois(source, roi_file=ROI_FILE):
+    """Return the ROI polygons configured for a source, or None for the full frame.
+
+    The file maps a source (camera index, video path...) to a list of
+    polygons, each a list of [x, y] points in full-resolution pixels:
+        {"0": [[[120, 0], [520, 0], [520, 480], [120, 480]]]}
+    """
+    if not os.path.exists(roi_file):
+        return None
+    with open(roi_file, 'r') as f:
+        rois = json.load(f)
+    return rois.get(str(source))
+
+class FaceDetector:
+    """Haar cascade face detection shared by every script.
+
+    On top of plain detectMultiScale it can
+      - restrict detection to ROI polygons (a face counts if its centre is inside),
+      - run on a downscaled frame and map the boxes back to full resolution,
+      - only search around given boxes (detect(regions=...)); the recognition
+        engine schedules these local searches between periodic full scans.
+    """
+    def __init__(self, scale_factor=1.1, min_neighbors=4, min_size_ratio=0.0,
+                 downscale=1.0, rois=None, search_margin=0.5,
+                 cascade_path=CASCADE_PATH):
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size_ratio = min_size_ratio
+        self.downscale = max(1.0, downscale)
+        self.polygons = [np.array(p, dtype=np.int32).reshape(-1, 1, 2) for p in rois] if rois else None
+        self.search_margin = search_margin
+
+    def detect(self, gray, regions=None):
+        """Detect faces in a grayscale frame, returns a list of (x, y, w, h).
+
+        If `regions` (boxes from a previous frame) is given only the area
+        around them is searched instead of the whole frame.
+        """
+        frame_h, frame_w = gray.shape[:2]
+        min_size = (int(self.min_size_ratio * frame_w), int(self.min_size_ratio * frame_h))
+
+        if regions:
+            windows = [self._expand(box, frame_w, frame_h) for box in regions]
+        else:
+            windows = [self._roi_window(frame_w, frame_h)]
+
+        boxes = []
+        for (wx, wy, ww, wh) in windows:
+            if ww <= 0 or wh <= 0:
+                continue
+            for box in self._detect_window(gray[wy:wy+wh, wx:wx+ww], min_size):
+                x, y, w, h = box
+                boxes.append((x + wx, y + wy, w, h))
+
+        if len(windows) > 1:
+            boxes = self._dedupe(boxes)
+        if self.polygons is not None:
+            boxes = [b for b in boxes if self._inside_roi(b)]
+        return boxes
+
+    def _detect_window(self, window, min_size):
+        if self.downscale > 1.0:
+            small = cv2.resize(window, None, fx=1.0 / self.downscale, fy=1.0 / self.downscale,
+                               interpolation=cv2.INTER_AREA)
+            scaled_min = (int(min_size[0] / self.downscale), int(min_size[1] / self.downscale))
+            faces = self.cascade.detectMultiScale(small, self.scale_factor, self.min_neighbors, minSize=scaled_min)
+            d = self.downscale
+            return [(int(x * d), int(y * d), int(w * d), int(h * d)) for (x, y, w, h) in faces]
+
+        faces = self.cascade.detectMultiScale(window, self.scale_factor, self.min_neighbors, minSize=min_size)
+        return [(int(x), int(y), int(w), int(h)) for (x, y, w, h) in faces]
+
+    def _roi_window(self, frame_w, frame_h):
+        """Bounding rectangle of all ROI polygons, clipped to the frame"""
+        if self.polygons is None:
+            return (0, 0, frame_w, frame_h)
+        x, y, w, h = cv2.boundingRect(np.concatenate(self.polygons))
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(frame_w, x + w), min(frame_h, y + h)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def _expand(self, box, frame_w, frame_h):
+        x, y, w, h = box
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def _inside_roi(self, box):
+        x, y, w, h = box
+        centre = (float(x + w / 2), float(y + h / 2))
+        return any(cv2.pointPolygonTest(p, centre, False) >= 0 for p in self.polygons)
+
+    def _dedupe(self, boxes):
+        # Overlapping search windows can find the same face twice
+        kept = []
+        for box in sorted(boxes, key=lambda b: b[2] * b[3], reverse=True):
+            if all(iou(box, k) < 0.5 for k in kept):
+                kept.append(box)
+        return kept
@@ -0,0 +1,189 @@
+import os
+
+import cv2
+import numpy as np
+
+DNN_MODEL_FILE = 'models/face_embedding.onnx'
+
+class FaceEncoder:
+    """Turns grayscale face crops into fixed-length embeddings.
+
+    Subclasses implement encode_crops(); `metric` and `threshold` tell the
+    FaceMatcher how to compare the embeddings they produce. spec() is
+    stored with the face database, so recognition uses the same encoder
+    as enrollment.
+    """
+    name = None
+    metric = 'l2'
+    threshold = None
+
+    def encode_crops(self, crops, boxes=None):
+        """(N, D) float32 embeddings of N crops"""
+        raise NotImplementedError
+
+    def encode(self, gray, boxes, preprocessor=None):
+        """Embeddings of the given (x, y, w, h) boxes of a grayscale frame.
+
+        The faces are cut and normalized by `preprocessor` (the configured
+        one by default), as encode_face.py does for the face database.
+        """
+        if preprocessor is None:
+            import runtime
+            preprocessor = runtime.preprocessor()
+        return self.encode_crops(preprocessor.faces(gray, boxes), boxes)
+
+    def spec(self):
+        return {'name': self.name}
+
+class BoxEncoder(FaceEncoder):
+    """The original placeholder: the face box itself is the encoding"""
+    name = 'box'
+    metric = 'l1'
+    threshold = 100
+
+    def encode_crops(self, crops, boxes=None):
+        if boxes is None:
+            raise ValueError("The box encoder needs the face boxes")
+        return np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+    def encode(self, gray, boxes, preprocessor=None):
+        # Nothing to crop
+        return self.encode_crops([], boxes)
+
+class LBPHEncoder(FaceEncoder):
+    """The spatial LBP histogram that cv2.face.LBPHFaceRecognizer stores per sample.
+
+    Uses the same extended LBP (bilinear interpolation, float32 arithmetic)
+    and the same grid layout, so the vectors match getHistograms() of a
+    model trained on the same crops, and the chi-square distance between
+    them is the confidence LBPH predict() reports.
+    """
+    name = 'lbph'
+    metric = 'chi2'
+    threshold = 100
+
+    def __init__(self, radius=1, neighbors=8, grid_x=8, grid_y=8):
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.bins = 2 ** neighbors
+        # Sample offsets and bilinear weights of every neighbor (float32, like OpenCV)
+        self.samples = []
+        for n in range(neighbors):
+            x = np.float32(radius * np.cos(2.0 * np.pi * n / neighbors))
+            y = np.float32(-radius * np.sin(2.0 * np.pi * n / neighbors))
+            fx, fy = int(np.floor(x)), int(np.floor(y))
+            cx, cy = int(np.ceil(x)), int(np.ceil(y))
+            ty, tx = np.float32(y - fy), np.float32(x - fx)
+            w1 = np.float32((1 - tx) * (1 - ty))
+            w2 = np.float32(tx * (1 - ty))
+            w3 = np.float32((1 - tx) * ty)
+            w4 = np.float32(tx * ty)
+            self.samples.append((fx, fy, cx, cy, w1, w2, w3, w4))
+
+    def spec(self):
+        return {'name': self.name, 'radius': self.radius, 'neighbors': self.neighbors,
+                'grid_x': self.grid_x, 'grid_y': self.grid_y}
+
+    @property
+    def dim(self):
+        return self.grid_x * self.grid_y * self.bins
+
+    def elbp(self, gray):
+        """Extended LBP codes of the interior pixels (radius cut off each side)"""
+        r = self.radius
+        src = gray.astype(np.float32)
+        rows, cols = gray.shape
+        h, w = rows - 2 * r, cols - 2 * r
+        center = src[r:r+h, r:r+w]
+        codes = np.zeros((h, w), dtype=np.int32)
+        eps = np.finfo(np.float32).eps
+        for n, (fx, fy, cx, cy, w1, w2, w3, w4) in enumerate(self.samples):
+            t = (w1 * src[r+fy:r+fy+h, r+fx:r+fx+w] + w2 * src[r+fy:r+fy+h, r+cx:r+cx+w]
+                 + w3 * src[r+cy:r+cy+h, r+fx:r+fx+w] + w4 * src[r+cy:r+cy+h, r+cx:r+cx+w])
+            codes |= ((t > center) | (np.abs(t - center) < eps)).astype(np.int32) << n
+        return codes
+
+    def histogram(self, gray):
+        codes = self.elbp(gray)
+        height, width = codes.shape[0] // self.grid_y, codes.shape[1] // self.grid_x
+        out = np.zeros((self.grid_y, self.grid_x, self.bins), dtype=np.float32)
+        if height == 0 or width == 0:
+            return out.reshape(-1)
+        cells = codes[:height * self.grid_y, :width * self.grid_x]
+        cells = cells.reshape(self.grid_y, height, self.grid_x, width).transpose(0, 2, 1, 3)
+        cells = cells.reshape(self.grid_y * self.grid_x, height * width)
+        # One bincount over all cells: offset every cell's codes into its own bin range
+        offsets = (np.arange(len(cells)) * self.bins)[:, None]
+        counts = np.bincount((cells + offsets).ravel(), minlength=len(cells) * self.bins)
+        # OpenCV multiplies by the float32 reciprocal, which can differ from a division in the last bit
+        return counts.astype(np.float32) * np.float32(1.0 / (height * width))
+
+    def encode_crops(self, crops, boxes=None):
+        out = np.empty((len(crops), self.dim), dtype=np.float32)
+        for i, crop in enumerate(crops):
+            out[i] = self.histogram(crop)
+        return out
+
+class DnnEncoder(FaceEncoder):
+    """Embeddings from an ONNX face model, run on the CPU with OpenCV DNN.
+
+    Crops are resized to the model's input size and sent through in
+    batches built with cv2.dnn.blobFromImages. The outputs are
+    L2-normalized and compared by cosine distance.
+    """
+    name = 'dnn'
+    metric = 'cosine'
+    threshold = 0.6
+
+    def __init__(self, model_path=DNN_MODEL_FILE, input_size=112, scale=1 / 127.5,
+                 mean=127.5, swap_rb=True, batch_size=64):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"ONNX model '{model_path}' not found. Download a face embedding "
+                                    f"model (e.g. a MobileFaceNet/ArcFace export) to {model_path}.")
+        self.model_path = model_path
+        self.input_size = input_size
+        self.scale = scale
+        self.mean = mean
+        self.swap_rb = swap_rb
+        self.batch_size = batch_size
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def spec(self):
+        return {'name': self.name, 'model_path': self.model_path, 'input_size': self.input_size,
+                'scale': self.scale, 'mean': self.mean, 'swap_rb': self.swap_rb}
+
+    def encode_crops(self, crops, boxes=None):
+        outputs = []
+        size = (self.input_size, self.input_size)
+        for start in range(0, len(crops), self.batch_size):
+            batch = [cv2.cvtColor(c, cv2.COLOR_GRAY2BGR) if c.ndim == 2 else c
+                     for c in crops[start:start + self.batch_size]]
+            blob = cv2.dnn.blobFromImages(batch, self.scale, size, (self.mean,) * 3, self.swap_rb, crop=False)
+            self.net.setInput(blob)
+            outputs.append(self.net.forward().reshape(len(batch), -1))
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        embeddings = np.vstack(outputs).astype(np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+ENCODERS = {
+    'box': BoxEncoder,
+    'lbph': LBPHEncoder,
+    'dnn': DnnEncoder,
+}
+
+def get_encoder(name='lbph', **options):
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown encoder '{name}', choose from {sorted(ENCODERS)}")
+    return ENCODERS[name](**options)
+
+def encoder_from_spec(spec):
+    """Recreate the encoder a face database was built with"""
+    # Databases from before encoder specs were stored hold face boxes
+    spec = dict(spec or {'name': 'box'})
+    return get_encoder(spec.pop('name'), **spec)
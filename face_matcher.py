@@ -0,0 +1,145 @@
+import numpy as np
+
+METRICS = ('l1', 'l2', 'cosine', 'chi2')
+AGGREGATES = ('min', 'mean')
+# Elements of the (faces, samples, dim) temporary that l1/chi2 may build per chunk
+BROADCAST_BUDGET = 1 << 24
+
+def prepare_vectors(vectors, metric):
+    """float32 copy of `vectors` in the form pairwise_distances() expects"""
+    vectors = np.array(vectors, dtype=np.float32, order='C')
+    if metric == 'cosine' and len(vectors):
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+def pairwise_distances(queries, vectors, metric, chunk_size=8192, sq_norms=None):
+    """(queries, vectors) distance matrix, `vectors` as returned by prepare_vectors()"""
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    if metric == 'cosine':
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    elif metric == 'l2':
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        if sq_norms is None:
+            sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+
+    out = np.empty((len(queries), len(vectors)), dtype=np.float32)
+    if metric in ('l1', 'chi2'):
+        # These broadcast queries x vectors x dim, keep that temporary bounded
+        chunk_size = max(1, min(chunk_size, BROADCAST_BUDGET // max(1, queries.size)))
+    for start in range(0, len(vectors), chunk_size):
+        block = vectors[start:start + chunk_size]
+        if metric == 'l1':
+            out[:, start:start + len(block)] = np.abs(queries[:, None, :] - block[None, :, :]).sum(axis=2)
+        elif metric == 'chi2':
+            diff = queries[:, None, :] - block[None, :, :]
+            total = queries[:, None, :] + block[None, :, :]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                terms = np.where(total > 0, diff * diff / total, 0)
+            out[:, start:start + len(block)] = 2 * terms.sum(axis=2)
+        elif metric == 'l2':
+            d = q_norms[:, None] + sq_norms[None, start:start + len(block)] - 2 * queries @ block.T
+            out[:, start:start + len(block)] = np.sqrt(np.maximum(d, 0))
+        else:
+            out[:, start:start + len(block)] = 1 - queries @ block.T
+    return out
+
+class FaceMatcher:
+    """Batched nearest-neighbour matching of face encodings against enrolled samples.
+
+    All query faces are compared with all samples in one go (in chunks of
+    `chunk_size` samples to bound memory), then the sample distances are
+    reduced per identity with `aggregate` ('min': closest sample, 'mean':
+    average over the person's samples). Samples are kept sorted by identity
+    so that reduction is a single np.minimum/np.add.reduceat.
+
+    With an `index` (see embedding_index.py) match() asks the index for the
+    nearest samples instead of scanning them all; that only supports the
+    'min' aggregate.
+    """
+    def __init__(self, encodings, codes, identities, metric='l1', aggregate='min',
+                 threshold=100, chunk_size=8192, index=None):
+        """metric: 'l1', 'l2', 'cosine' (1 - cosine similarity) or 'chi2' (the
+        chi-square variant LBPH uses, 2 * sum((a - b)^2 / (a + b)))"""
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}")
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"aggregate must be one of {AGGREGATES}")
+        self.metric = metric
+        self.aggregate = aggregate
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.identities = identities
+        self.index = index
+        if index is not None:
+            if aggregate != 'min':
+                raise ValueError("An index can only serve the 'min' aggregate")
+            return
+
+        codes = np.asarray(codes)
+        order = np.argsort(codes, kind='stable')
+        self.encodings = prepare_vectors(np.asarray(encodings)[order], metric)
+        sorted_codes = codes[order]
+        # First sample of every identity present, and how many it has
+        self.starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(codes) else np.zeros(0, dtype=np.int64)
+        self.group_codes = sorted_codes[self.starts]
+        self.counts = np.diff(np.r_[self.starts, len(codes)])
+        self.sq_norms = np.einsum('ij,ij->i', self.encodings, self.encodings) if metric == 'l2' else None
+
+    @classmethod
+    def from_database(cls, database, **options):
+        return cls(database.encodings, database.codes, database.identities, **options)
+
+    @classmethod
+    def for_encoder(cls, database, encoder, **options):
+        """Matcher with the metric and threshold of the encoder the database was built with"""
+        options.setdefault('metric', encoder.metric)
+        options.setdefault('threshold', encoder.threshold)
+        return cls.from_database(database, **options)
+
+    def __len__(self):
+        return len(self.index) if self.index is not None else len(self.encodings)
+
+    def distances(self, queries):
+        """(faces, samples) distance matrix, samples in identity order"""
+        return pairwise_distances(queries, self.encodings, self.metric, self.chunk_size, self.sq_norms)
+
+    def identity_distances(self, queries):
+        """(faces, identities) distance matrix, aggregated over each identity's samples"""
+        d = self.distances(queries)
+        if self.aggregate == 'min':
+            return np.minimum.reduceat(d, self.starts, axis=1)
+        return np.add.reduceat(d, self.starts, axis=1) / self.counts
+
+    def match(self, queries, k=1):
+        """Best `k` identities per face, as [(student_id, name, distance), ...] lists.
+
+        Only identities closer than `threshold` are returned, so a face can
+        get an empty list.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if len(self) == 0:
+            return [[] for _ in range(len(queries))]
+        if self.index is not None:
+            return [[self.identities[code] + (distance,) for code, distance in face if distance < self.threshold]
+                    for face in self.index.search_identities(queries, k)]
+
+        d = self.identity_distances(queries)
+        k = min(k, d.shape[1])
+        if k < d.shape[1]:
+            top = np.argpartition(d, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(d.shape[1]), d.shape)
+        top_d = np.take_along_axis(d, top, axis=1)
+        order = np.argsort(top_d, axis=1, kind='stable')
+        top, top_d = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_d, order, axis=1)
+
+        matches = []
+        for row, row_d in zip(top, top_d):
+            face = []
+            for group, distance in zip(row, row_d):
+                if distance >= self.threshold:
+                    break
+                student_id, name = self.identities[int(self.group_codes[group])]
+                face.append((student_id, name, float(distance)))
+            matches.append(face)
+        return matches
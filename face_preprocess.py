@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+
+EQUALIZE = (None, 'hist', 'clahe')
+
+class FacePreprocessor:
+    """Turns detected faces into fixed-size, equally normalized LBPH inputs.
+
+    Two steps, so enrollment, training and recognition treat faces alike:
+    crop() cuts the face box plus `margin` (a fraction of the box on every
+    side) out of the frame, replicating the border where the margin leaves
+    the frame; enrollment saves these crops. normalize() resizes a crop to
+    size x size and optionally equalizes it ('hist' or 'clahe'); training
+    applies it to the saved crops, recognition to the crops of every frame.
+
+    normalize() and faces() write into buffers owned by the preprocessor
+    and reused on the next call, so the live loop allocates nothing per
+    face. Copy the result to keep it.
+    """
+    def __init__(self, size=100, margin=0.0, equalize=None, clip_limit=2.0, tile_grid=8):
+        if equalize not in EQUALIZE:
+            raise ValueError(f"equalize must be one of {EQUALIZE}")
+        self.size = int(size)
+        self.margin = float(margin)
+        self.equalize = equalize
+        self.clip_limit = clip_limit
+        self.tile_grid = tile_grid
+        self.clahe = cv2.createCLAHE(clip_limit, (tile_grid, tile_grid)) if equalize == 'clahe' else None
+        self.buffer = np.empty((self.size, self.size), dtype=np.uint8)
+        self.batch = np.empty((8, self.size, self.size), dtype=np.uint8)
+
+    @classmethod
+    def from_config(cls, preprocess):
+        """Preprocessor with the 'preprocess' section of config.json"""
+        return cls(**preprocess)
+
+    def spec(self):
+        spec = {'size': self.size, 'margin': self.margin, 'equalize': self.equalize}
+        if self.equalize == 'clahe':
+            spec.update(clip_limit=self.clip_limit, tile_grid=self.tile_grid)
+        return spec
+
+    def crop(self, gray, box):
+        """The face box with its margin (a view of `gray` unless the margin leaves the frame)"""
+        x, y, w, h = (int(v) for v in box)
+        mx, my = int(round(w * self.margin)), int(round(h * self.margin))
+        x0, y0, x1, y1 = x - mx, y - my, x + w + mx, y + h + my
+        rows, cols = gray.shape[:2]
+        if x0 >= 0 and y0 >= 0 and x1 <= cols and y1 <= rows:
+            return gray[y0:y1, x0:x1]
+        inner = gray[max(y0, 0):min(y1, rows), max(x0, 0):min(x1, cols)]
+        return cv2.copyMakeBorder(inner, max(0, -y0), max(0, y1 - rows), max(0, -x0), max(0, x1 - cols),
+                                  cv2.BORDER_REPLICATE)
+
+    def normalize(self, crop, out=None):
+        """size x size (equalized) version of a crop, written to `out` or the shared buffer"""
+        out = self.buffer if out is None else out
+        if crop.shape[:2] == (self.size, self.size):
+            np.copyto(out, crop)
+        else:
+            # INTER_AREA when shrinking avoids aliasing in the LBP codes
+            shrink = crop.shape[0] > self.size or crop.shape[1] > self.size
+            cv2.resize(crop, (self.size, self.size), dst=out,
+                       interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+        if self.equalize == 'hist':
+            cv2.equalizeHist(out, dst=out)
+        elif self.equalize == 'clahe':
+            self.clahe.apply(out, dst=out)
+        return out
+
+    def faces(self, gray, boxes):
+        """(len(boxes), size, size) normalized faces of a frame, in the shared batch buffer"""
+        if len(boxes) > len(self.batch):
+            self.batch = np.empty((max(len(boxes), 2 * len(self.batch)), self.size, self.size), dtype=np.uint8)
+        for i, box in enumerate(boxes):
+            self.normalize(self.crop(gray, box), self.batch[i])
+        return self.batch[:len(boxes)]
@@ -0,0 +1,147 @@
+from collections import deque
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+def centroid_distance(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    dx = (ax + aw / 2) - (bx + bw / 2)
+    dy = (ay + ah / 2) - (by + bh / 2)
+    return (dx * dx + dy * dy) ** 0.5
+
+class Track:
+    """One face followed across frames, with its recognition history"""
+    def __init__(self, track_id, box, frame_no, history=15):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = frame_no
+        self.last_seen = frame_no
+        self.votes = deque(maxlen=history)
+        self.last_recognized = None
+        self.pending = False
+
+    def add_vote(self, id_pred, confidence):
+        self.votes.append((id_pred, confidence))
+        self.pending = False
+
+    def identity(self):
+        """Vote over the history: most frequent label, ties go to the better confidence.
+
+        Returns (id_pred, mean confidence of that label) or None before the
+        first recognition.
+        """
+        if not self.votes:
+            return None
+        tally = {}
+        for id_pred, confidence in self.votes:
+            count, total = tally.get(id_pred, (0, 0.0))
+            tally[id_pred] = (count + 1, total + confidence)
+        id_pred, (count, total) = min(tally.items(), key=lambda kv: (-kv[1][0], kv[1][1] / kv[1][0]))
+        return id_pred, total / count
+
+class FaceTracker:
+    """Gives each detected box a track ID by IoU, falling back to centroid distance.
+
+    The recognizer only has to run when a track is new, when it is due for a
+    periodic re-verification, or while its voted confidence is poor.
+    """
+    def __init__(self, iou_threshold=0.3, max_missed=5, reverify_every=30,
+                 low_confidence=70, retry_every=5, history=15):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.reverify_every = reverify_every
+        self.low_confidence = low_confidence
+        self.retry_every = retry_every
+        self.history = history
+        self.tracks = {}
+        self.next_id = 1
+
+    def update(self, boxes, frame_no):
+        """Associate this frame's boxes with tracks, returns the tracks in box order"""
+        boxes = [tuple(b) for b in boxes]
+        assigned = [None] * len(boxes)
+        free = set(self.tracks)
+
+        # Greedy IoU matching, best overlaps first
+        pairs = []
+        for i, box in enumerate(boxes):
+            for tid in free:
+                overlap = iou(box, self.tracks[tid].box)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, i, tid))
+        for overlap, i, tid in sorted(pairs, reverse=True):
+            if assigned[i] is None and tid in free:
+                assigned[i] = tid
+                free.discard(tid)
+
+        # Fast movers may not overlap: accept the nearest centroid within half a face
+        for i, box in enumerate(boxes):
+            if assigned[i] is not None:
+                continue
+            best, best_dist = None, None
+            for tid in free:
+                track_box = self.tracks[tid].box
+                dist = centroid_distance(box, track_box)
+                if dist <= 0.5 * max(track_box[2], track_box[3]) and (best is None or dist < best_dist):
+                    best, best_dist = tid, dist
+            if best is not None:
+                assigned[i] = best
+                free.discard(best)
+
+        result = []
+        for i, box in enumerate(boxes):
+            if assigned[i] is None:
+                track = Track(self.next_id, box, frame_no, self.history)
+                self.tracks[track.track_id] = track
+                self.next_id += 1
+            else:
+                track = self.tracks[assigned[i]]
+                track.box = box
+                track.last_seen = frame_no
+            result.append(track)
+
+        for tid in free:
+            if frame_no - self.tracks[tid].last_seen > self.max_missed:
+                del self.tracks[tid]
+        return result
+
+    def needs_recognition(self, track, frame_no):
+        if track.pending:
+            return False
+        if track.last_recognized is None:
+            return True
+        since = frame_no - track.last_recognized
+        identity = track.identity()
+        if identity is None or identity[1] >= self.low_confidence:
+            return since >= self.retry_every
+        return since >= self.reverify_every
+
+    def mark_pending(self, track, frame_no):
+        track.pending = True
+        track.last_recognized = frame_no
+
+    def add_vote(self, track_id, id_pred, confidence):
+        """Record a recognition result, ignored if the track has ended meanwhile"""
+        track = self.tracks.get(track_id)
+        if track is not None:
+            track.add_vote(id_pred, confidence)
+
+    def recognition_failed(self, track_id):
+        track = self.tracks.get(track_id)
+        if track is not None:
+            track.pending = False
+
+    def forget_identities(self):
+        """Drop every vote (the model changed), tracks are recognized again on their next frame"""
+        for track in self.tracks.values():
+            track.votes.clear()
+            track.last_recognized = None
+            track.pending = False
@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+FEATURE_CACHE_FILE = 'feature_cache.db'
+SCHEMA_VERSION = 1
+
+def params_key(params):
+    """Stable text form of a parameter dict (detector options, encoder spec...)"""
+    return json.dumps(params, sort_keys=True, separators=(',', ':'))
+
+def file_signature(path):
+    """(size, mtime in ns) of a file, what a cache entry is keyed on besides the path"""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+def _pack(array):
+    return sqlite3.Binary(np.ascontiguousarray(array).tobytes())
+
+class FeatureCache:
+    """Per-image detection results and features, kept in SQLite between runs.
+
+    Entries are keyed by (kind, path) and are only valid while the file's
+    size and mtime match the stored ones. Each kind ('train', 'encode')
+    stores the parameters its entries were made with; opening the cache
+    with different parameters (e.g. other detector settings) drops every
+    entry of that kind. For each image the cache holds the face boxes, the
+    grayscale face crops and, per feature key (e.g. an encoder spec), one
+    feature vector per crop.
+    """
+    def __init__(self, kind, params, path=FEATURE_CACHE_FILE):
+        self.kind = kind
+        self.params = params_key(params)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._check_params()
+
+    def _create_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            # Only a cache: an unknown layout is simply rebuilt
+            for table in ('kinds', 'entries', 'crops', 'features'):
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS kinds (kind TEXT PRIMARY KEY, params TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+                label INTEGER, boxes TEXT NOT NULL, PRIMARY KEY (kind, path));
+            CREATE TABLE IF NOT EXISTS crops (
+                kind TEXT NOT NULL, path TEXT NOT NULL, n INTEGER NOT NULL,
+                height INTEGER NOT NULL, width INTEGER NOT NULL, data BLOB NOT NULL,
+                PRIMARY KEY (kind, path, n));
+            CREATE TABLE IF NOT EXISTS features (
+                kind TEXT NOT NULL, path TEXT NOT NULL, feature TEXT NOT NULL, dtype TEXT NOT NULL,
+                count INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (kind, path, feature));
+        """)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def _check_params(self):
+        row = self.conn.execute("SELECT params FROM kinds WHERE kind = ?", (self.kind,)).fetchone()
+        if row is not None and row[0] == self.params:
+            return
+        if row is not None:
+            print(f"[INFO] {self.kind} settings changed, dropping its cached features")
+        self.clear()
+        self.conn.execute("INSERT OR REPLACE INTO kinds (kind, params) VALUES (?, ?)", (self.kind, self.params))
+        self.conn.commit()
+
+    def clear(self):
+        for table in ('entries', 'crops', 'features'):
+            self.conn.execute(f"DELETE FROM {table} WHERE kind = ?", (self.kind,))
+
+    def get(self, path):
+        """(label, boxes, crops) cached for an unchanged file, else None.
+
+        A file that cannot be stat'ed (listed in the manifest but deleted)
+        is a miss too; the caller's own read then fails and skips it.
+        """
+        path = os.path.normpath(path)
+        row = self.conn.execute("SELECT size, mtime_ns, label, boxes FROM entries WHERE kind = ? AND path = ?",
+                                (self.kind, path)).fetchone()
+        try:
+            signature = file_signature(path)
+        except OSError:
+            signature = None
+        if row is None or (row[0], row[1]) != signature:
+            self.misses += 1
+            return None
+        self.hits += 1
+        crops = [np.frombuffer(data, dtype=np.uint8).reshape(h, w) for h, w, data in self.conn.execute(
+            "SELECT height, width, data FROM crops WHERE kind = ? AND path = ? ORDER BY n", (self.kind, path))]
+        return row[2], [tuple(box) for box in json.loads(row[3])], crops
+
+    def put(self, path, label, boxes, crops):
+        """Store the detection results of a file (call commit() when done), False if it is gone"""
+        path = os.path.normpath(path)
+        try:
+            size, mtime_ns = file_signature(path)
+        except OSError:
+            return False
+        self._delete(path)
+        self.conn.execute("INSERT INTO entries (kind, path, size, mtime_ns, label, boxes) VALUES (?, ?, ?, ?, ?, ?)",
+                          (self.kind, path, size, mtime_ns, label, json.dumps([list(map(int, b)) for b in boxes])))
+        self.conn.executemany("INSERT INTO crops (kind, path, n, height, width, data) VALUES (?, ?, ?, ?, ?, ?)",
+                              [(self.kind, path, n, crop.shape[0], crop.shape[1], _pack(crop.astype(np.uint8)))
+                               for n, crop in enumerate(crops)])
+        return True
+
+    def get_features(self, path, feature):
+        """(crops, dim) array stored under a feature key, None if missing.
+
+        Only valid after get() returned the entry, i.e. the file is unchanged.
+        """
+        row = self.conn.execute("SELECT dtype, count, data FROM features WHERE kind = ? AND path = ? AND feature = ?",
+                                (self.kind, os.path.normpath(path), feature)).fetchone()
+        if row is None:
+            return None
+        array = np.frombuffer(row[2], dtype=row[0])
+        return array.reshape(row[1], -1) if row[1] else array.reshape(0, 0)
+
+    def put_features(self, path, feature, features):
+        features = np.asarray(features)
+        self.conn.execute("INSERT OR REPLACE INTO features (kind, path, feature, dtype, count, data) "
+                          "VALUES (?, ?, ?, ?, ?, ?)",
+                          (self.kind, os.path.normpath(path), feature, features.dtype.str, len(features),
+                           _pack(features)))
+
+    def evict_missing(self, paths, prefix=None):
+        """Drop the entries of files not in `paths` (only those under `prefix` if given)"""
+        keep = {os.path.normpath(p) for p in paths}
+        stale = [path for (path,) in self.conn.execute("SELECT path FROM entries WHERE kind = ?", (self.kind,))
+                 if path not in keep and (prefix is None or path.startswith(os.path.normpath(prefix)))]
+        for path in stale:
+            self._delete(path)
+        return len(stale)
+
+    def _delete(self, path):
+        for table in ('entries', 'crops', 'features'):
+            self.conn.execute(f"DELETE FROM {table} WHERE kind = ? AND path = ?", (self.kind, path))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def cache_stats(path=FEATURE_CACHE_FILE):
+    """{kind: (images, crops, feature sets)} for a cache file"""
+    conn = sqlite3.connect(path)
+    try:
+        stats = {}
+        for (kind,) in conn.execute("SELECT kind FROM kinds"):
+            counts = [conn.execute(f"SELECT COUNT(*) FROM {table} WHERE kind = ?", (kind,)).fetchone()[0]
+                      for table in ('entries', 'crops', 'features')]
+            stats[kind] = tuple(counts)
+        return stats
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    # Usage: python feature_cache.py [feature_cache.db] [--clear]
+    args = [a for a in sys.argv[1:] if a != '--clear']
+    cache_path = args[0] if args else FEATURE_CACHE_FILE
+    if not os.path.exists(cache_path):
+        print(f"[INFO] No feature cache at {cache_path}")
+    elif '--clear' in sys.argv[1:]:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(cache_path + suffix):
+                os.remove(cache_path + suffix)
+        print(f"[INFO] Removed {cache_path}")
+    else:
+        for kind, (images, crops, features) in cache_stats(cache_path).items():
+            print(f"[INFO] {kind}: {images} images, {crops} crops, {features} feature sets")
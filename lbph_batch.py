@@ -0,0 +1,136 @@
+import sys
+
+import numpy as np
+
+import lbph_model
+from face_encoder import LBPHEncoder
+from face_matcher import BROADCAST_BUDGET
+
+TRAINER_FILE = lbph_model.TRAINER_FILE
+# What cv2.face.LBPHFaceRecognizer reports when no sample is under the threshold
+NO_MATCH = (-1, sys.float_info.max)
+
+class LBPHBatch:
+    """LBPH prediction for many faces at once, compatible with cv2.face.LBPHFaceRecognizer.
+
+    The training histograms of a model are held in one contiguous matrix.
+    LBP codes and spatial histograms of a batch are computed with NumPy
+    (one pass per crop size, one bincount for the whole batch), with the
+    same arithmetic as LBPHEncoder, so they equal what OpenCV computes.
+
+    Distances are OpenCV's HISTCMP_CHISQR_ALT, 2 * sum((q - s)^2 / (q + s)).
+    Bins where the query is zero contribute s, so the sum splits into the
+    sample totals (precomputed) minus the sample mass on the query's non-zero
+    bins, plus the exact terms on those bins. Only those rows of the
+    (bins, samples) matrix are read, which is what makes this faster than
+    comparing every bin. Results match predict() to ~1e-6.
+    """
+    def __init__(self, histograms, labels, radius=1, neighbors=8, grid_x=8, grid_y=8,
+                 threshold=sys.float_info.max):
+        self.encoder = LBPHEncoder(radius, neighbors, grid_x, grid_y)
+        histograms = np.asarray(histograms, dtype=np.float32).reshape(-1, self.encoder.dim)
+        self.labels = np.asarray(labels, dtype=np.int32).reshape(-1)
+        if len(histograms) != len(self.labels):
+            raise ValueError(f"{len(histograms)} histograms but {len(self.labels)} labels")
+        # Bins x samples, so the bins of a query are contiguous rows
+        self.histograms_t = np.ascontiguousarray(histograms.T)
+        self.totals = histograms.sum(axis=1, dtype=np.float64)
+        self.threshold = threshold
+
+    @classmethod
+    def from_recognizer(cls, recognizer):
+        histograms = recognizer.getHistograms()
+        matrix = np.vstack(histograms) if len(histograms) else np.zeros((0, 0), np.float32)
+        return cls(matrix, recognizer.getLabels(), recognizer.getRadius(), recognizer.getNeighbors(),
+                   recognizer.getGridX(), recognizer.getGridY(), recognizer.getThreshold())
+
+    @classmethod
+    def load(cls, model_path=TRAINER_FILE):
+        """Engine with the histograms of a trainer.yml"""
+        return cls.from_recognizer(lbph_model.load_model(model_path))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def histograms(self, crops):
+        """(len(crops), dim) float32 LBPH histograms, equal to LBPHEncoder.encode_crops()"""
+        if isinstance(crops, np.ndarray) and crops.ndim == 3:
+            # Already one stack of equally sized faces (FacePreprocessor.faces())
+            if min(crops.shape[1:]) <= 2 * self.encoder.radius:
+                return np.zeros((len(crops), self.encoder.dim), dtype=np.float32)
+            return self._stack_histograms(crops)
+        out = np.zeros((len(crops), self.encoder.dim), dtype=np.float32)
+        by_shape = {}
+        for i, crop in enumerate(crops):
+            by_shape.setdefault(crop.shape, []).append(i)
+        for shape, indices in by_shape.items():
+            if len(shape) != 2 or min(shape) <= 2 * self.encoder.radius:
+                continue
+            out[indices] = self._stack_histograms(np.stack([crops[i] for i in indices]))
+        return out
+
+    def _stack_histograms(self, stack):
+        enc, r = self.encoder, self.encoder.radius
+        count, rows, cols = stack.shape
+        src = stack.astype(np.float32)
+        h, w = rows - 2 * r, cols - 2 * r
+        center = src[:, r:r+h, r:r+w]
+        codes = np.zeros((count, h, w), dtype=np.int32)
+        eps = np.finfo(np.float32).eps
+        for n, (fx, fy, cx, cy, w1, w2, w3, w4) in enumerate(enc.samples):
+            t = (w1 * src[:, r+fy:r+fy+h, r+fx:r+fx+w] + w2 * src[:, r+fy:r+fy+h, r+cx:r+cx+w]
+                 + w3 * src[:, r+cy:r+cy+h, r+fx:r+fx+w] + w4 * src[:, r+cy:r+cy+h, r+cx:r+cx+w])
+            codes |= ((t > center) | (np.abs(t - center) < eps)).astype(np.int32) << n
+
+        height, width = h // enc.grid_y, w // enc.grid_x
+        if height == 0 or width == 0:
+            return np.zeros((count, enc.dim), dtype=np.float32)
+        cells = codes[:, :height * enc.grid_y, :width * enc.grid_x]
+        cells = cells.reshape(count, enc.grid_y, height, enc.grid_x, width).transpose(0, 1, 3, 2, 4)
+        cells = cells.reshape(count * enc.grid_y * enc.grid_x, height * width)
+        offsets = (np.arange(len(cells)) * enc.bins)[:, None]
+        counts = np.bincount((cells + offsets).ravel(), minlength=len(cells) * enc.bins)
+        return (counts.astype(np.float32) * np.float32(1.0 / (height * width))).reshape(count, enc.dim)
+
+    def distances(self, queries):
+        """(queries, samples) chi-square distances of query histograms to every training sample"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        out = np.empty((len(queries), len(self)), dtype=np.float64)
+        for i, query in enumerate(queries):
+            bins = np.flatnonzero(query)
+            q = query[bins][:, None]
+            # Bound the (bins, samples) temporaries like face_matcher does
+            chunk = max(1, BROADCAST_BUDGET // max(1, len(bins)))
+            for start in range(0, len(self), chunk):
+                end = min(start + chunk, len(self))
+                block = self.histograms_t[bins, start:end]
+                rest = self.totals[start:end] - block.sum(axis=0, dtype=np.float64)
+                diff = block - q
+                diff *= diff
+                block += q
+                diff /= block
+                out[i, start:end] = 2 * (diff.sum(axis=0, dtype=np.float64) + rest)
+        return out
+
+    def predict_histograms(self, queries):
+        """[(label, confidence)] per query histogram, like predict()"""
+        if not len(self):
+            return [NO_MATCH] * len(np.atleast_2d(queries))
+        distances = self.distances(queries)
+        # argmin takes the first of equal distances, as OpenCV's strict '<' scan does
+        best = distances.argmin(axis=1)
+        results = []
+        for row, j in zip(distances, best):
+            if row[j] < self.threshold:
+                results.append((int(self.labels[j]), float(row[j])))
+            else:
+                results.append(NO_MATCH)
+        return results
+
+    def predict(self, crops):
+        """[(label, confidence)] for a batch of grayscale crops (None for crops too small for LBP)"""
+        if not len(crops):
+            return []
+        results = self.predict_histograms(self.histograms(crops))
+        r = self.encoder.radius
+        return [None if min(crop.shape[:2]) <= 2 * r else result for crop, result in zip(crops, results)]
@@ -0,0 +1,127 @@
+import cv2
+import os
+import numpy as np
+
+TRAINER_FILE = 'trainer/trainer.yml'
+
+def _temp_path(model_path):
+    # FileStorage picks the format from the extension, so keep .yml last
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.tmp{ext}"
+
+def load_model(model_path=TRAINER_FILE):
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(model_path)
+    return recognizer
+
+def save_model(recognizer, model_path=TRAINER_FILE):
+    """Write the model next to its destination and swap it in atomically,
+    so a running recognizer never reads a half-written file"""
+    folder = os.path.dirname(model_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    tmp_path = _temp_path(model_path)
+    recognizer.write(tmp_path)
+    os.replace(tmp_path, model_path)
+
+def add_samples(faces, labels, model_path=TRAINER_FILE, replace=False):
+    """Append new face samples to the existing model with LBPH update().
+
+    Only the new samples are turned into histograms, the rest of the model
+    is kept as is. With replace=True the samples already in the model for
+    these labels are dropped first (re-adding all of a user's images).
+    Without an existing model this trains a new one.
+    """
+    labels = np.array(labels, dtype=np.int32)
+    if replace and os.path.exists(model_path):
+        remove_labels(set(labels.tolist()), model_path)
+    if os.path.exists(model_path):
+        recognizer = load_model(model_path)
+        recognizer.update(faces, labels)
+    else:
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.train(faces, labels)
+    save_model(recognizer, model_path)
+    return len(recognizer.getLabels())
+
+def remove_labels(remove, model_path=TRAINER_FILE):
+    """Drop every sample of the given labels from the model, without re-reading any image.
+
+    LBPH has no remove(), so the remaining histograms are written back in
+    the model's own file format. Returns the number of samples left (the
+    model file is deleted if that is zero).
+    """
+    remove = {int(label) for label in remove}
+    recognizer = load_model(model_path)
+    histograms = recognizer.getHistograms()
+    labels = recognizer.getLabels().reshape(-1)
+
+    keep = [i for i, label in enumerate(labels) if int(label) not in remove]
+    if not keep:
+        os.remove(model_path)
+        return 0
+
+    kept_labels = labels[keep].astype(np.int32).reshape(-1, 1)
+    label_info = []
+    for label in sorted({int(label) for label in kept_labels.reshape(-1)}):
+        info = recognizer.getLabelInfo(label)
+        if info:
+            label_info.append((label, info))
+
+    tmp_path = _temp_path(model_path)
+    fs = cv2.FileStorage(tmp_path, cv2.FILE_STORAGE_WRITE)
+    fs.startWriteStruct('opencv_lbphfaces', cv2.FileNode_MAP)
+    fs.write('threshold', float(recognizer.getThreshold()))
+    fs.write('radius', int(recognizer.getRadius()))
+    fs.write('neighbors', int(recognizer.getNeighbors()))
+    fs.write('grid_x', int(recognizer.getGridX()))
+    fs.write('grid_y', int(recognizer.getGridY()))
+    fs.startWriteStruct('histograms', cv2.FileNode_SEQ)
+    for i in keep:
+        fs.write('', histograms[i])
+    fs.endWriteStruct()
+    fs.write('labels', kept_labels)
+    fs.startWriteStruct('labelsInfo', cv2.FileNode_SEQ)
+    for label, info in label_info:
+        fs.startWriteStruct('', cv2.FileNode_MAP)
+        fs.write('label', label)
+        fs.write('value', info)
+        fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.release()
+
+    # Make sure OpenCV can read back what we wrote before replacing the model
+    check = load_model(tmp_path)
+    if len(check.getLabels()) != len(keep):
+        os.remove(tmp_path)
+        raise RuntimeError("Rewritten LBPH model does not match, keeping the old one")
+    os.replace(tmp_path, model_path)
+    return len(keep)
+
+def compare_models(a, b, atol=1e-5):
+    """Check that two LBPH models hold the same samples, in any order.
+
+    Returns a list of differences (empty if they match).
+    """
+    problems = []
+    for name in ('getRadius', 'getNeighbors', 'getGridX', 'getGridY'):
+        if getattr(a, name)() != getattr(b, name)():
+            problems.append(f"{name[3:]} differs: {getattr(a, name)()} vs {getattr(b, name)()}")
+    if problems:
+        return problems
+
+    labels_a, labels_b = a.getLabels().reshape(-1), b.getLabels().reshape(-1)
+    hist_a, hist_b = a.getHistograms(), b.getHistograms()
+    for label in sorted(set(labels_a) | set(labels_b)):
+        rows_a = np.vstack([hist_a[i] for i in np.flatnonzero(labels_a == label)] or [np.zeros((0, 1))])
+        rows_b = np.vstack([hist_b[i] for i in np.flatnonzero(labels_b == label)] or [np.zeros((0, 1))])
+        if len(rows_a) != len(rows_b):
+            problems.append(f"label {label}: {len(rows_a)} vs {len(rows_b)} samples")
+            continue
+        # Sample order differs after updates, compare the sorted rows
+        rows_a = rows_a[np.lexsort(rows_a.T[::-1])]
+        rows_b = rows_b[np.lexsort(rows_b.T[::-1])]
+        if not np.allclose(rows_a, rows_b, atol=atol):
+            problems.append(f"label {label}: histograms differ")
+    return problems
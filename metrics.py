@@ -0,0 +1,255 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+METRICS_FILE = 'metrics.json'
+PREFIX = 'face_'
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+class Histogram:
+    """Latency distribution: cumulative buckets over the whole run plus a rolling window.
+
+    The buckets are what Prometheus expects; the window of the last
+    `window` observations gives the current p50/p90/p99.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1000):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def summary(self):
+        recent = np.fromiter(self.recent, dtype=np.float64, count=len(self.recent)) * 1000
+        summary = {'count': self.count, 'sum_s': round(self.sum, 6)}
+        if len(recent):
+            p50, p90, p99 = np.percentile(recent, [50, 90, 99])
+            summary.update(p50_ms=round(float(p50), 3), p90_ms=round(float(p90), 3),
+                           p99_ms=round(float(p99), 3), max_ms=round(float(recent.max()), 3))
+        return summary
+
+class Metrics:
+    """Counters, latency histograms and gauges of one process (thread-safe).
+
+    Cheap enough to leave on: an observation is a lock, a bisect and a few
+    additions; percentiles are only computed when exported. Names may carry
+    labels as keyword arguments, e.g. inc('frames_dropped', stage='capture').
+
+    With a trace file every trace() call appends one JSON line, for
+    per-frame profiling; without one trace() returns immediately.
+    """
+    def __init__(self, window=1000, trace_file=None):
+        self.window = window
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.help = {}
+        self.started = time.time()
+        self.trace_file = None
+        self.tracing = False
+        if trace_file:
+            self.enable_trace(trace_file)
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, n=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(window=self.window)
+            histogram.observe(seconds)
+
+    def stage(self, stage, seconds, **labels):
+        """Duration of one pipeline stage"""
+        self.observe('stage_seconds', seconds, stage=stage, **labels)
+
+    def timer(self, stage, **labels):
+        return _StageTimer(self, stage, labels)
+
+    def gauge(self, name, fn, **labels):
+        """Value read from fn() at export time"""
+        self.gauges[_key(name, labels)] = fn
+
+    def enable_trace(self, path):
+        self.trace_file = open(path, 'a', buffering=1 << 16)
+        self.tracing = True
+
+    def trace(self, record):
+        """Append one per-frame record to the trace file (no-op unless tracing)"""
+        if not self.tracing:
+            return
+        line = json.dumps(record, separators=(',', ':'))
+        with self.lock:
+            self.trace_file.write(line + '\n')
+
+    def flush(self):
+        if self.tracing:
+            with self.lock:
+                self.trace_file.flush()
+
+    def close(self):
+        if self.tracing:
+            with self.lock:
+                self.tracing = False
+                self.trace_file.close()
+
+    def _gauge_values(self):
+        values = {}
+        for key, fn in list(self.gauges.items()):
+            try:
+                values[key] = float(fn())
+            except Exception:
+                continue # A gauge whose owner went away
+        return values
+
+    def snapshot(self):
+        """Everything as a JSON-serializable dict"""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: h.summary() for key, h in self.histograms.items()}
+        gauges = self._gauge_values()
+        return {
+            'time': time.time(),
+            'uptime_s': round(time.time() - self.started, 3),
+            'counters': {name + _label_text(labels): value for (name, labels), value in sorted(counters.items())},
+            'gauges': {name + _label_text(labels): value for (name, labels), value in sorted(gauges.items())},
+            'histograms': {name + _label_text(labels): s for (name, labels), s in sorted(histograms.items())},
+        }
+
+    def prometheus_text(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: (h.buckets, list(h.counts), h.sum, h.count) for key, h in self.histograms.items()}
+        gauges = self._gauge_values()
+
+        lines = []
+        def header(name, kind):
+            full = PREFIX + name
+            if name in self.help:
+                lines.append(f"# HELP {full} {self.help[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            seen = None
+            for (name, labels), value in sorted(values.items()):
+                metric = name + '_total' if kind == 'counter' else name
+                if metric != seen:
+                    header(metric, kind)
+                    seen = metric
+                lines.append(f"{PREFIX}{metric}{_label_text(labels)} {value}")
+
+        seen = None
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            if name != seen:
+                header(name, 'histogram')
+                seen = name
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f"{PREFIX}{name}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{_label_text(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{PREFIX}{name}_sum{_label_text(labels)} {total}")
+            lines.append(f"{PREFIX}{name}_count{_label_text(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'labels', 'start')
+
+    def __init__(self, metrics, stage, labels):
+        self.metrics = metrics
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.stage(self.stage, time.perf_counter() - self.start, **self.labels)
+        return False
+
+class MetricsExporter(threading.Thread):
+    """Writes Metrics.snapshot() to a JSON file every `interval` seconds and,
+    with a port, serves the Prometheus text format on http://127.0.0.1:<port>/metrics.
+    """
+    def __init__(self, metrics, path=METRICS_FILE, interval=10.0, port=None, host='127.0.0.1'):
+        super().__init__(name="metrics-exporter", daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.server = None
+        if port is not None:
+            self.server = ThreadingHTTPServer((host, port), _handler_for(metrics))
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"[INFO] Metrics at http://{host}:{self.server.server_address[1]}/metrics")
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.export()
+
+    def export(self):
+        self.metrics.flush()
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.metrics.snapshot(), f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def stop(self):
+        """Write a final snapshot and shut the HTTP endpoint down"""
+        self.stopped.set()
+        self.export()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+def _handler_for(metrics):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # No access log on the console
+    return Handler
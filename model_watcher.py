@@ -0,0 +1,220 @@
+import cv2
+import filecmp
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+TRAINER_FILE = 'trainer/trainer.yml'
+MAP_FILE = 'id_to_name_map.json'
+
+def snapshot_dir_for(trainer_path=TRAINER_FILE):
+    """Versioned snapshots live next to the model they were taken of"""
+    return os.path.join(os.path.dirname(trainer_path), 'versions')
+
+def history_file_for(trainer_path=TRAINER_FILE):
+    return os.path.join(os.path.dirname(trainer_path), 'model_versions.csv')
+
+SNAPSHOT_DIR = snapshot_dir_for(TRAINER_FILE)
+HISTORY_FILE = history_file_for(TRAINER_FILE)
+
+def load_names(map_file=MAP_FILE):
+    """Build the id -> name list used to label LBPH predictions"""
+    with open(map_file, 'r') as f:
+        id_to_name_map = json.load(f)
+
+    # Rebuild the 'names' list based on the numeric IDs
+    # Find the highest ID to create the list size
+    max_id = max(int(k) for k in id_to_name_map.keys())
+    names = ["Unknown"] * (max_id + 1) # Create list
+
+    for numeric_id_str, name in id_to_name_map.items():
+        names[int(numeric_id_str)] = name
+    return names
+
+class ModelVersion:
+    """One validated (model, name map) pair, frozen in a snapshot file"""
+    def __init__(self, version, trainer_path, names, changed_at):
+        self.version = version
+        self.trainer_path = trainer_path
+        self.names = names
+        self.changed_at = changed_at
+        self.loaded_at = time.time()
+        self.live_at = None
+
+class ModelWatcher(threading.Thread):
+    """Watches trainer.yml and id_to_name_map.json and prepares new versions in the background.
+
+    When either file changes (and has stopped changing for one poll), the
+    model is copied to a versioned snapshot, loaded and validated on this
+    thread. The recognition loop picks it up with take() between frames, so
+    a bad or half-written model never reaches the workers.
+
+    Each snapshot trainer.vN.yml has its name map frozen beside it in
+    trainer.vN.json. Files identical to the latest snapshot reuse its
+    version, so restarts do not count up. A new version is claimed with a
+    hard link, which fails if another process already took that number.
+    """
+    def __init__(self, trainer_path=TRAINER_FILE, map_file=MAP_FILE, interval=2.0,
+                 snapshot_dir=None, keep=3):
+        super().__init__(name="model-watcher", daemon=True)
+        self.trainer_path = trainer_path
+        self.map_file = map_file
+        self.interval = interval
+        self.snapshot_dir = snapshot_dir or snapshot_dir_for(trainer_path)
+        self.history_file = history_file_for(trainer_path)
+        self.keep = keep
+        self.version = self._latest_snapshot() # Versions keep counting across restarts
+        self.pending = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.signature = None
+
+    def _signature(self):
+        sig = []
+        for path in (self.trainer_path, self.map_file):
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def load_now(self):
+        """Load the current files synchronously (startup), returns the ModelVersion"""
+        self.signature = self._signature()
+        return self._load(time.time())
+
+    def run(self):
+        candidate = None
+        while not self.stopped.wait(self.interval):
+            sig = self._signature()
+            if sig == self.signature:
+                candidate = None
+                continue
+            if sig != candidate:
+                # Still being written (or just changed): look again next poll
+                candidate = sig
+                changed_at = time.time()
+                continue
+
+            candidate = None
+            self.signature = sig
+            current = self.version
+            try:
+                model = self._load(changed_at)
+            except Exception as e:
+                print(f"[WARN] New model rejected, keeping the current one: {e}")
+                continue
+            if model.version == current:
+                continue # Rewritten with the same content
+            with self.lock:
+                self.pending = model
+            print(f"[INFO] Model v{model.version} validated, swapping in")
+
+    def take(self):
+        """Return a newly validated ModelVersion once, or None"""
+        with self.lock:
+            model, self.pending = self.pending, None
+        return model
+
+    def stop(self):
+        self.stopped.set()
+
+    def _load(self, changed_at):
+        if not os.path.exists(self.trainer_path):
+            raise FileNotFoundError(f"Trainer file '{self.trainer_path}' not found")
+        if not os.path.exists(self.map_file):
+            raise FileNotFoundError(f"Name map file '{self.map_file}' not found")
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        version = self._latest_snapshot()
+        if version and self._matches(version):
+            # Unchanged since the latest snapshot (restart, touched file): same version
+            self.version = version
+            snapshot = self._snapshot_path(version)
+            return ModelVersion(version, snapshot, load_names(self._names_path(version)), changed_at)
+
+        # Copy and validate under a private name, then claim the next free version
+        tmp = os.path.join(self.snapshot_dir, f".trainer.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(self.trainer_path, tmp)
+        names_tmp = tmp + '.json'
+        try:
+            shutil.copyfile(self.map_file, names_tmp)
+            names = load_names(names_tmp)
+            self._validate(tmp)
+            while True:
+                version += 1
+                try:
+                    os.link(tmp, self._snapshot_path(version))
+                except FileExistsError:
+                    # Another process took this number first
+                    continue
+                os.replace(names_tmp, self._names_path(version))
+                break
+        finally:
+            for path in (tmp, names_tmp):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        self.version = version
+        self._prune()
+        return ModelVersion(version, self._snapshot_path(version), names, changed_at)
+
+    def _snapshot_path(self, version):
+        return os.path.join(self.snapshot_dir, f"trainer.v{version}.yml")
+
+    def _names_path(self, version):
+        return os.path.join(self.snapshot_dir, f"trainer.v{version}.json")
+
+    def _matches(self, version):
+        """Whether trainer.yml and the name map equal snapshot `version`"""
+        try:
+            return (filecmp.cmp(self.trainer_path, self._snapshot_path(version), shallow=False)
+                    and filecmp.cmp(self.map_file, self._names_path(version), shallow=False))
+        except OSError:
+            # Pruned meanwhile, or a snapshot from before name maps were kept
+            return False
+
+    def _validate(self, snapshot):
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(snapshot)
+        if len(recognizer.getLabels()) == 0:
+            raise ValueError("model has no samples")
+        recognizer.predict(np.zeros((100, 100), dtype=np.uint8))
+
+    def _snapshots(self):
+        """Snapshot file names, oldest version first"""
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        snapshots = [f for f in os.listdir(self.snapshot_dir)
+                     if f.startswith('trainer.v') and f.endswith('.yml') and f[9:-4].isdigit()]
+        return sorted(snapshots, key=lambda f: int(f[9:-4]))
+
+    def _latest_snapshot(self):
+        snapshots = self._snapshots()
+        return int(snapshots[-1][9:-4]) if snapshots else 0
+
+    def _prune(self):
+        for old in self._snapshots()[:-self.keep]:
+            for path in (old, old[:-4] + '.json'):
+                try:
+                    os.remove(os.path.join(self.snapshot_dir, path))
+                except OSError:
+                    pass
+
+def record_swap(model, history_file=HISTORY_FILE):
+    """Append a model version and its swap latency to the history file (ModelWatcher.history_file)"""
+    new_file = not os.path.exists(history_file)
+    with open(history_file, 'a') as f:
+        if new_file:
+            f.write("Version,Changed,Live,Swap_Latency_s,Snapshot\n")
+        f.write(f"{model.version},{datetime.fromtimestamp(model.changed_at):%Y-%m-%d %H:%M:%S},"
+                f"{datetime.fromtimestamp(model.live_at):%Y-%m-%d %H:%M:%S},"
+                f"{model.live_at - model.changed_at:.3f},{model.trainer_path}\n")
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+
+DROP_POLICIES = ('latest', 'every_nth', 'queue')
+
+class FrameBuffer:
+    """Hand-off point between two pipeline stages.
+
+    Drop policies:
+      latest    - keep only the newest frame
+      every_nth - accept every Nth frame, keep only the newest accepted one
+      queue     - keep up to `size` frames, dropping the oldest when full
+
+    With block=True the producer waits for space instead of dropping, which
+    is what file sources want (every frame should be processed).
+    """
+    def __init__(self, policy='latest', size=4, every_n=2):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{policy}', use one of {DROP_POLICIES}")
+        self.policy = policy
+        self.every_n = max(1, every_n)
+        self.capacity = max(1, size) if policy == 'queue' else 1
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.offered = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item, block=False):
+        """Offer an item, returns False if it was dropped"""
+        with self.cond:
+            self.offered += 1
+            if self.policy == 'every_nth' and (self.offered - 1) % self.every_n:
+                self.dropped += 1
+                return False
+
+            if block:
+                while len(self.items) >= self.capacity and not self.closed:
+                    self.cond.wait(0.1)
+                if self.closed:
+                    return False
+            elif len(self.items) >= self.capacity:
+                self.items.popleft()
+                self.dropped += 1
+
+            self.items.append(item)
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout=0):
+        """Take the oldest waiting item, or None if nothing arrived in time"""
+        with self.cond:
+            if not self.items and timeout:
+                self.cond.wait(timeout)
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+class StageStats:
+    """Latency and drop counters for one pipeline stage (thread-safe)"""
+    def __init__(self, name, window=200):
+        self.name = name
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.count = 0
+        self.dropped = 0
+
+    def record(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.latencies.append(seconds)
+
+    def drop(self, n=1):
+        with self.lock:
+            self.dropped += n
+
+    def snapshot(self):
+        with self.lock:
+            recent = list(self.latencies)
+            count, dropped = self.count, self.dropped
+        avg_ms = 1000 * sum(recent) / len(recent) if recent else 0.0
+        max_ms = 1000 * max(recent) if recent else 0.0
+        return {'stage': self.name, 'count': count, 'dropped': dropped,
+                'avg_ms': round(avg_ms, 2), 'max_ms': round(max_ms, 2)}
+
+    def __str__(self):
+        s = self.snapshot()
+        return f"{s['stage']}: {s['count']} done, {s['dropped']} dropped, avg {s['avg_ms']}ms, max {s['max_ms']}ms"
+
+class Timer:
+    """Context manager that records its duration into a StageStats"""
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(time.perf_counter() - self.start)
+        return False
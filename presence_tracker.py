@@ -0,0 +1,80 @@
+import time
+
+class PersonState:
+    def __init__(self, student_id, name, now):
+        self.student_id = student_id
+        self.name = name
+        self.first_seen = now
+        self.last_seen = now
+        self.present = False
+
+class PresenceTracker:
+    """Debounced ENTRY/EXIT state machine.
+
+    A person goes absent -> candidate -> present -> absent:
+      - a detection only counts if its LBPH confidence (lower is better) is
+        below `enter_confidence`, or below the looser `stay_confidence` once
+        the person is present (hysteresis),
+      - a candidate becomes present (ENTRY) after being seen for `min_dwell` seconds,
+      - a present person leaves (EXIT) after not being seen for `exit_delay` seconds.
+
+    Time is passed in by the caller, so the same tracker works on the live
+    clock, on media timestamps and on synthetic timelines.
+    """
+    def __init__(self, exit_delay=5.0, min_dwell=0.5, enter_confidence=80, stay_confidence=100):
+        self.exit_delay = exit_delay
+        self.min_dwell = min_dwell
+        self.enter_confidence = enter_confidence
+        self.stay_confidence = stay_confidence
+        self.people = {}
+
+    def update(self, detections, now=None):
+        """Feed (student_id, name, confidence) detections seen at `now`.
+
+        Returns the debounced events as (student_id, name, action, timestamp);
+        ENTRY is stamped with the first sighting and EXIT with the last one.
+        """
+        if now is None:
+            now = time.time()
+
+        for student_id, name, confidence in detections:
+            state = self.people.get(student_id)
+            present = state is not None and state.present
+            if confidence >= (self.stay_confidence if present else self.enter_confidence):
+                continue
+            if state is None:
+                state = self.people[student_id] = PersonState(student_id, name, now)
+            state.last_seen = max(state.last_seen, now)
+
+        return self.tick(now)
+
+    def tick(self, now=None):
+        """Advance the clock without new detections, returns due events"""
+        if now is None:
+            now = time.time()
+
+        events = []
+        for student_id, state in list(self.people.items()):
+            gone = now - state.last_seen > self.exit_delay
+            if state.present:
+                if gone:
+                    events.append((student_id, state.name, "EXIT", state.last_seen))
+                    del self.people[student_id]
+            elif gone:
+                # Seen too briefly to count, forget it
+                del self.people[student_id]
+            elif state.last_seen - state.first_seen >= self.min_dwell:
+                state.present = True
+                events.append((student_id, state.name, "ENTRY", state.first_seen))
+        return events
+
+    def close(self, now=None):
+        """Force everyone out (shutdown), returns the EXIT (FORCED) events"""
+        if now is None:
+            now = time.time()
+        events = [(sid, st.name, "EXIT (FORCED)", now) for sid, st in self.people.items() if st.present]
+        self.people = {}
+        return events
+
+    def present_ids(self):
+        return {sid for sid, st in self.people.items() if st.present}
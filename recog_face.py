@@ -1,186 +1,158 @@
-import cv2
 import os
-import time
-import pickle
-import json # Import json
+import argparse
 from datetime import datetime
 
-# ---------------------------
-# Helper: simple fallback logger
-# ---------------------------
-def simple_log_attendance(student_id, student_name, action, attendance_file='attendance_log.csv'):
-    now = datetime.now()
-    date_str = now.strftime("%Y-%m-%d")
-    time_str = now.strftime("%H:%M:%S")
-    entry = f"{date_str},{time_str},{student_id},{student_name},{action}\n"
-    if not os.path.exists(attendance_file):
-        with open(attendance_file, 'w') as f:
-            f.write("Date,Time,Student_ID,Student_Name,Action\n")
-    with open(attendance_file, 'a') as f:
-        f.write(entry)
-    print(f"📝 {action}: {student_name} ({student_id}) at {time_str}")
-
-# ---------------------------
-# Try to use AttendanceSystem (preferred)
-# ---------------------------
-attendance_system = None
-face_db = None
-try:
-    from attendance_logger import AttendanceSystem
-    attendance_system = AttendanceSystem()
-    face_db = attendance_system.face_data
-    print("[INFO] Using attendance_logger.AttendanceSystem for logging.")
-except SystemExit:
-    print("[WARN] attendance_logger found no face_database.pkl. Falling back to simple logging.")
-    attendance_system = None
-except Exception as e:
-    print(f"[WARN] Could not import AttendanceSystem ({e}). Falling back to simple logging.")
-    attendance_system = None
-
-# ---------------------------
-# Load LBPH recognizer
-# ---------------------------
-recognizer = cv2.face.LBPHFaceRecognizer_create()
-trainer_path = 'trainer/trainer.yml'
-if not os.path.exists(trainer_path):
-    print(f"[ERROR] Trainer file '{trainer_path}' not found. Please run train_model.py first.")
-    exit(1)
-recognizer.read(trainer_path)
-print(f"[INFO] Loaded trainer model from {trainer_path}")
-
-# ---------------------------
-# DYNAMICALLY LOAD NAMES (No manual editing)
-# ---------------------------
-MAP_FILE = 'id_to_name_map.json'
-names = []
-if os.path.exists(MAP_FILE):
-    with open(MAP_FILE, 'r') as f:
-        id_to_name_map = json.load(f)
-    
-    # Rebuild the 'names' list based on the numeric IDs
-    # Find the highest ID to create the list size
-    max_id = max(int(k) for k in id_to_name_map.keys())
-    names = ["Unknown"] * (max_id + 1) # Create list
-    
-    for numeric_id_str, name in id_to_name_map.items():
-        names[int(numeric_id_str)] = name
-        
-    print(f"[INFO] Dynamically loaded names: {names}")
-else:
-    print(f"[ERROR] Name map file '{MAP_FILE}' not found. Please run combined_enrollment.py first.")
-    exit(1)
-
-# ---------------------------
-# Setup cascade, camera, etc.
-# ---------------------------
-cascadePath = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-faceCascade = cv2.CascadeClassifier(cascadePath)
-font = cv2.FONT_HERSHEY_SIMPLEX
-cam = cv2.VideoCapture(0)
-cam.set(3, 640)
-cam.set(4, 480)
-minW = 0.1 * cam.get(3)
-minH = 0.1 * cam.get(4)
-
-# ---------------------------
-# Build name -> student_id mapping (from face_database.pkl)
-# ---------------------------
-name_to_id = {}
-if face_db:
-    try:
-        for i, nm in enumerate(face_db['names']):
-            name_to_id[nm] = face_db['ids'][i]
-        print(f"[INFO] Loaded name -> student_id mapping: {name_to_id}")
-    except Exception as e:
-        print(f"[WARN] Could not build name->id mapping: {e}")
+import runtime
+from attendance_writer import get_writer, close_all
+from face_detector import load_rois
+from metrics import Metrics, MetricsExporter
+from model_watcher import load_names
+from pipeline import DROP_POLICIES
+from presence_tracker import PresenceTracker
+from recognition_engine import RecognitionEngine
 
 # ---------------------------
-# Main Loop
+# Helper: attendance logger (background writer + console line)
 # ---------------------------
-currently_present = set()
-print("[INFO] Starting recognition. Press 'q' to quit.")
-
-while True:
-    ret, img = cam.read()
-    if not ret: break
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = faceCascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(int(minW), int(minH)))
-    current_frame_detections = set()
-
-    for (x, y, w, h) in faces:
+def simple_log_attendance(student_id, student_name, action, timestamp=None, attendance_file=None,
+                          model_version=None):
+    now = timestamp or datetime.now()
+    get_writer(attendance_file or runtime.path('attendance')).log(student_id, student_name, action, now, model_version)
+    version = f" [model v{model_version}]" if model_version is not None else ""
+    print(f"📝 {action}: {student_name} ({student_id}) at {now:%H:%M:%S}{version}")
+
+def main():
+    # Defaults come from config.json (see config.py), flags override them
+    config = runtime.config()
+    recognition = config['recognition']
+    parser = argparse.ArgumentParser(description="Real-time face recognition and attendance")
+    parser.add_argument('sources', nargs='*', default=[str(config['camera']['index'])],
+                        help="Camera indices, video files or image folders (default: the configured camera)")
+    parser.add_argument('--workers', type=int, default=config['workers']['recognition'],
+                        help="Recognition worker processes (default: CPU count - 1)")
+    parser.add_argument('--drop-policy', choices=DROP_POLICIES, default='latest',
+                        help="What a source keeps when recognition falls behind")
+    parser.add_argument('--queue-size', type=int, default=4,
+                        help="Frames kept per source with --drop-policy queue")
+    parser.add_argument('--every-n', type=int, default=2,
+                        help="Frame stride with --drop-policy every_nth")
+    parser.add_argument('--track', action='store_true',
+                        help="Track faces across frames and run LBPH once per track instead of every frame")
+    parser.add_argument('--reverify-every', type=int, default=30,
+                        help="Frames between re-recognitions of a confidently tracked face")
+    parser.add_argument('--downscale', type=float, default=1.0,
+                        help="Run face detection on a frame this many times smaller")
+    parser.add_argument('--full-scan-every', type=int, default=1,
+                        help="Frames between full-frame scans, in between only known faces are searched")
+    parser.add_argument('--rois', default=runtime.path('rois'),
+                        help="JSON file with detection ROI polygons per source")
+    parser.add_argument('--exit-delay', type=float, default=recognition['exit_delay'],
+                        help="Seconds a present person must be unseen before an EXIT is logged")
+    parser.add_argument('--min-dwell', type=float, default=recognition['min_dwell'],
+                        help="Seconds a person must be seen before an ENTRY is logged")
+    parser.add_argument('--enter-confidence', type=float, default=recognition['enter_confidence'],
+                        help="LBPH confidence needed to enter (lower is stricter)")
+    parser.add_argument('--stay-confidence', type=float, default=recognition['stay_confidence'],
+                        help="LBPH confidence that keeps a present person present")
+    parser.add_argument('--attendance', default=runtime.path('attendance'),
+                        help="Attendance log, a .db/.sqlite name selects the SQLite store (which also records the model version)")
+    parser.add_argument('--stats-interval', type=int, default=30,
+                        help="Seconds between stage statistics printouts (0 = only at exit)")
+    parser.add_argument('--headless', action='store_true',
+                        help="No windows or drawing (servers); see batch_process.py for recorded footage")
+    parser.add_argument('--no-watch', action='store_true',
+                        help="Do not reload trainer.yml / id_to_name_map.json when they change")
+    parser.add_argument('--watch-interval', type=float, default=2.0,
+                        help="Seconds between checks for a new model")
+    parser.add_argument('--metrics-file', default=runtime.path('metrics'),
+                        help="JSON file the stage timings and counters are written to ('' = off)")
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help="Seconds between metrics file updates")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--trace', default=None, metavar='FILE',
+                        help="Append a JSON line per frame with its stage timings (profiling)")
+    parser.add_argument('--batch-lbph', action='store_true',
+                        help="Score all faces of a frame at once with the NumPy LBPH engine (crowded scenes)")
+    args = parser.parse_args()
+
+    # ---------------------------
+    # Check the LBPH model (loaded by every worker process)
+    # ---------------------------
+    trainer_path = runtime.path('trainer')
+    if not os.path.exists(trainer_path):
+        print(f"[ERROR] Trainer file '{trainer_path}' not found. Please run train_model.py first.")
+        exit(1)
+
+    # ---------------------------
+    # DYNAMICALLY LOAD NAMES (No manual editing)
+    # ---------------------------
+    names = []
+    map_file = runtime.path('name_map')
+    if os.path.exists(map_file):
+        names = load_names(map_file)
+        print(f"[INFO] Dynamically loaded names: {names}")
+    else:
+        print(f"[ERROR] Name map file '{map_file}' not found. Please run combined_enrollment.py first.")
+        exit(1)
+
+    # ---------------------------
+    # Build name -> student_id mapping (from the face database identity table)
+    # ---------------------------
+    # Only the identity table is needed here: the LBPH loop never loads the
+    # encoder, matcher or index that AttendanceSystem would build
+    name_to_id = {}
+    face_db = runtime.face_database()
+    if face_db:
         try:
-            id_pred, confidence = recognizer.predict(gray[y:y+h, x:x+w])
+            name_to_id = dict(face_db.id_by_name)
+            print(f"[INFO] Loaded name -> student_id mapping: {name_to_id}")
         except Exception as e:
-            continue
-
-        if confidence < 100:
-            if id_pred < len(names):
-                id_name = names[id_pred] # Get name from our dynamic list
-            else:
-                id_name = "Unknown" # ID is out of range
-            confidence_text = f"{round(100 - confidence)}%"
-            color = (0, 255, 0)
-        else:
-            id_name = "Unknown"
-            confidence_text = f"{round(100 - confidence)}%"
-            color = (0, 0, 255)
-
-        # Get Student ID (from face_db)
-        student_id = name_to_id.get(id_name, str(id_pred)) # Fallback to numeric ID
-
-        # Draw box and text
-        cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
-        cv2.putText(img, str(id_name), (x + 5, y - 5), font, 1, color, 2)
-        cv2.putText(img, str(confidence_text), (x + 5, y + h - 5), font, 1, (255, 255, 0), 1)
-
-        if id_name != "Unknown" and id_name != "None":
-            current_frame_detections.add(student_id)
-            if student_id not in currently_present:
-                # Log ENTRY
-                log_name = id_name
-                log_id = student_id
-                
-                if attendance_system:
-                    attendance_system.log_attendance(log_id, log_name, "ENTRY")
-                else:
-                    simple_log_attendance(log_id, log_name, "ENTRY")
-                currently_present.add(student_id)
-
-    # Detect Exits
-    exited = currently_present - current_frame_detections
-    for sid in exited:
-        sname = "Unknown"
-        # Find name for this student_id
-        for name, student_id_val in name_to_id.items():
-            if student_id_val == sid:
-                sname = name
-                break
-        
-        if attendance_system:
-            attendance_system.log_attendance(sid, sname, "EXIT")
-        else:
-            simple_log_attendance(sid, sname, "EXIT")
-        currently_present.discard(sid)
-
-    cv2.putText(img, f'Present: {len(currently_present)}', (10, 30), font, 1, (255, 255, 255), 2)
-    cv2.imshow('camera', img)
-
-    k = cv2.waitKey(10) & 0xff
-    if k == 27 or k == ord('q'):
-        break
-
-# --- Cleanup ---
-for sid in list(currently_present):
-    sname = "Unknown"
-    for name, student_id_val in name_to_id.items():
-        if student_id_val == sid:
-            sname = name
-            break
-    if attendance_system:
-        attendance_system.log_attendance(sid, sname, "EXIT (FORCED)")
-    else:
-        simple_log_attendance(sid, sname, "EXIT (FORLED)")
-
-print("[INFO] Recognition stopped.")
-cam.release()
-cv2.destroyAllWindows()
+            print(f"[WARN] Could not build name->id mapping: {e}")
+
+    rois = {}
+    for i, spec in enumerate(args.sources):
+        polygons = load_rois(spec, args.rois)
+        if polygons:
+            rois[i] = polygons
+            print(f"[INFO] Source {spec}: detecting in {len(polygons)} ROI polygon(s)")
+
+    presence = PresenceTracker(exit_delay=args.exit_delay, min_dwell=args.min_dwell,
+                               enter_confidence=args.enter_confidence,
+                               stay_confidence=args.stay_confidence)
+    def log_attendance(student_id, student_name, action, timestamp=None, model_version=None):
+        simple_log_attendance(student_id, student_name, action, timestamp, args.attendance, model_version)
+
+    metrics = Metrics(trace_file=args.trace)
+    writer = get_writer(args.attendance)
+    writer.metrics = metrics
+    metrics.gauge('attendance_queue', writer.queue.qsize)
+    exporter = MetricsExporter(metrics, args.metrics_file, args.metrics_interval, args.metrics_port)
+    exporter.start()
+
+    # ---------------------------
+    # Main Loop
+    # ---------------------------
+    print("[INFO] Starting recognition. " + ("Press Ctrl+C to stop." if args.headless else "Press 'q' to quit."))
+    engine = RecognitionEngine(args.sources, names, name_to_id, log_attendance,
+                               trainer_path=trainer_path, workers=args.workers,
+                               drop_policy=args.drop_policy, queue_size=args.queue_size,
+                               every_n=args.every_n, show=not args.headless,
+                               stats_interval=args.stats_interval,
+                               track=args.track, reverify_every=args.reverify_every,
+                               detector_options=dict(runtime.detector_options('live'), downscale=args.downscale),
+                               rois=rois,
+                               full_scan_every=args.full_scan_every, presence=presence,
+                               map_file=map_file, watch=not args.no_watch,
+                               watch_interval=args.watch_interval, metrics=metrics,
+                               batch_lbph=args.batch_lbph, preprocess=config['preprocess'],
+                               camera_size=(config['camera']['width'], config['camera']['height']))
+    engine.run()
+    # The forced exits are queued by now, write them out before leaving
+    close_all()
+    exporter.stop()
+    metrics.close()
+    print("[INFO] Recognition stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,590 @@
+import cv2
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from face_detector import FaceDetector
+from face_preprocess import FacePreprocessor
+from face_tracker import FaceTracker
+from lbph_batch import LBPHBatch
+from metrics import Metrics
+from model_watcher import MAP_FILE, ModelVersion, ModelWatcher, record_swap
+from pipeline import FrameBuffer, StageStats, Timer
+from presence_tracker import PresenceTracker
+from video_sources import CaptureThread
+
+TRAINER_FILE = 'trainer/trainer.yml'
+
+# Detection settings of the live loop
+DETECTOR_OPTIONS = {'scale_factor': 1.2, 'min_neighbors': 5, 'min_size_ratio': 0.1}
+
+# ---------------------------
+# Worker process side
+# init_worker() and recognize_frame() are the public entry points (batch_process.py
+# runs them on its own pool); everything prefixed with _ may change with the engine.
+# ---------------------------
+_worker_recognizer = None
+_worker_batch = None
+_worker_use_batch = False
+_worker_model_version = None
+_worker_detector_options = None
+_worker_preprocessor = None
+_worker_rois = None
+_worker_detectors = {}
+
+def init_worker(model, detector_options, rois_by_source, batch_lbph=False, preprocess=None):
+    """Pool initializer: load the LBPH model and detection settings once per worker process"""
+    global _worker_detector_options, _worker_rois, _worker_use_batch, _worker_preprocessor
+    # One OpenCV thread per process, the pool provides the parallelism
+    cv2.setNumThreads(1)
+    _worker_use_batch = batch_lbph
+    _worker_preprocessor = FacePreprocessor(**(preprocess or {}))
+    _load_model(model)
+    _worker_detector_options = detector_options
+    _worker_rois = rois_by_source
+
+def _load_model(model):
+    """Switch to the (version, trainer_path) model if this worker runs another one"""
+    global _worker_recognizer, _worker_batch, _worker_model_version
+    version, trainer_path = model
+    if version == _worker_model_version:
+        return
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(trainer_path)
+    _worker_batch = LBPHBatch.from_recognizer(recognizer) if _worker_use_batch else None
+    _worker_recognizer, _worker_model_version = recognizer, version
+
+def _predict(crops):
+    """(label, confidence) per crop, None where LBPH could not run"""
+    if _worker_batch is not None:
+        return _worker_batch.predict(crops)
+    predictions = []
+    for crop in crops:
+        try:
+            id_pred, confidence = _worker_recognizer.predict(crop)
+            predictions.append((int(id_pred), float(confidence)))
+        except cv2.error:
+            predictions.append(None)
+    return predictions
+
+def _detect(source_id, gray, regions):
+    # Every source may have its own ROIs, so every source gets its own detector
+    detector = _worker_detectors.get(source_id)
+    if detector is None:
+        detector = FaceDetector(rois=_worker_rois.get(source_id), **_worker_detector_options)
+        _worker_detectors[source_id] = detector
+    return detector.detect(gray, regions)
+
+def recognize_frame(source_id, frame_no, frame, regions=None, model=None):
+    """Detect and recognize every face of one frame.
+
+    Returns (source_id, frame_no, results, seconds, model_version, stage seconds).
+    """
+    start = time.perf_counter()
+    if model is not None:
+        _load_model(model)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    converted = time.perf_counter()
+    boxes = _detect(source_id, gray, regions)
+    detected = time.perf_counter()
+
+    results = []
+    for (x, y, w, h), prediction in zip(boxes, _predict(_worker_preprocessor.faces(gray, boxes))):
+        if prediction is not None:
+            results.append(((x, y, w, h),) + prediction)
+    end = time.perf_counter()
+    timings = {'cvtColor': converted - start, 'detect': detected - converted, 'recognize': end - detected}
+    return source_id, frame_no, results, end - start, _worker_model_version, timings
+
+def _detect_frame(source_id, frame_no, frame, regions=None):
+    """Detection only (track mode): returns the boxes and their normalized face crops"""
+    start = time.perf_counter()
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    converted = time.perf_counter()
+    boxes = _detect(source_id, gray, regions)
+    crops = list(_worker_preprocessor.faces(gray, boxes).copy())
+    end = time.perf_counter()
+    timings = {'cvtColor': converted - start, 'detect': end - converted}
+    return source_id, frame_no, boxes, crops, end - start, timings
+
+def _predict_crops(source_id, items, model=None):
+    """Run LBPH on the (track_id, crop) pairs the trackers asked for"""
+    start = time.perf_counter()
+    if model is not None:
+        _load_model(model)
+    predictions = [(track_id,) + (prediction or (None, None))
+                   for (track_id, _), prediction in zip(items, _predict([crop for _, crop in items]))]
+    return source_id, predictions, time.perf_counter() - start, _worker_model_version
+
+# ---------------------------
+# Aggregator (main process)
+# ---------------------------
+class PresenceAggregator:
+    """Owns the presence state of all sources and logs debounced ENTRY/EXIT events"""
+    def __init__(self, names, name_to_id, log_attendance, presence=None):
+        self.names = names
+        self.name_to_id = name_to_id
+        self.log_attendance = log_attendance
+        self.presence = presence or PresenceTracker()
+        self.model_version = None
+        self.names_by_version = {}
+
+    def set_model(self, version, names, keep=3):
+        """Label results with a new model's names, the presence state is kept"""
+        self.names_by_version[version] = names
+        for old in sorted(self.names_by_version)[:-keep]:
+            del self.names_by_version[old]
+        self.names = names
+        self.model_version = version
+
+    @property
+    def currently_present(self):
+        return self.presence.present_ids()
+
+    def label(self, id_pred, confidence, names=None):
+        """Translate an LBPH prediction into (name, student_id, known)"""
+        names = self.names if names is None else names
+        if confidence < 100 and 0 <= id_pred < len(names):
+            id_name = names[id_pred]
+        else:
+            id_name = "Unknown"
+        student_id = self.name_to_id.get(id_name, str(id_pred)) # Fallback to numeric ID
+        known = id_name != "Unknown" and id_name != "None"
+        return id_name, student_id, known
+
+    def update(self, source_id, results, now=None, model_version=None):
+        """Apply the recognitions of one frame, returns the labelled faces.
+
+        Results still in flight when the model was swapped are labelled with
+        the names of the model version that produced them.
+        """
+        if model_version is None:
+            model_version = self.model_version
+        names = self.names_by_version.get(model_version, self.names)
+        labelled = []
+        detections = []
+        for box, id_pred, confidence in results:
+            id_name, student_id, known = self.label(id_pred, confidence, names)
+            if known:
+                detections.append((student_id, id_name, confidence))
+            labelled.append((box, id_name, student_id, confidence, known))
+
+        # A person stays present as long as any source keeps seeing them
+        self._log(self.presence.update(detections, now), model_version)
+        return labelled
+
+    def tick(self, now=None):
+        """Let exit delays expire even when no frames arrive"""
+        self._log(self.presence.tick(now))
+
+    def close(self):
+        """Log forced exits for everyone still present"""
+        self._log(self.presence.close())
+
+    def _log(self, events, model_version=None):
+        if model_version is None:
+            model_version = self.model_version
+        for student_id, name, action, timestamp in events:
+            self.log_attendance(student_id, name, action, datetime.fromtimestamp(timestamp),
+                                model_version=model_version)
+
+# ---------------------------
+# Engine
+# ---------------------------
+class RecognitionEngine:
+    """Runs recognition for N sources as a capture -> inference -> render pipeline.
+
+    Each source is read by its own capture thread into a FrameBuffer whose
+    drop policy keeps inference from falling behind the camera. Frames are
+    recognized on a pool of worker processes, and every result goes back to
+    a single aggregator, which owns presence and attendance logging. The
+    render stage runs on the main thread and only ever shows the newest
+    result of each source. Results of files and folders are handled in
+    frame order (held back when they overtake an earlier frame); for
+    cameras a result older than the last one handled is dropped.
+
+    With track=True the workers only detect; each source's FaceTracker
+    decides which tracks need LBPH and the identity is voted per track.
+
+    Detection covers the source's ROIs (rois: source index -> polygons) and
+    does a full scan every `full_scan_every` frames; in between only the
+    area around the last known faces is searched.
+
+    `presence` is the PresenceTracker that debounces ENTRY/EXIT events.
+
+    With watch=True the model and name map are watched while running: a new
+    version is validated by a ModelWatcher thread and swapped in between
+    frames, workers reload it with their next task. Captures and presence
+    state are untouched by a swap.
+
+    With batch_lbph=True the workers score all faces of a frame (or all
+    track re-checks) in one call of the NumPy engine in lbph_batch.py
+    instead of one predict() per face. Faces are cropped and normalized by a
+    FacePreprocessor with the `preprocess` options (face_preprocess.py),
+    which must be the ones the model was trained with.
+
+    Cameras are opened at `camera_size` (width, height).
+
+    Stage timings, counters and per-frame traces go to `metrics` (see
+    metrics.py); exporting them is up to the caller.
+    """
+    def __init__(self, sources, names, name_to_id, log_attendance,
+                 trainer_path=TRAINER_FILE, workers=None, drop_policy='latest',
+                 queue_size=4, every_n=2, show=True, stats_interval=30,
+                 track=False, reverify_every=30, detector_options=None, rois=None,
+                 full_scan_every=1, presence=None, map_file=MAP_FILE, watch=True,
+                 watch_interval=2.0, metrics=None, batch_lbph=False, preprocess=None, camera_size=(640, 480)):
+        self.sources = list(sources)
+        self.camera_size = camera_size
+        self.trainer_path = trainer_path
+        self.map_file = map_file
+        self.watch = watch
+        self.watch_interval = watch_interval
+        self.watcher = None
+        self.model = None
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.drop_policy = drop_policy
+        self.queue_size = queue_size
+        self.every_n = every_n
+        self.show = show
+        self.stats_interval = stats_interval
+        self.track = track
+        self.reverify_every = reverify_every
+        self.detector_options = dict(DETECTOR_OPTIONS, **(detector_options or {}))
+        self.rois = rois or {}
+        self.full_scan_every = max(1, full_scan_every)
+        self.batch_lbph = batch_lbph
+        self.preprocess = preprocess
+        self.log_attendance = log_attendance
+        self.aggregator = PresenceAggregator(names, name_to_id, self._log_event, presence)
+        self.metrics = metrics or Metrics()
+        self.font = cv2.FONT_HERSHEY_SIMPLEX
+        self.stopped = threading.Event()
+
+        self.worker_stats = StageStats("detect" if track else "detect+recognize")
+        self.recognize_stats = StageStats("recognize")
+        self.inference_stats = StageStats("inference")
+        self.latency_stats = StageStats("capture->result")
+        self.render_stats = StageStats("render")
+        self.render_buffers = {}
+        self.captures = []
+        self.trackers = {}
+        self.frames_done = 0
+        self.recognizer_calls = 0
+        self.model_swaps = 0
+        self._describe_metrics()
+
+    def _describe_metrics(self):
+        m = self.metrics
+        m.describe('stage_seconds', "Duration of each pipeline stage")
+        m.describe('frames_total', "Frames recognized")
+        m.describe('faces_detected_total', "Faces found by the detector")
+        m.describe('recognitions_total', "LBPH predictions run")
+        m.describe('unknowns_total', "Faces labelled Unknown")
+        m.describe('events_logged_total', "Attendance events logged")
+        m.describe('frames_dropped_total', "Frames dropped, by stage")
+        m.describe('model_swaps_total', "Recognizer models hot-swapped in")
+        m.gauge('present', lambda: len(self.aggregator.currently_present))
+        m.gauge('model_version', lambda: self.model.version if self.model else 0)
+
+    def run(self):
+        if self.watch:
+            self.watcher = ModelWatcher(self.trainer_path, self.map_file, self.watch_interval)
+            self.model = self.watcher.load_now()
+            self.watcher.start()
+        else:
+            self.model = ModelVersion(1, self.trainer_path, self.aggregator.names, time.time())
+        self.model.live_at = time.time()
+        self.aggregator.set_model(self.model.version, self.model.names)
+        if self.watch:
+            record_swap(self.model, self.watcher.history_file)
+
+        self.captures = [CaptureThread(i, spec, self.drop_policy, self.queue_size, self.every_n, self.metrics,
+                                       *self.camera_size)
+                         for i, spec in enumerate(self.sources)]
+        self.render_buffers = {t.source_id: FrameBuffer('latest') for t in self.captures}
+        self.trackers = {t.source_id: FaceTracker(reverify_every=self.reverify_every) for t in self.captures}
+        for t in self.captures:
+            t.start()
+
+        print(f"[INFO] Recognition engine: {len(self.captures)} source(s), {self.workers} worker(s), "
+              f"drop policy '{self.drop_policy}'{', track mode' if self.track else ''}, "
+              f"model v{self.model.version}{' (watching for updates)' if self.watch else ''}")
+        inference = threading.Thread(target=self._inference_loop, name="inference", daemon=True)
+        start = time.time()
+        inference.start()
+        try:
+            if self.show:
+                self._render_loop()
+            while inference.is_alive():
+                inference.join(0.5)
+        except KeyboardInterrupt:
+            print("[INFO] Interrupted.")
+        finally:
+            self.stopped.set()
+            inference.join()
+            if self.watcher:
+                self.watcher.stop()
+            if self.show:
+                cv2.destroyAllWindows()
+
+        elapsed = time.time() - start
+        if elapsed > 0:
+            print(f"[INFO] Processed {self.frames_done} frames in {elapsed:.1f}s ({self.frames_done / elapsed:.1f} fps)")
+        self.print_stats()
+
+    def stage_stats(self):
+        """Per-stage latency and drop counters"""
+        stats = [t.stats.snapshot() for t in self.captures]
+        stats += [s.snapshot() for s in self._stages()]
+        return stats
+
+    def _stages(self):
+        stages = [self.worker_stats, self.inference_stats, self.latency_stats, self.render_stats]
+        if self.track:
+            stages.insert(1, self.recognize_stats)
+        return stages
+
+    def print_stats(self):
+        for t in self.captures:
+            print(f"[STATS] {t.stats}")
+        for s in self._stages():
+            print(f"[STATS] {s}")
+        if self.frames_done:
+            print(f"[STATS] recognizer calls: {self.recognizer_calls} "
+                  f"({self.recognizer_calls / self.frames_done:.2f} per frame)")
+        if self.model_swaps:
+            print(f"[STATS] model: v{self.model.version}, {self.model_swaps} hot swap(s)")
+
+    def _inference_loop(self):
+        last_frame_no = {t.source_id: 0 for t in self.captures}
+        last_boxes = {t.source_id: [] for t in self.captures}
+        dispatched = {t.source_id: 0 for t in self.captures}
+        # Files and folders: frame numbers in dispatch order, and results held until their turn
+        ordered = {t.source_id: deque() for t in self.captures if not t.is_live}
+        held = {source_id: {} for source_id in ordered}
+        finished = set()
+        in_flight = {}
+        max_in_flight = self.workers * 2
+        next_stats = time.time() + self.stats_interval
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                 initargs=(self._model_spec(), self.detector_options, self.rois,
+                                           self.batch_lbph, self.preprocess)) as pool:
+            try:
+                while not self.stopped.is_set():
+                    # Swap between frames: everything submitted from here on uses the new model
+                    model = self.watcher.take() if self.watcher else None
+                    if model is not None:
+                        self._swap_model(model)
+
+                    # Hand out frames round-robin so no source starves the others
+                    for t in self.captures:
+                        if len(in_flight) >= max_in_flight:
+                            break
+                        item = t.get_frame()
+                        if item is None:
+                            if t.exhausted():
+                                finished.add(t.source_id)
+                            continue
+                        frame_no, captured_at, frame = item
+                        # Scheduled here, not in a worker's detector: a source's frames are spread over the pool.
+                        # Empty regions (nothing found last time) also mean a full scan.
+                        full_scan = dispatched[t.source_id] % self.full_scan_every == 0
+                        dispatched[t.source_id] += 1
+                        regions = None if full_scan else last_boxes[t.source_id]
+                        if self.track:
+                            future = pool.submit(_detect_frame, t.source_id, frame_no, frame, regions)
+                        else:
+                            future = pool.submit(recognize_frame, t.source_id, frame_no, frame, regions,
+                                                 self._model_spec())
+                        in_flight[future] = ('frame', (captured_at, time.perf_counter(), frame if self.show else None))
+                        if t.source_id in ordered:
+                            ordered[t.source_id].append(frame_no)
+
+                    self.aggregator.tick()
+                    if not in_flight:
+                        if len(finished) == len(self.captures):
+                            break
+                        time.sleep(0.005)
+                        continue
+
+                    done, _ = wait(in_flight, timeout=0.05, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        kind, meta = in_flight.pop(future)
+                        if kind == 'crops':
+                            self._apply_predictions(*future.result())
+                            continue
+
+                        result = future.result()
+                        if self.track:
+                            source_id, frame_no, _, _, worker_seconds, _ = result
+                        else:
+                            source_id, frame_no, _, worker_seconds, model_version, _ = result
+                            self._model_seen(model_version)
+                        inference_seconds = time.perf_counter() - meta[1]
+                        self.worker_stats.record(worker_seconds)
+                        self.inference_stats.record(inference_seconds)
+                        if source_id in ordered:
+                            # Every frame of a file counts, in order: hold results that overtook earlier ones
+                            held[source_id][frame_no] = (meta, result, inference_seconds)
+                            pending = ordered[source_id]
+                            while pending and pending[0] in held[source_id]:
+                                meta, result, inference_seconds = held[source_id].pop(pending.popleft())
+                                self._frame_result(pool, in_flight, last_boxes, meta, result, inference_seconds)
+                            continue
+                        # Live frames can finish out of order, never step back in time
+                        if frame_no < last_frame_no[source_id]:
+                            self.inference_stats.drop()
+                            self.metrics.inc('frames_dropped', stage='inference')
+                            continue
+                        last_frame_no[source_id] = frame_no
+                        self._frame_result(pool, in_flight, last_boxes, meta, result, inference_seconds)
+
+                    if self.stats_interval and time.time() >= next_stats:
+                        self.print_stats()
+                        next_stats = time.time() + self.stats_interval
+            finally:
+                for t in self.captures:
+                    t.stop()
+                for future in in_flight:
+                    future.cancel()
+                self.aggregator.close()
+                self.stopped.set()
+
+    def _frame_result(self, pool, in_flight, last_boxes, meta, result, inference_seconds):
+        """Hand one recognized (or, with tracking, detected) frame to the aggregator and the render stage"""
+        captured_at, _, frame = meta
+        if self.track:
+            source_id, frame_no, boxes, crops, worker_seconds, timings = result
+        else:
+            source_id, frame_no, results, worker_seconds, model_version, timings = result
+        last_boxes[source_id] = boxes if self.track else [r[0] for r in results]
+        latency = time.time() - captured_at
+        self.latency_stats.record(latency)
+        self.frames_done += 1
+        if self.track:
+            faces = len(boxes)
+            results = self._track(pool, in_flight, source_id, frame_no, boxes, crops)
+            model_version = None # Votes only ever come from the current model
+        else:
+            faces = len(results)
+            self.recognizer_calls += len(results)
+            self.metrics.inc('recognitions', len(results))
+        labelled = self.aggregator.update(source_id, results, model_version=model_version)
+        self._frame_metrics(source_id, frame_no, timings, worker_seconds, inference_seconds,
+                            latency, faces, labelled)
+        if self.show and not self.render_buffers[source_id].put((frame, labelled)):
+            self.render_stats.drop()
+            self.metrics.inc('frames_dropped', stage='render')
+
+    def _track(self, pool, in_flight, source_id, frame_no, boxes, crops):
+        """Update the source's tracker and request LBPH only for tracks that need it"""
+        tracker = self.trackers[source_id]
+        requests = []
+        results = []
+        for track, crop in zip(tracker.update(boxes, frame_no), crops):
+            if tracker.needs_recognition(track, frame_no):
+                tracker.mark_pending(track, frame_no)
+                requests.append((track.track_id, crop))
+            identity = track.identity()
+            if identity is None:
+                results.append((track.box, -1, 100.0)) # Not recognized yet
+            else:
+                results.append((track.box, identity[0], identity[1]))
+
+        if requests:
+            self.recognizer_calls += len(requests)
+            self.metrics.inc('recognitions', len(requests))
+            future = pool.submit(_predict_crops, source_id, requests, self._model_spec())
+            in_flight[future] = ('crops', None)
+        return results
+
+    def _apply_predictions(self, source_id, predictions, worker_seconds, model_version):
+        self.recognize_stats.record(worker_seconds)
+        self.metrics.stage('recognize', worker_seconds)
+        if model_version != self.model.version:
+            return # Requested before a swap, the tracks have been reset since
+        self._model_seen(model_version)
+        tracker = self.trackers[source_id]
+        for track_id, id_pred, confidence in predictions:
+            if id_pred is None:
+                tracker.recognition_failed(track_id)
+            else:
+                tracker.add_vote(track_id, id_pred, confidence)
+
+    def _frame_metrics(self, source_id, frame_no, timings, worker_seconds, inference_seconds,
+                       latency, faces, labelled):
+        m = self.metrics
+        for stage, seconds in timings.items():
+            m.stage(stage, seconds)
+        m.stage('worker', worker_seconds)
+        m.stage('inference', inference_seconds)
+        m.stage('capture_to_result', latency)
+        m.inc('frames')
+        m.inc('faces_detected', faces)
+        unknowns = sum(1 for face in labelled if not face[4])
+        if unknowns:
+            m.inc('unknowns', unknowns)
+        if m.tracing:
+            m.trace({'ts': round(time.time(), 6), 'source': source_id, 'frame': frame_no,
+                     'model': self.model.version, 'faces': faces, 'unknowns': unknowns,
+                     'ms': {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()},
+                     'worker_ms': round(worker_seconds * 1000, 3),
+                     'inference_ms': round(inference_seconds * 1000, 3),
+                     'latency_ms': round(latency * 1000, 3)})
+
+    def _log_event(self, student_id, student_name, action, timestamp=None, model_version=None):
+        with self.metrics.timer('log'):
+            self.log_attendance(student_id, student_name, action, timestamp, model_version=model_version)
+        self.metrics.inc('events_logged', action=action)
+
+    def _model_spec(self):
+        return (self.model.version, self.model.trainer_path)
+
+    def _swap_model(self, model):
+        old = self.model
+        self.model = model
+        self.aggregator.set_model(model.version, model.names)
+        # Votes of the old model must not decide identities under the new one
+        for tracker in self.trackers.values():
+            tracker.forget_identities()
+        self.model_swaps += 1
+        self.metrics.inc('model_swaps')
+        print(f"[INFO] Switching recognizer model v{old.version} -> v{model.version}")
+
+    def _model_seen(self, version):
+        """The first result of a new model marks the end of its swap"""
+        if version != self.model.version or self.model.live_at is not None:
+            return
+        self.model.live_at = time.time()
+        print(f"[INFO] Model v{self.model.version} live, "
+              f"swap latency {self.model.live_at - self.model.changed_at:.2f}s")
+        record_swap(self.model, self.watcher.history_file)
+
+    def _render_loop(self):
+        while not self.stopped.is_set():
+            for source_id, buffer in self.render_buffers.items():
+                item = buffer.get()
+                if item is None:
+                    continue
+                with Timer(self.render_stats), self.metrics.timer('render'):
+                    self.render(source_id, *item)
+
+            k = cv2.waitKey(10) & 0xff
+            if k == 27 or k == ord('q'):
+                break
+
+    def render(self, source_id, img, labelled):
+        for (x, y, w, h), id_name, student_id, confidence, known in labelled:
+            color = (0, 255, 0) if known else (0, 0, 255)
+            confidence_text = f"{round(100 - confidence)}%"
+            cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
+            cv2.putText(img, str(id_name), (x + 5, y - 5), self.font, 1, color, 2)
+            cv2.putText(img, str(confidence_text), (x + 5, y + h - 5), self.font, 1, (255, 255, 0), 1)
+
+        cv2.putText(img, f'Present: {len(self.aggregator.currently_present)}', (10, 30), self.font, 1, (255, 255, 255), 2)
+        cv2.imshow(f'camera {source_id}', img)
@@ -0,0 +1,65 @@
+import threading
+
+from config import load_config
+
+# Everything here is built on first use and then shared by the whole process,
+# so importing a module never loads a model, a database or a camera.
+_cache = {}
+_lock = threading.RLock()
+
+def _cached(key, factory):
+    with _lock:
+        if key not in _cache:
+            _cache[key] = factory()
+        return _cache[key]
+
+def reset(*keys):
+    """Forget cached objects (all of them without arguments), they are rebuilt on next use"""
+    with _lock:
+        for key in keys or list(_cache):
+            _cache.pop(key, None)
+
+def config():
+    return _cached('config', load_config)
+
+def path(name):
+    """A configured file or folder, e.g. path('trainer')"""
+    return config()['paths'][name]
+
+def detector_options(profile):
+    return dict(config()['detector'][profile])
+
+def detector(profile='enroll', rois=None):
+    """Shared FaceDetector with the configured options of a profile ('enroll', 'live', 'train').
+
+    Detectors with ROIs are stateful per source and not cached.
+    """
+    from face_detector import FaceDetector
+    if rois is not None:
+        return FaceDetector(rois=rois, **detector_options(profile))
+    return _cached(('detector', profile), lambda: FaceDetector(**detector_options(profile)))
+
+def preprocessor():
+    """Shared FacePreprocessor (its output buffers are reused, one per process)"""
+    from face_preprocess import FacePreprocessor
+    return _cached('preprocessor', lambda: FacePreprocessor.from_config(config()['preprocess']))
+
+def face_database():
+    """The face database (None if nothing was encoded yet)"""
+    from face_database import load_face_database
+    return _cached('face_database', lambda: load_face_database(path('face_db'), path('legacy_face_db')))
+
+def attendance_system():
+    """Encoding-based AttendanceSystem with the configured presence settings"""
+    from attendance_logger import AttendanceSystem
+    recognition = config()['recognition']
+    return _cached('attendance_system', lambda: AttendanceSystem(
+        exit_delay=recognition['exit_delay'], min_dwell=recognition['min_dwell'],
+        attendance_file=path('attendance')))
+
+def open_camera(index=None):
+    """Open the configured camera at the configured resolution (not cached, the caller releases it)"""
+    from video_sources import open_source
+    camera = config()['camera']
+    cap, _ = open_source(camera['index'] if index is None else index, camera['width'], camera['height'])
+    return cap
@@ -1,24 +1,30 @@
 import cv2
 
-# Test camera
-cap = cv2.VideoCapture(0)
+import runtime
 
-if not cap.isOpened():
-    print("Error: Cannot open camera")
-else:
-    print("Camera working! Press 'q' to quit")
+def main():
+    # Test camera (index and resolution from config.json)
+    cap = runtime.open_camera()
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Error: Can't receive frame")
-            break
-            
-        cv2.imshow('Camera Test', frame)
+    if not cap.isOpened():
+        print("Error: Cannot open camera")
+    else:
+        print("Camera working! Press 'q' to quit")
         
-        if cv2.waitKey(1) == ord('q'):
-            break
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                print("Error: Can't receive frame")
+                break
+                
+            cv2.imshow('Camera Test', frame)
+            
+            if cv2.waitKey(1) == ord('q'):
+                break
+    
+    cap.release()
+    cv2.destroyAllWindows()
+    print("Test completed!")
 
-cap.release()
-cv2.destroyAllWindows()
-print("Test completed!")
+if __name__ == "__main__":
+    main()
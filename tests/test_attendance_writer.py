@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+
+import attendance_writer
+from attendance_store import AttendanceStore
+from attendance_writer import AttendanceWriter
+
+class FlakyStore(AttendanceStore):
+    """Fails the first `failures` writes"""
+    def __init__(self, failures):
+        self.failures = failures
+        self.events = []
+
+    def write_events(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.events.extend(events)
+
+def _writer(monkeypatch, store):
+    monkeypatch.setattr(attendance_writer, 'open_store', lambda path: store)
+    return AttendanceWriter('attendance.db', batch_size=1, flush_interval=0.01)
+
+def test_failed_batch_is_retried(monkeypatch):
+    store = FlakyStore(failures=2)
+    writer = _writer(monkeypatch, store)
+    writer.log('101', 'Jit', 'ENTRY', datetime(2024, 1, 1, 9))
+    writer.log('101', 'Jit', 'EXIT', datetime(2024, 1, 1, 10))
+    writer.close()
+    assert [event[3] for event in store.events] == ['ENTRY', 'EXIT']
+    assert writer.events_written == 2
+
+def test_close_reports_lost_events(monkeypatch):
+    writer = _writer(monkeypatch, FlakyStore(failures=1000))
+    writer.log('101', 'Jit', 'ENTRY', datetime(2024, 1, 1, 9))
+    with pytest.raises(RuntimeError, match="1 attendance events"):
+        writer.close()
@@ -0,0 +1,44 @@
+import numpy as np
+
+from embedding_index import build_index, load_index, refresh_index, remove_identity, save_index
+from face_database import FaceDatabase
+
+def _database(identities=4, samples=6, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((identities, dim)) * 10
+    codes = np.repeat(np.arange(identities, dtype=np.int32), samples)
+    encodings = (centers[codes] + rng.standard_normal((len(codes), dim))).astype(np.float32)
+    registered = np.full(len(codes), np.datetime64('2024-01-01T09:00:00'), dtype='datetime64[s]')
+    people = [(str(100 + i), f'P{i}') for i in range(identities)]
+    return FaceDatabase(encodings, codes, registered, people, {'name': 'lbph'})
+
+def test_removed_identity_matches_a_rebuild(tmp_path):
+    db_path = str(tmp_path / 'face_database')
+    database = _database()
+    database.save(db_path)
+    for kind in ('flat', 'ivf'):
+        index_path = db_path + f'.{kind}'
+        save_index(build_index(database, kind, **({'nlist': 3} if kind == 'ivf' else {})), database, index_path)
+        index = load_index(database, index_path, mmap=False)
+
+        updated = database.without_identity('101')
+        assert updated.identities == [('100', 'P0'), ('102', 'P2'), ('103', 'P3')]
+        assert remove_identity(index, database.code_by_id['101']) == 6
+        updated.save(db_path + '.updated')
+        save_index(index, updated, index_path)
+
+        # The saved index is stamped for the new database and labels its samples
+        reloaded = load_index(FaceDatabase.load(db_path + '.updated'), index_path)
+        assert reloaded is not None
+        assert sorted(reloaded.labels.tolist()) == sorted(updated.codes.tolist())
+        labels = [found[0][0] for found in reloaded.search_identities(updated.encodings)]
+        assert labels == updated.codes.tolist()
+
+def test_refresh_keeps_ivf_partitions():
+    database = _database()
+    index = build_index(database, 'ivf', nlist=3)
+    grown = _database(identities=5, seed=0)
+    fresh = refresh_index(index, grown)
+    np.testing.assert_array_equal(fresh.centroids, index.centroids)
+    assert len(fresh) == len(grown)
+    assert [found[0][0] for found in fresh.search_identities(grown.encodings)] == grown.codes.tolist()
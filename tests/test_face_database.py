@@ -0,0 +1,32 @@
+import pickle
+
+import numpy as np
+
+from face_database import load_face_database
+
+def _write_pickle(path, encodings, names, ids, dates):
+    with open(path, 'wb') as f:
+        pickle.dump({'encodings': encodings, 'names': names, 'ids': ids, 'registration_dates': dates}, f)
+
+def test_empty_pickle_converts(tmp_path):
+    pkl_path, db_path = str(tmp_path / 'face_database.pkl'), str(tmp_path / 'face_database')
+    _write_pickle(pkl_path, [], [], [], [])
+
+    database = load_face_database(db_path, pkl_path)
+    assert len(database) == 0
+    assert database.encodings.shape == (0, 0)
+    assert database.identities == []
+
+    # Loading the converted database again works too
+    assert len(load_face_database(db_path, pkl_path)) == 0
+
+def test_pickle_converts(tmp_path):
+    pkl_path, db_path = str(tmp_path / 'face_database.pkl'), str(tmp_path / 'face_database')
+    _write_pickle(pkl_path, [(10, 20, 30, 40), (12, 22, 30, 40)], ['Jit', 'Ana'], ['101', '102'],
+                  ['2024-01-01 09:00:00', '2024-01-02 09:00:00'])
+
+    database = load_face_database(db_path, pkl_path)
+    assert len(database) == 2
+    assert database.encodings.shape == (2, 4)
+    np.testing.assert_array_equal(database.encodings[1], [12, 22, 30, 40])
+    assert sorted(database.identities) == [('101', 'Jit'), ('102', 'Ana')]
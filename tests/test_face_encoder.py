@@ -0,0 +1,18 @@
+import numpy as np
+
+from face_encoder import BoxEncoder, LBPHEncoder
+from face_preprocess import FacePreprocessor
+
+def test_encode_uses_the_preprocessed_faces():
+    rng = np.random.default_rng(0)
+    gray = rng.integers(0, 256, (240, 320), dtype=np.uint8)
+    boxes = [(10, 20, 80, 90), (150, 40, 120, 120)]
+    preprocessor = FacePreprocessor(size=64, margin=0.1, equalize='hist')
+
+    encoder = LBPHEncoder()
+    expected = encoder.encode_crops([preprocessor.normalize(preprocessor.crop(gray, box)).copy() for box in boxes])
+    np.testing.assert_array_equal(encoder.encode(gray, boxes, preprocessor), expected)
+
+def test_box_encoder_skips_cropping():
+    encodings = BoxEncoder().encode(np.zeros((10, 10), np.uint8), [(1, 2, 3, 4)])
+    np.testing.assert_array_equal(encodings, [[1, 2, 3, 4]])
@@ -0,0 +1,22 @@
+import os
+
+import numpy as np
+
+from feature_cache import FeatureCache
+
+def test_deleted_file_is_a_miss(tmp_path):
+    image = str(tmp_path / 'User.1.1.jpg')
+    with open(image, 'wb') as f:
+        f.write(b'jpeg')
+    crop = np.full((4, 4), 7, dtype=np.uint8)
+
+    with FeatureCache('train', {}, str(tmp_path / 'cache.db')) as cache:
+        assert cache.put(image, 1, [], [crop])
+        label, _, crops = cache.get(image)
+        assert label == 1 and np.array_equal(crops[0], crop)
+
+        # Still listed (e.g. in the manifest) but removed from disk
+        os.remove(image)
+        assert cache.get(image) is None
+        assert cache.put(image, 1, [], [crop]) is False
+        assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,55 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+import lbph_model
+from model_watcher import ModelWatcher
+
+def _write_model(trainer, map_file, seed):
+    rng = np.random.default_rng(seed)
+    faces = [rng.integers(0, 256, (100, 100), dtype=np.uint8) for _ in range(4)]
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(faces, np.array([1, 1, 2, 2]))
+    lbph_model.save_model(recognizer, trainer)
+    with open(map_file, 'w') as f:
+        json.dump({'1': 'Jit', '2': 'Ana'}, f)
+
+def test_restart_reuses_unchanged_version(tmp_path):
+    trainer, map_file = str(tmp_path / 'models' / 'trainer.yml'), str(tmp_path / 'map.json')
+    _write_model(trainer, map_file, 0)
+
+    first = ModelWatcher(trainer, map_file).load_now()
+    second = ModelWatcher(trainer, map_file).load_now()
+    assert first.version == second.version == 1
+    assert second.names[1:] == ['Jit', 'Ana']
+    # Snapshots follow the configured trainer path
+    assert sorted(os.listdir(tmp_path / 'models' / 'versions')) == ['trainer.v1.json', 'trainer.v1.yml']
+    assert ModelWatcher(trainer, map_file).history_file == str(tmp_path / 'models' / 'model_versions.csv')
+
+def test_changed_model_gets_next_version(tmp_path):
+    trainer, map_file = str(tmp_path / 'trainer.yml'), str(tmp_path / 'map.json')
+    _write_model(trainer, map_file, 0)
+    ModelWatcher(trainer, map_file).load_now()
+
+    _write_model(trainer, map_file, 1)
+    assert ModelWatcher(trainer, map_file).load_now().version == 2
+
+    with open(map_file, 'w') as f:
+        json.dump({'1': 'Jit', '2': 'Ana', '3': 'Lee'}, f)
+    assert ModelWatcher(trainer, map_file).load_now().version == 3
+
+def test_taken_version_is_not_overwritten(tmp_path):
+    trainer, map_file = str(tmp_path / 'trainer.yml'), str(tmp_path / 'map.json')
+    _write_model(trainer, map_file, 0)
+    watcher = ModelWatcher(trainer, map_file)
+    # Another process claimed v1 after this one listed the snapshots
+    os.makedirs(watcher.snapshot_dir)
+    with open(os.path.join(watcher.snapshot_dir, 'trainer.v1.yml'), 'w') as f:
+        f.write('other')
+    watcher._latest_snapshot = lambda: 0
+
+    assert watcher.load_now().version == 2
+    with open(os.path.join(watcher.snapshot_dir, 'trainer.v1.yml')) as f:
+        assert f.read() == 'other'
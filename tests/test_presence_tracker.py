@@ -0,0 +1,71 @@
+from presence_tracker import PresenceTracker
+
+JIT = ('101', 'Jit')
+
+def _seen(confidence=50):
+    return [(JIT[0], JIT[1], confidence)]
+
+def _tracker():
+    return PresenceTracker(exit_delay=5.0, min_dwell=0.5, enter_confidence=80, stay_confidence=100)
+
+def test_entry_after_min_dwell():
+    tracker = _tracker()
+    assert tracker.update(_seen(), now=10.0) == []
+    assert tracker.update(_seen(), now=10.3) == []
+    # ENTRY is stamped with the first sighting
+    assert tracker.update(_seen(), now=10.5) == [('101', 'Jit', 'ENTRY', 10.0)]
+    assert tracker.update(_seen(), now=10.6) == []
+    assert tracker.present_ids() == {'101'}
+
+def test_exit_after_exit_delay():
+    tracker = _tracker()
+    tracker.update(_seen(), now=0.0)
+    tracker.update(_seen(), now=1.0)
+    assert tracker.tick(now=6.0) == []
+    # EXIT is stamped with the last sighting
+    assert tracker.tick(now=6.1) == [('101', 'Jit', 'EXIT', 1.0)]
+    assert tracker.present_ids() == set()
+
+def test_dropout_does_not_exit_and_reenter():
+    tracker = _tracker()
+    events = []
+    for now in (0.0, 0.5, 1.0):
+        events += tracker.update(_seen(), now=now)
+    # Missed detections (a blink, a head turn), then seen again
+    for now in (1.5, 2.0, 3.0):
+        events += tracker.update([], now=now)
+    for now in (3.5, 4.0):
+        events += tracker.update(_seen(), now=now)
+    events += tracker.tick(now=9.0)
+    events += tracker.tick(now=9.1)
+    assert events == [('101', 'Jit', 'ENTRY', 0.0), ('101', 'Jit', 'EXIT', 4.0)]
+
+def test_brief_sighting_is_forgotten():
+    tracker = _tracker()
+    assert tracker.update(_seen(), now=0.0) == []
+    assert tracker.tick(now=5.1) == []
+    assert tracker.people == {}
+
+def test_confidence_hysteresis():
+    tracker = _tracker()
+    # Too weak to enter
+    assert tracker.update(_seen(90), now=0.0) == []
+    assert tracker.update(_seen(90), now=1.0) == []
+    assert tracker.people == {}
+
+    tracker.update(_seen(70), now=2.0)
+    assert tracker.update(_seen(70), now=2.5) == [('101', 'Jit', 'ENTRY', 2.0)]
+    # Weaker matches keep a present person present...
+    for now in (4.0, 7.0):
+        assert tracker.update(_seen(90), now=now) == []
+    assert tracker.tick(now=11.9) == []
+    # ...but not ones past stay_confidence
+    assert tracker.update(_seen(100), now=12.1) == [('101', 'Jit', 'EXIT', 7.0)]
+
+def test_close_forces_present_people_out():
+    tracker = _tracker()
+    tracker.update(_seen(), now=0.0)
+    tracker.update(_seen(), now=0.5)
+    tracker.update([('102', 'Ana', 50)], now=1.0) # Still a candidate
+    assert tracker.close(now=2.0) == [('101', 'Jit', 'EXIT (FORCED)', 2.0)]
+    assert tracker.people == {}
@@ -0,0 +1,39 @@
+import os
+
+import cv2
+import numpy as np
+
+import lbph_model
+import train_model
+from benchmark import write_dataset
+
+def _counts(recognizer):
+    labels, counts = np.unique(recognizer.getLabels().reshape(-1), return_counts=True)
+    return dict(zip(labels.tolist(), counts.tolist()))
+
+def test_update_twice_matches_full_retrain(tmp_path):
+    dataset = str(tmp_path / 'dataset')
+    trainer = str(tmp_path / 'trainer' / 'trainer.yml')
+    write_dataset(dataset, identities=3, samples=5)
+
+    faces, ids = train_model.getImagesAndLabels(dataset, workers=1)
+    fresh = cv2.face.LBPHFaceRecognizer_create()
+    fresh.train(faces, np.array(ids))
+    lbph_model.save_model(fresh, trainer)
+
+    for _ in range(2):
+        train_model.update_user(2, workers=1, dataset_path=dataset, trainer_path=trainer)
+
+    model = lbph_model.load_model(trainer)
+    assert _counts(model) == _counts(fresh) == {1: 5, 2: 5, 3: 5}
+    assert lbph_model.compare_models(model, fresh) == []
+
+def test_update_without_model_trains_one(tmp_path):
+    dataset = str(tmp_path / 'dataset')
+    trainer = str(tmp_path / 'trainer.yml')
+    write_dataset(dataset, identities=2, samples=4)
+
+    train_model.update_user(1, workers=1, dataset_path=dataset, trainer_path=trainer)
+
+    assert os.path.exists(trainer)
+    assert _counts(lbph_model.load_model(trainer)) == {1: 4}
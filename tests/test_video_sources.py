@@ -0,0 +1,16 @@
+import video_sources
+from video_sources import CaptureThread
+
+class _Closed:
+    def isOpened(self):
+        return False
+
+def test_capture_opens_at_the_requested_size(monkeypatch):
+    opened = []
+    monkeypatch.setattr(video_sources, 'open_source',
+                        lambda spec, width, height: opened.append((spec, width, height)) or (_Closed(), True))
+
+    capture = CaptureThread(0, '0', width=1280, height=720)
+    capture.run()
+    assert opened == [('0', 1280, 720)]
+    assert capture.is_live and capture.exhausted()
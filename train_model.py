@@ -3,62 +3,224 @@ import numpy as np
 from PIL import Image
 import os
 import sys # Import the sys module to exit the script
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import lbph_model
+import runtime
+from dataset_manifest import open_manifest
+from feature_cache import FeatureCache
 
 # Path for face image database
 path = 'dataset'
-
-# Create the LBPH (Local Binary Patterns Histograms) face recognizer
-recognizer = cv2.face.LBPHFaceRecognizer_create()
-detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+TRAINER_FILE = lbph_model.TRAINER_FILE
+
+# Below this many images a process pool costs more than it saves
+PARALLEL_MIN_IMAGES = 64
+
+def get_detector():
+    # Created lazily, once per (worker) process, with the 'train' options of config.json
+    return runtime.detector('train')
+
+def get_preprocessor():
+    # Same normalization as recognition (config.json 'preprocess'), one per (worker) process
+    return runtime.preprocessor()
+
+def is_face_crop(filename, img_numpy):
+    """User.<id>.<n>.jpg files written by combined_enrollment.py are already face crops.
+
+    Haar boxes are always square, so a square image with that name is taken
+    as a crop; full frames from older datasets still go through detection.
+    """
+    return filename.startswith('User.') and img_numpy.shape[0] == img_numpy.shape[1]
+
+def load_sample(imagePath, redetect=False):
+    """Load one image, returns (id, face crops, error message or None)"""
+    try:
+        # Open the image and convert it to grayscale
+        PIL_img = Image.open(imagePath).convert('L') # 'L' converts to grayscale
+        img_numpy = np.array(PIL_img, 'uint8')
+
+        # Get the ID from the image filename (e.g., User.1.5.jpg -> ID is 1)
+        filename = os.path.split(imagePath)[-1]
+        id = int(filename.split(".")[1])
+
+        # Fast path: nothing to detect in an existing crop (saved with its margin)
+        preprocessor = get_preprocessor()
+        if not redetect and is_face_crop(filename, img_numpy):
+            return id, [preprocessor.normalize(img_numpy).copy()], None
+
+        # Detect the face in the image
+        faces = get_detector().detect(img_numpy)
+        return id, list(preprocessor.faces(img_numpy, faces).copy()), None
+    except Exception as e:
+        return None, [], f"Skipping file with error: {imagePath} - {e}"
+
+def _init_worker():
+    cv2.setNumThreads(1)
+
+def open_cache(cache_path, redetect=False):
+    """Feature cache for training; its entries are dropped when the 'train' detector or 'preprocess' options change"""
+    kind = 'train-redetect' if redetect else 'train'
+    return FeatureCache(kind, {'detector': runtime.detector_options('train'), 'preprocess': get_preprocessor().spec()},
+                        cache_path)
 
 # Function to get the images and label data
-def getImagesAndLabels(path):
-    # Get all file paths in the dataset folder
-    imagePaths = [os.path.join(path, f) for f in os.listdir(path)]
+def list_samples(path, user_id=None, manifest_path=None):
+    """Training images (of one user if given), sorted so the result does not depend on the OS.
+
+    With a manifest only its 'crop' samples are listed (one indexed query,
+    no directory scan); without one every file in the dataset folder is.
+    """
+    if manifest_path:
+        manifest = open_manifest(manifest_path, path)
+        try:
+            return sorted(manifest.sample_paths('crop', user_id))
+        finally:
+            manifest.close()
+    prefix = f"User.{user_id}." if user_id is not None else ''
+    return sorted(os.path.join(path, f) for f in os.listdir(path)
+                  if f.startswith(prefix) and os.path.isfile(os.path.join(path, f)))
+
+def getImagesAndLabels(path, workers=None, redetect=False, user_id=None, cache_path=None, manifest_path=None):
+    prefix = f"User.{user_id}." if user_id is not None else ''
+    imagePaths = list_samples(path, user_id, manifest_path)
     faceSamples = []
     ids = []
 
-    for imagePath in imagePaths:
-        try:
-            # Open the image and convert it to grayscale
-            PIL_img = Image.open(imagePath).convert('L') # 'L' converts to grayscale
-            img_numpy = np.array(PIL_img, 'uint8')
-
-            # Get the ID from the image filename (e.g., User.1.5.jpg -> ID is 1)
-            id = int(os.path.split(imagePath)[-1].split(".")[1])
-
-            # Detect the face in the image
-            faces = detector.detectMultiScale(img_numpy)
-
-            for (x, y, w, h) in faces:
-                faceSamples.append(img_numpy[y:y+h, x:x+w])
-                ids.append(id)
-        except Exception as e:
-            print(f"Skipping file with error: {imagePath} - {e}")
-
+    # With a cache only new or modified images are decoded (and detected)
+    cache = open_cache(cache_path, redetect) if cache_path else None
+    results = [None] * len(imagePaths)
+    if cache:
+        for i, imagePath in enumerate(imagePaths):
+            entry = cache.get(imagePath)
+            if entry is not None:
+                results[i] = (entry[0], entry[2], None)
+    todo = [i for i, result in enumerate(results) if result is None]
+    todoPaths = [imagePaths[i] for i in todo]
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers > 1 and len(todoPaths) >= PARALLEL_MIN_IMAGES:
+        # map() keeps the input order, so the output is deterministic
+        chunksize = max(1, len(todoPaths) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            loaded = pool.map(load_sample, todoPaths, [redetect] * len(todoPaths), chunksize=chunksize)
+            loaded = list(_with_progress(loaded, len(todoPaths), start))
+    else:
+        workers = 1
+        loaded = _with_progress((load_sample(p, redetect) for p in todoPaths), len(todoPaths), start)
+
+    for i, result in zip(todo, loaded):
+        results[i] = result
+        if cache and result[2] is None:
+            cache.put(imagePaths[i], result[0], [], result[1])
+    if cache:
+        evicted = cache.evict_missing(imagePaths, os.path.join(path, prefix) if prefix else path)
+        cache.close()
+        print(f" [INFO] Feature cache: {len(imagePaths) - len(todo)} images cached, {len(todo)} loaded"
+              f"{f', {evicted} deleted images evicted' if evicted else ''}")
+
+    for id, faces, error in results:
+        if error:
+            print(error)
+            continue
+        for face in faces:
+            faceSamples.append(face)
+            ids.append(id)
+
+    elapsed = time.perf_counter() - start
+    rate = len(todoPaths) / elapsed if elapsed > 0 else 0.0
+    print(f" [INFO] Loaded {len(imagePaths)} images ({len(faceSamples)} faces) in {elapsed:.2f}s "
+          f"with {workers} process(es), {rate:.1f} images/s")
 
     return faceSamples, ids
 
-print("\n [INFO] Training faces. It will take a few seconds. Wait ...")
-faces, ids = getImagesAndLabels(path)
-
-# ---- NEW: Check if we have found any faces before training ----
-if len(faces) == 0:
-    print("\n [ERROR] No faces found in the dataset. Please create a dataset first.")
-    print("         Make sure the images are clear and well-lit.")
-    sys.exit() # Exit the program if no faces were found
-# ----------------------------------------------------------------
-
-# Train the recognizer with the faces and their corresponding IDs
-recognizer.train(faces, np.array(ids))
-
-# Create a 'trainer' directory if it doesn't exist
-if not os.path.exists('trainer'):
-    os.makedirs('trainer')
-
-# Save the trained model into the trainer/trainer.yml file
-recognizer.write('trainer/trainer.yml')
-
-# Print the number of faces trained and end the program
-print(f"\n [INFO] {len(np.unique(ids))} faces trained. Exiting Program")
-
+def _with_progress(results, total, start, every=500):
+    for done, result in enumerate(results, 1):
+        if done % every == 0:
+            elapsed = time.perf_counter() - start
+            print(f" [INFO] {done}/{total} images ({done / elapsed:.1f} images/s)")
+        yield result
+
+def update_user(user_id, workers=None, redetect=False, dataset_path=path, trainer_path=TRAINER_FILE,
+                cache_path=None, manifest_path=None):
+    """Incremental mode: replace one user's samples in trainer.yml with the current images"""
+    print(f"\n [INFO] Adding the images of ID {user_id} to the existing model ...")
+    start = time.perf_counter()
+    faces, ids = getImagesAndLabels(dataset_path, workers, redetect, user_id=user_id, cache_path=cache_path,
+                                    manifest_path=manifest_path)
+    if len(faces) == 0:
+        print(f"\n [ERROR] No faces found for ID {user_id}.")
+        sys.exit()
+    # The user's old histograms go first, so running this twice does not double the label
+    total = lbph_model.add_samples(faces, ids, trainer_path, replace=True)
+    print(f"\n [INFO] Added {len(faces)} samples in {time.perf_counter() - start:.2f}s, "
+          f"model now holds {total} samples")
+
+def check_model(fresh, trainer_path=TRAINER_FILE):
+    """Consistency check: a full retrain must hold the same samples as the incrementally kept model"""
+    if not os.path.exists(trainer_path):
+        print(f"\n [ERROR] No model at {trainer_path} to compare with.")
+        return
+    problems = lbph_model.compare_models(lbph_model.load_model(trainer_path), fresh)
+    if problems:
+        print(f"\n [WARN] {trainer_path} differs from a full retrain:")
+        for problem in problems:
+            print(f"         {problem}")
+        print("         Run train_model.py without --check to rebuild it.")
+    else:
+        print(f"\n [INFO] {trainer_path} matches a full retrain.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the LBPH face recognizer from dataset/")
+    parser.add_argument('--workers', type=int, default=runtime.config()['workers']['training'],
+                        help="Loader processes (default: CPU count)")
+    parser.add_argument('--redetect', action='store_true', help="Run face detection on enrollment crops too")
+    parser.add_argument('--update', type=int, metavar='ID',
+                        help="Only add the images of this numeric ID to the existing model")
+    parser.add_argument('--check', action='store_true',
+                        help="Retrain from scratch and compare with the current model instead of saving")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Decode every image again instead of using the feature cache")
+    parser.add_argument('--scan', action='store_true',
+                        help="List the dataset folder instead of reading the dataset manifest")
+    args = parser.parse_args()
+
+    dataset_path, trainer_path = runtime.path('dataset'), runtime.path('trainer')
+    cache_path = None if args.no_cache else runtime.path('feature_cache')
+    manifest_path = None if args.scan else runtime.path('manifest')
+    if args.update is not None:
+        update_user(args.update, args.workers, args.redetect, dataset_path, trainer_path, cache_path, manifest_path)
+        return
+
+    # Create the LBPH (Local Binary Patterns Histograms) face recognizer
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+
+    print("\n [INFO] Training faces. It will take a few seconds. Wait ...")
+    faces, ids = getImagesAndLabels(dataset_path, args.workers, args.redetect, cache_path=cache_path,
+                                    manifest_path=manifest_path)
+
+    # ---- NEW: Check if we have found any faces before training ----
+    if len(faces) == 0:
+        print("\n [ERROR] No faces found in the dataset. Please create a dataset first.")
+        print("         Make sure the images are clear and well-lit.")
+        sys.exit() # Exit the program if no faces were found
+    # ----------------------------------------------------------------
+
+    # Train the recognizer with the faces and their corresponding IDs
+    recognizer.train(faces, np.array(ids))
+
+    if args.check:
+        check_model(recognizer, trainer_path)
+        return
+
+    # Save the trained model into the trainer/trainer.yml file (creates 'trainer/' if needed)
+    lbph_model.save_model(recognizer, trainer_path)
+
+    # Print the number of faces trained and end the program
+    print(f"\n [INFO] {len(np.unique(ids))} faces trained. Exiting Program")
+
+if __name__ == "__main__":
+    main()
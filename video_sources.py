@@ -0,0 +1,112 @@
+import cv2
+import os
+import threading
+import time
+
+from pipeline import FrameBuffer, StageStats
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+class ImageFolderSource:
+    """Reads the images of a folder in name order, like a VideoCapture"""
+    def __init__(self, folder_path):
+        self.paths = sorted(
+            os.path.join(folder_path, f) for f in os.listdir(folder_path)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.position = 0
+
+    def isOpened(self):
+        return len(self.paths) > 0
+
+    def read(self):
+        while self.position < len(self.paths):
+            frame = cv2.imread(self.paths[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        self.position = len(self.paths)
+
+def is_live(spec):
+    """Whether a source spec is a camera (device index) rather than a file or folder"""
+    return str(spec).isdigit()
+
+def open_source(spec, width=640, height=480):
+    """Open a device index, video file or image folder.
+
+    Returns (capture, is_live). Live sources are cameras, where old frames
+    are worth nothing; files and folders must be read completely.
+    """
+    spec = str(spec)
+    if is_live(spec):
+        cap = cv2.VideoCapture(int(spec))
+        cap.set(3, width)
+        cap.set(4, height)
+        # Keep the driver from queueing frames behind our back (not every backend supports it)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap, True
+    if os.path.isdir(spec):
+        return ImageFolderSource(spec), False
+    return cv2.VideoCapture(spec), False
+
+class CaptureThread(threading.Thread):
+    """Reads one source as fast as it delivers into a FrameBuffer.
+
+    Buffer items are (frame_no, captured_at, frame). Live cameras never
+    block, the buffer's drop policy decides what is kept; files wait for
+    the consumer so that no frame is lost.
+    """
+    def __init__(self, source_id, spec, policy='latest', queue_size=4, every_n=2, metrics=None,
+                 width=640, height=480):
+        super().__init__(name=f"capture-{source_id}", daemon=True)
+        self.source_id = source_id
+        self.spec = spec
+        self.width = width # Requested camera resolution, files keep their own
+        self.height = height
+        self.is_live = is_live(spec)
+        self.buffer = FrameBuffer(policy, queue_size, every_n)
+        self.stats = StageStats(f"capture[{source_id}]")
+        self.metrics = metrics
+        self.stopped = threading.Event()
+        self.finished = threading.Event()
+        self.frames_read = 0
+
+    def run(self):
+        cap, is_live = open_source(self.spec, self.width, self.height)
+        if not cap.isOpened():
+            print(f"[ERROR] Cannot open source {self.source_id}: {self.spec}")
+            self.finished.set()
+            return
+
+        print(f"[INFO] Source {self.source_id} opened: {self.spec}")
+        while not self.stopped.is_set():
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            seconds = time.perf_counter() - start
+            self.stats.record(seconds)
+            self.frames_read += 1
+            if self.metrics:
+                self.metrics.stage('capture', seconds, source=self.source_id)
+            if not self.buffer.put((self.frames_read, time.time(), frame), block=not is_live):
+                self.stats.drop()
+                if self.metrics:
+                    self.metrics.inc('frames_dropped', stage='capture', source=self.source_id)
+
+        cap.release()
+        self.finished.set()
+
+    def get_frame(self):
+        """Return the next (frame_no, captured_at, frame) or None"""
+        return self.buffer.get()
+
+    def exhausted(self):
+        return self.finished.is_set() and len(self.buffer) == 0
+
+    def stop(self):
+        self.stopped.set()
+        self.buffer.close()
@@ -1,35 +1,88 @@
 import pandas as pd
 from datetime import datetime
 import os
+import sqlite3
+import sys
 
-def view_attendance():
-    if not os.path.exists('attendance_log.csv'):
+import runtime
+from attendance_report import IncrementalReport
+from attendance_store import is_sqlite_path
+
+def view_attendance(attendance_file=None, rebuild=False, summary_file=None):
+    """Print the attendance report and save the per-student summary (configured paths by default)"""
+    attendance_file = attendance_file or runtime.path('attendance')
+    summary_file = summary_file or runtime.path('attendance_summary')
+    if not os.path.exists(attendance_file):
         print("No attendance records found!")
         return
     
-    # Read the CSV file
-    df = pd.read_csv('attendance_log.csv')
+    if is_sqlite_path(attendance_file):
+        view_attendance_sqlite(attendance_file, summary_file)
+        return
+    
+    # Only the rows appended since the last report are read
+    report = IncrementalReport(attendance_file)
+    new_rows = report.update(rebuild=rebuild)
     
     print("=== ATTENDANCE REPORT ===")
-    print(f"Total records: {len(df)}")
+    print(f"Total records: {report.rows} ({new_rows} new since the last report)")
     print("\nRecent entries:")
-    print(df.tail(10))  # Show last 10 entries
+    print(report.tail(10))  # Show last 10 entries
     
     # Summary by student
     print("\n=== SUMMARY BY STUDENT ===")
-    student_summary = df.groupby(['Student_ID', 'Student_Name', 'Action']).size().unstack(fill_value=0)
+    student_summary = report.student_summary()
     print(student_summary)
     
     # Today's attendance
     today = datetime.now().strftime("%Y-%m-%d")
-    today_data = df[df['Date'] == today]
+    today_data = report.rows_for_day(today)
     if not today_data.empty:
         print(f"\n=== TODAY'S ATTENDANCE ({today}) ===")
         print(today_data)
     
+    # Save summary to file (unchanged if no new rows arrived)
+    if new_rows or not os.path.exists(summary_file):
+        student_summary.to_csv(summary_file)
+    print(f"\nSummary saved to '{summary_file}'")
+
+def view_attendance_sqlite(db_path, summary_file):
+    """Same report from the SQLite store, aggregated in SQL instead of a full load"""
+    conn = sqlite3.connect(db_path)
+    columns = "date AS Date, time AS Time, student_id AS Student_ID, student_name AS Student_Name, action AS Action"
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+        print("=== ATTENDANCE REPORT ===")
+        print(f"Total records: {total}")
+        print("\nRecent entries:")
+        recent = pd.read_sql_query(f"SELECT {columns} FROM attendance ORDER BY id DESC LIMIT 10", conn)
+        print(recent.iloc[::-1].reset_index(drop=True))
+        
+        # Summary by student
+        print("\n=== SUMMARY BY STUDENT ===")
+        counts = pd.read_sql_query(
+            "SELECT student_id AS Student_ID, student_name AS Student_Name, action AS Action, COUNT(*) AS n "
+            "FROM attendance GROUP BY student_id, student_name, action", conn)
+        student_summary = counts.pivot_table(index=['Student_ID', 'Student_Name'], columns='Action',
+                                             values='n', fill_value=0, aggfunc='sum')
+        print(student_summary)
+        
+        # Today's attendance (served by the (date, student_id) index)
+        today = datetime.now().strftime("%Y-%m-%d")
+        today_data = pd.read_sql_query(f"SELECT {columns} FROM attendance WHERE date = ? ORDER BY id",
+                                       conn, params=(today,))
+        if not today_data.empty:
+            print(f"\n=== TODAY'S ATTENDANCE ({today}) ===")
+            print(today_data)
+    finally:
+        conn.close()
+    
     # Save summary to file
-    student_summary.to_csv('attendance_summary.csv')
-    print(f"\nSummary saved to 'attendance_summary.csv'")
+    student_summary.to_csv(summary_file)
+    print(f"\nSummary saved to '{summary_file}'")
 
 if __name__ == "__main__":
-    view_attendance()
+    # Usage: python view_attendance.py [attendance_log.csv | attendance.db] [--rebuild]
+    # (default: the attendance log of config.json)
+    args = [a for a in sys.argv[1:] if a != '--rebuild']
+    view_attendance(*args[:1], rebuild='--rebuild' in sys.argv[1:])